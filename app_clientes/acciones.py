@@ -0,0 +1,145 @@
+# app_clientes/acciones.py
+"""
+Acciones masivas de los listados del panel. Cada una es un solo UPDATE o
+DELETE sobre los ids seleccionados; como update() no dispara señales, aquí
+se hacen a mano las invalidaciones y reindexados que haría el guardado de
+una sola fila.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.deletion import ProtectedError, RestrictedError
+from django.db.models.functions import Greatest, Round, TruncDate
+from django.utils import timezone
+
+from . import analitica, busqueda_admin
+from .models import Categoria, Novedad, Pedido, Producto, ProductoPromocion, Promocion
+from .versiones import invalidar_al_confirmar
+
+# Versiones de caché que mueve cualquier cambio en cada modelo (ver signals.py)
+VERSIONES = {
+    Promocion: ('promociones',),
+    ProductoPromocion: ('promociones',),
+    Categoria: ('categorias',),
+    Producto: ('precios', 'productos'),
+    Novedad: ('novedades',),
+}
+
+class AccionInvalida(Exception):
+    pass
+
+
+def _despues_de_actualizar(slug, config, ids, campos):
+    Model = config['model']
+    invalidar_al_confirmar(*VERSIONES.get(Model, ()))
+    locales = {ruta.split('__')[0] for ruta in config.get('search_fields', [])}
+    if locales & set(campos):
+        busqueda_admin.indexar_ids(slug, ids)
+
+
+def _activar(valor):
+    def accion(slug, config, queryset, ids, parametro):
+        cambiados = queryset.update(activo=valor)
+        _despues_de_actualizar(slug, config, ids, ('activo',))
+        return cambiados
+    return accion
+
+
+def _marcar_leido(valor):
+    def accion(slug, config, queryset, ids, parametro):
+        return queryset.update(leido=valor)
+    return accion
+
+
+def borrar(slug, config, queryset, ids, parametro):
+    # QuerySet.delete() ya envía post_delete por fila a quien lo escuche (índice FTS, versiones)
+    try:
+        _, por_modelo = queryset.delete()
+    except (ProtectedError, RestrictedError):
+        raise AccionInvalida("Algunos registros están en uso (por ejemplo, en pedidos) y no se pueden borrar.")
+    busqueda_admin.desindexar(slug, ids)
+    # El total de delete() incluye lo borrado en cascada; se informa solo lo seleccionado
+    return por_modelo.get(config['model']._meta.label, 0)
+
+
+def reprecio(slug, config, queryset, ids, parametro):
+    """Ajusta precio en un porcentaje (10 sube 10 %, -15 baja 15 %), redondeado a centavos."""
+    try:
+        porcentaje = Decimal(str(parametro).strip())
+    except InvalidOperation:
+        raise AccionInvalida("Indica el porcentaje de ajuste, por ejemplo 10 o -15.")
+    if not porcentaje.is_finite() or porcentaje <= -100 or porcentaje > 1000:
+        raise AccionInvalida("El porcentaje debe estar entre -100 y 1000.")
+    factor = Value(1 + porcentaje / 100, output_field=DecimalField(max_digits=12, decimal_places=6))
+    cambiados = queryset.update(
+        precio=Greatest(Round(F('precio') * factor, 2), Value(Decimal('0.00')), output_field=DecimalField()),
+    )
+    _despues_de_actualizar(slug, config, ids, ('precio',))
+    return cambiados
+
+
+SIGUIENTE_ESTADO = {
+    Pedido.EstadoPedido.PENDIENTE: Pedido.EstadoPedido.EN_CAMINO,
+    Pedido.EstadoPedido.EN_CAMINO: Pedido.EstadoPedido.ENTREGADO,
+}
+
+
+def avanzar_estado(slug, config, queryset, ids, parametro):
+    """
+    Pendiente -> En camino -> Entregado, con las mismas fechas y
+    confirmaciones que marcar_en_camino()/marcar_entregado(). Entregados y
+    cancelados no se tocan.
+    """
+    ahora = timezone.now()
+    PENDIENTE = Pedido.EstadoPedido.PENDIENTE
+    EN_CAMINO = Pedido.EstadoPedido.EN_CAMINO
+    queryset = queryset.filter(estado_pedido__in=list(SIGUIENTE_ESTADO))
+
+    # Los resúmenes por estado se mueven por grupo, no por pedido
+    grupos = list(
+        queryset.annotate(fecha=TruncDate('fecha_pedido'))
+        .values('fecha', 'estado_pedido', 'metodo_pago')
+        .annotate(pedidos=Count('pk'), ingresos=Sum('total')).order_by()
+    )
+    cambiados = queryset.update(
+        estado_pedido=Case(
+            When(estado_pedido=PENDIENTE, then=Value(EN_CAMINO)),
+            default=Value(Pedido.EstadoPedido.ENTREGADO),
+        ),
+        fecha_envio=Case(When(estado_pedido=PENDIENTE, then=Value(ahora)), default=F('fecha_envio')),
+        fecha_entrega_estimada=Case(
+            When(estado_pedido=EN_CAMINO, then=Value(ahora)), default=F('fecha_entrega_estimada'),
+        ),
+        confirmado_cliente=Case(When(estado_pedido=EN_CAMINO, then=Value(True)), default=F('confirmado_cliente')),
+        confirmado_admin=Case(When(estado_pedido=EN_CAMINO, then=Value(True)), default=F('confirmado_admin')),
+    )
+    analitica.mover_estados(grupos, SIGUIENTE_ESTADO)
+    _despues_de_actualizar(slug, config, ids, ('estado_pedido',))
+    return cambiados
+
+
+ACCIONES = {
+    'activar': ('Activar', _activar(True)),
+    'desactivar': ('Desactivar', _activar(False)),
+    'reprecio': ('Ajustar precio (%)', reprecio),
+    'marcar_leido': ('Marcar como leído', _marcar_leido(True)),
+    'marcar_no_leido': ('Marcar como no leído', _marcar_leido(False)),
+    'avanzar_estado': ('Avanzar estado', avanzar_estado),
+    'borrar': ('Borrar', borrar),
+}
+
+
+def opciones(config):
+    return [(nombre, ACCIONES[nombre][0]) for nombre in config.get('acciones', [])]
+
+
+def ejecutar(slug, config, nombre, ids, parametro=None):
+    if nombre not in config.get('acciones', []):
+        raise AccionInvalida("Acción no disponible en este listado.")
+    ids = [int(pk) for pk in ids if str(pk).isdigit()]
+    if not ids:
+        raise AccionInvalida("No seleccionaste ningún registro.")
+    queryset = config['model'].objects.filter(pk__in=ids)
+    with transaction.atomic():
+        return ACCIONES[nombre][1](slug, config, queryset, ids, parametro)
@@ -0,0 +1,299 @@
+# app_clientes/analitica.py
+"""
+Resúmenes de ventas por hora y por día. Se mantienen al vuelo desde el
+checkout (crear_pedido) y desde los cambios de estado/método/total de un
+pedido (señales). Al borrar pedidos se recalculan sus días al confirmar.
+Altas o cambios de líneas hechos a mano en el panel no se siguen: `manage.py
+resumir_ventas` reconstruye todo desde el historial.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from asgiref.local import Local
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from .models import (
+    DescuentoPedido, DetallePedido, Pedido, ResumenDescuentoPromocion, ResumenPedidosEstado,
+    ResumenVentasCategoria, ResumenVentasHora, ResumenVentasProducto,
+)
+
+CERO = Decimal('0.00')
+CENTAVO = Decimal('0.01')
+TAMANO_LOTE = 1000
+RESUMENES = (
+    ResumenVentasHora, ResumenVentasProducto, ResumenVentasCategoria,
+    ResumenPedidosEstado, ResumenDescuentoPromocion,
+)
+
+
+def _acumular(model, llaves, filas):
+    """
+    Suma `filas` ({tupla de llaves: {campo: delta}}) sobre el resumen en una
+    sola sentencia INSERT ... ON CONFLICT DO UPDATE. Si el motor no la
+    soporta, cae a UPDATE con F() y CREATE por fila.
+    """
+    if not filas:
+        return
+    campos = list(next(iter(filas.values())))
+
+    if not connection.features.supports_update_conflicts_with_target:
+        for clave, deltas in filas.items():
+            filtro = dict(zip(llaves, clave))
+            if not model.objects.filter(**filtro).update(**{campo: F(campo) + deltas[campo] for campo in campos}):
+                model.objects.create(**filtro, **deltas)
+        return
+
+    q = connection.ops.quote_name
+    tabla = q(model._meta.db_table)
+    llaves_db = [model._meta.get_field(llave) for llave in llaves]
+    campos_db = [model._meta.get_field(campo) for campo in campos]
+    columnas = ', '.join(q(campo.column) for campo in llaves_db + campos_db)
+    marcadores = '(' + ', '.join(['%s'] * (len(llaves_db) + len(campos_db))) + ')'
+    params = []
+    for clave, deltas in filas.items():
+        for campo, valor in zip(llaves_db + campos_db, list(clave) + [deltas[nombre] for nombre in campos]):
+            params.append(campo.get_db_prep_value(valor, connection))
+    sql = (
+        f"INSERT INTO {tabla} ({columnas}) VALUES {', '.join([marcadores] * len(filas))} "
+        f"ON CONFLICT ({', '.join(q(campo.column) for campo in llaves_db)}) DO UPDATE SET "
+        + ', '.join(f"{q(campo.column)} = {tabla}.{q(campo.column)} + excluded.{q(campo.column)}" for campo in campos_db)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _momento(pedido):
+    local = timezone.localtime(pedido.fecha_pedido)
+    return local.date(), local.hour
+
+
+def registrar_pedido(pedido, detalles, por_promocion):
+    """Suma un pedido recién creado a todos los resúmenes: una sentencia por tabla."""
+    fecha, hora = _momento(pedido)
+    productos = defaultdict(lambda: {'unidades': 0, 'ingresos': CERO})
+    categorias = defaultdict(lambda: {'unidades': 0, 'ingresos': CERO})
+    for detalle in detalles:
+        importe = detalle.subtotal()
+        for fila in (productos[(fecha, detalle.producto_id)], categorias[(fecha, detalle.producto.categoria_id)]):
+            fila['unidades'] += detalle.cantidad
+            fila['ingresos'] += importe
+
+    _acumular(ResumenVentasHora, ('fecha', 'hora'), {(fecha, hora): {
+        'pedidos': 1,
+        'unidades': sum(detalle.cantidad for detalle in detalles),
+        'ingresos': pedido.total,
+        'descuentos': pedido.descuento_total,
+    }})
+    _acumular(ResumenVentasProducto, ('fecha', 'producto'), productos)
+    _acumular(ResumenVentasCategoria, ('fecha', 'categoria'), categorias)
+    _acumular(ResumenPedidosEstado, ('fecha', 'estado_pedido', 'metodo_pago'), {
+        (fecha, pedido.estado_pedido, pedido.metodo_pago): {'pedidos': 1, 'ingresos': pedido.total},
+    })
+    _acumular(ResumenDescuentoPromocion, ('fecha', 'promocion'), {
+        (fecha, promocion_id): {'pedidos': 1, 'descuento': monto} for promocion_id, monto in por_promocion.items()
+    })
+
+
+def registrar_cambio(pedido, estado, metodo_pago, total):
+    """Mueve el pedido de (estado, método, total) anteriores a los actuales."""
+    fecha, _ = _momento(pedido)
+    anterior = (fecha, estado, metodo_pago)
+    actual = (fecha, pedido.estado_pedido, pedido.metodo_pago)
+    if anterior == actual:
+        filas = {actual: {'pedidos': 0, 'ingresos': pedido.total - total}}
+    else:
+        filas = {
+            anterior: {'pedidos': -1, 'ingresos': -total},
+            actual: {'pedidos': 1, 'ingresos': pedido.total},
+        }
+    _acumular(ResumenPedidosEstado, ('fecha', 'estado_pedido', 'metodo_pago'), filas)
+
+
+def mover_estados(grupos, transicion):
+    """
+    Refleja un cambio de estado masivo (UPDATE sin señales). `grupos` son los
+    pedidos afectados agrupados por fecha/estado/método, leídos antes del UPDATE.
+    """
+    filas = defaultdict(lambda: {'pedidos': 0, 'ingresos': CERO})
+    for grupo in grupos:
+        nuevo = transicion.get(grupo['estado_pedido'])
+        if nuevo is None:
+            continue
+        ingresos = grupo['ingresos'] or CERO
+        anterior = filas[(grupo['fecha'], grupo['estado_pedido'], grupo['metodo_pago'])]
+        anterior['pedidos'] -= grupo['pedidos']
+        anterior['ingresos'] -= ingresos
+        actual = filas[(grupo['fecha'], nuevo, grupo['metodo_pago'])]
+        actual['pedidos'] += grupo['pedidos']
+        actual['ingresos'] += ingresos
+    _acumular(ResumenPedidosEstado, ('fecha', 'estado_pedido', 'metodo_pago'), filas)
+
+
+# ---------- Reconstrucción desde el historial ----------
+
+def _volcar(model, filas):
+    model.objects.bulk_create((model(**fila) for fila in filas), batch_size=TAMANO_LOTE)
+
+
+def _redondear(filas, *campos):
+    # SQLite suma decimales como REAL
+    for fila in filas:
+        for campo in campos:
+            fila[campo] = Decimal(fila[campo] or 0).quantize(CENTAVO)
+        yield fila
+
+
+def _en_dias(fechas, campo):
+    """El mismo día local que _momento(), como rangos sobre el datetime y no TruncDate en el WHERE."""
+    zona = timezone.get_current_timezone()
+    rangos = []
+    for fecha in fechas:
+        inicio = timezone.make_aware(datetime.combine(fecha, time.min), zona)
+        fin = timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min), zona)
+        rangos.append(Q(**{f'{campo}__gte': inicio, f'{campo}__lt': fin}))
+    return reduce(or_, rangos)
+
+
+def reconstruir(fechas=None):
+    """
+    Recalcula los resúmenes con un GROUP BY por tabla; con `fechas`, solo esos
+    días. Las categorías se toman del producto tal como está hoy y los
+    descuentos por promoción solo existen para pedidos que guardaron su
+    desglose (DescuentoPedido).
+    """
+    importe = DecimalField(max_digits=14, decimal_places=2)
+    pedidos = Pedido.objects.annotate(fecha=TruncDate('fecha_pedido'), hora=ExtractHour('fecha_pedido'))
+    detalles = DetallePedido.objects.annotate(
+        fecha=TruncDate('pedido__fecha_pedido'), hora=ExtractHour('pedido__fecha_pedido'),
+        importe=ExpressionWrapper(F('cantidad') * F('precio_unitario_venta'), output_field=importe),
+    )
+    descuentos = DescuentoPedido.objects.annotate(fecha=TruncDate('pedido__fecha_pedido'))
+    if fechas is not None:
+        fechas = sorted(set(fechas))
+        if not fechas:
+            return {}
+        pedidos = pedidos.filter(_en_dias(fechas, 'fecha_pedido'))
+        detalles = detalles.filter(_en_dias(fechas, 'pedido__fecha_pedido'))
+        descuentos = descuentos.filter(_en_dias(fechas, 'pedido__fecha_pedido'))
+
+    with transaction.atomic():
+        for model in RESUMENES:
+            existentes = model.objects.all() if fechas is None else model.objects.filter(fecha__in=fechas)
+            existentes.delete()
+
+        unidades = {
+            (fila['fecha'], fila['hora']): fila['unidades']
+            for fila in detalles.values('fecha', 'hora').annotate(unidades=Sum('cantidad')).order_by()
+        }
+        horas = pedidos.values('fecha', 'hora').annotate(
+            pedidos=Count('pk'), ingresos=Sum('total'), descuentos=Sum('descuento_total'),
+        ).order_by()
+        _volcar(ResumenVentasHora, (
+            dict(fila, unidades=unidades.get((fila['fecha'], fila['hora']), 0))
+            for fila in _redondear(horas.iterator(), 'ingresos', 'descuentos')
+        ))
+
+        por_producto = detalles.values('fecha', 'producto_id').annotate(
+            unidades=Sum('cantidad'), ingresos=Sum('importe'),
+        ).order_by()
+        _volcar(ResumenVentasProducto, _redondear(por_producto.iterator(), 'ingresos'))
+
+        por_categoria = detalles.values('fecha', categoria_id=F('producto__categoria_id')).annotate(
+            unidades=Sum('cantidad'), ingresos=Sum('importe'),
+        ).order_by()
+        _volcar(ResumenVentasCategoria, _redondear(por_categoria.iterator(), 'ingresos'))
+
+        por_estado = pedidos.values('fecha', 'estado_pedido', 'metodo_pago').annotate(
+            pedidos=Count('pk'), ingresos=Sum('total'),
+        ).order_by()
+        _volcar(ResumenPedidosEstado, _redondear(por_estado.iterator(), 'ingresos'))
+
+        por_promocion = descuentos.values(
+            'fecha', 'promocion_id',
+        ).annotate(pedidos=Count('pedido_id'), descuento=Sum('monto')).order_by()
+        _volcar(ResumenDescuentoPromocion, _redondear(por_promocion.iterator(), 'descuento'))
+
+    return {model.__name__: model.objects.count() for model in RESUMENES}
+
+
+_dias_por_rehacer = Local()
+
+
+def _rehacer_pendientes():
+    fechas = getattr(_dias_por_rehacer, 'fechas', set())
+    _dias_por_rehacer.fechas = set()
+    reconstruir(fechas)
+
+
+def rehacer_dia_al_confirmar(pedido):
+    """
+    Recalcula el día del pedido cuando la transacción se confirme. Borrar
+    cien pedidos del mismo día lo recalcula una sola vez: el primer callback
+    hace el trabajo y los demás encuentran el conjunto vacío. Si la
+    transacción se revierte, sus días se rehacen con el siguiente commit,
+    lo que no cambia nada.
+    """
+    if not hasattr(_dias_por_rehacer, 'fechas'):
+        _dias_por_rehacer.fechas = set()
+    _dias_por_rehacer.fechas.add(_momento(pedido)[0])
+    transaction.on_commit(_rehacer_pendientes)
+
+
+# ---------- Lectura para el dashboard ----------
+
+def resumen_dashboard(dias=30):
+    """
+    Todo lo que muestra el dashboard, leído solo de los resúmenes: el costo
+    depende de los días y productos del periodo, no de cuántos pedidos hay.
+    """
+    hoy = timezone.localdate()
+    desde = hoy - timedelta(days=dias - 1)
+    horas = ResumenVentasHora.objects.filter(fecha__gte=desde)
+
+    totales = horas.aggregate(
+        pedidos=Sum('pedidos'), unidades=Sum('unidades'), ingresos=Sum('ingresos'), descuentos=Sum('descuentos'),
+    )
+    estados = list(
+        ResumenPedidosEstado.objects.filter(fecha__gte=desde).values('estado_pedido')
+        .annotate(pedidos=Sum('pedidos'), ingresos=Sum('ingresos')).filter(pedidos__gt=0).order_by('estado_pedido')
+    )
+    etiquetas_estado = dict(Pedido.EstadoPedido.choices)
+    for fila in estados:
+        fila['etiqueta'] = etiquetas_estado.get(fila['estado_pedido'], fila['estado_pedido'])
+    metodos = list(
+        ResumenPedidosEstado.objects.filter(fecha__gte=desde).values('metodo_pago')
+        .annotate(pedidos=Sum('pedidos'), ingresos=Sum('ingresos')).filter(pedidos__gt=0).order_by('-pedidos')
+    )
+    etiquetas_pago = dict(Pedido.MetodoPago.choices)
+    for fila in metodos:
+        fila['etiqueta'] = etiquetas_pago.get(fila['metodo_pago'], fila['metodo_pago'])
+
+    return {
+        'dias': dias,
+        'totales': {clave: valor or 0 for clave, valor in totales.items()},
+        # La tarjeta de pedidos cuenta todo el historial; las tablas, el periodo
+        'total_pedidos': ResumenPedidosEstado.objects.aggregate(total=Sum('pedidos'))['total'] or 0,
+        'por_dia': list(horas.values('fecha').annotate(pedidos=Sum('pedidos'), ingresos=Sum('ingresos')).order_by('fecha')),
+        'hoy_por_hora': list(horas.filter(fecha=hoy).order_by('hora').values('hora', 'pedidos', 'ingresos')),
+        'top_productos': list(
+            ResumenVentasProducto.objects.filter(fecha__gte=desde).values('producto__nombre')
+            .annotate(unidades=Sum('unidades'), ingresos=Sum('ingresos')).order_by('-ingresos')[:5]
+        ),
+        'top_categorias': list(
+            ResumenVentasCategoria.objects.filter(fecha__gte=desde).values('categoria__nombre')
+            .annotate(unidades=Sum('unidades'), ingresos=Sum('ingresos')).order_by('-ingresos')[:5]
+        ),
+        'estados': estados,
+        'metodos_pago': metodos,
+        'descuentos_promocion': list(
+            ResumenDescuentoPromocion.objects.filter(fecha__gte=desde).values('promocion__nombre')
+            .annotate(pedidos=Sum('pedidos'), descuento=Sum('descuento')).order_by('-descuento')[:5]
+        ),
+    }
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AppClientesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_clientes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,161 @@
+# app_clientes/busqueda.py
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+LIMITE_RESULTADOS = 500
+TABLA_FTS = 'app_clientes_producto_busqueda'
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos: 'Café Orgánico' -> 'cafe organico'."""
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def terminos(texto):
+    return re.findall(r'[^\W_]+', normalizar(texto))
+
+
+def ordenar_por_rango(queryset, ids):
+    posiciones = {pk: i for i, pk in enumerate(ids)}
+    return sorted(queryset.filter(pk__in=ids), key=lambda producto: posiciones[producto.pk])
+
+
+class BackendBusqueda:
+    """Interfaz común: los backends deciden cómo indexar y cómo buscar productos."""
+
+    def buscar(self, queryset, texto):
+        raise NotImplementedError
+
+    def indexar(self, ids):
+        pass
+
+    def eliminar(self, ids):
+        pass
+
+    def reconstruir(self):
+        pass
+
+
+class BackendIcontains(BackendBusqueda):
+    """El LIKE de siempre; sirve de respaldo y de referencia en el benchmark."""
+
+    def buscar(self, queryset, texto):
+        return queryset.filter(
+            Q(nombre__icontains=texto) |
+            Q(descripcion__icontains=texto) |
+            Q(categoria__nombre__icontains=texto)
+        )
+
+
+class BackendSQLiteFTS5(BackendBusqueda):
+    """
+    Índice FTS5 con tokenizador unicode61 sin diacríticos, búsqueda por
+    prefijo y orden por bm25 (el nombre pesa más que la categoría y esta más
+    que la descripción).
+    """
+
+    PESOS = (10.0, 1.0, 4.0)  # nombre, descripcion, categoria
+
+    def consulta(self, texto):
+        return ' '.join(f'"{termino}"*' for termino in terminos(texto))
+
+    def buscar(self, queryset, texto):
+        consulta = self.consulta(texto)
+        if not consulta:
+            return queryset.none()
+        # Misma base que el queryset (réplica incluida) y sus filtros dentro de la consulta
+        # FTS: el LIMIT se aplica a productos que sí pueden salir en el listado
+        alias = queryset.db
+        filtro, parametros = queryset.order_by().values('pk').query.get_compiler(using=alias).as_sql()
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s AND rowid IN ({filtro}) "
+                f"ORDER BY bm25({TABLA_FTS}, %s, %s, %s) LIMIT %s",
+                [consulta, *parametros, *self.PESOS, LIMITE_RESULTADOS],
+            )
+            ids = [fila[0] for fila in cursor.fetchall()]
+        return ordenar_por_rango(queryset, ids)
+
+    def indexar(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        marcadores = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid IN ({marcadores})", ids)
+            cursor.execute(
+                f"INSERT INTO {TABLA_FTS} (rowid, nombre, descripcion, categoria) "
+                f"SELECT p.id, p.nombre, p.descripcion, c.nombre "
+                f"FROM app_clientes_producto p JOIN app_clientes_categoria c ON c.id = p.categoria_id "
+                f"WHERE p.id IN ({marcadores})",
+                ids,
+            )
+
+    def eliminar(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        marcadores = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid IN ({marcadores})", ids)
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_FTS}")
+            cursor.execute(
+                f"INSERT INTO {TABLA_FTS} (rowid, nombre, descripcion, categoria) "
+                f"SELECT p.id, p.nombre, p.descripcion, c.nombre "
+                f"FROM app_clientes_producto p JOIN app_clientes_categoria c ON c.id = p.categoria_id"
+            )
+
+
+class BackendPostgres(BackendBusqueda):
+    """
+    Búsqueda de texto completo de Postgres. Para no depender de acentos,
+    configura BUSQUEDA_PRODUCTOS_PG_CONFIG con una configuración que use
+    unaccent (por ejemplo 'es_unaccent') y crea un índice GIN sobre el mismo
+    SearchVector.
+    """
+
+    def buscar(self, queryset, texto):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        lista = terminos(texto)
+        if not lista:
+            return queryset.none()
+        config = getattr(settings, 'BUSQUEDA_PRODUCTOS_PG_CONFIG', 'spanish')
+        vector = (
+            SearchVector('nombre', weight='A', config=config) +
+            SearchVector('categoria__nombre', weight='B', config=config) +
+            SearchVector('descripcion', weight='C', config=config)
+        )
+        consulta = SearchQuery(' & '.join(f'{termino}:*' for termino in lista), search_type='raw', config=config)
+        return (
+            queryset.annotate(rango=SearchRank(vector, consulta))
+            .filter(rango__gt=0)
+            .order_by('-rango')[:LIMITE_RESULTADOS]
+        )
+
+
+BACKENDS_POR_MOTOR = {
+    'sqlite': BackendSQLiteFTS5,
+    'postgresql': BackendPostgres,
+}
+
+
+def obtener_backend():
+    """BUSQUEDA_PRODUCTOS_BACKEND permite forzar un backend por ruta de import."""
+    ruta = getattr(settings, 'BUSQUEDA_PRODUCTOS_BACKEND', None)
+    if ruta:
+        return import_string(ruta)()
+    return BACKENDS_POR_MOTOR.get(connection.vendor, BackendIcontains)()
+
+
+def buscar_productos(queryset, texto):
+    return obtener_backend().buscar(queryset, texto)
@@ -0,0 +1,209 @@
+# app_clientes/busqueda_admin.py
+from collections import defaultdict
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_init, post_save
+from django.utils import timezone
+
+from .busqueda import terminos
+from .models import IndiceBusquedaAdmin, TokenBusquedaAdmin
+
+LARGO_TOKEN = 64
+TAMANO_LOTE = 1000
+
+
+def _crud_config():
+    from .views import CRUD_CONFIG
+    return CRUD_CONFIG
+
+
+def _valores(obj, ruta):
+    """Sigue 'cliente__user__username' sobre el objeto; tolera relaciones vacías."""
+    for parte in ruta.split('__'):
+        if obj is None:
+            return ''
+        obj = getattr(obj, parte, '')
+    return '' if obj is None else str(obj)
+
+
+def tokens_de(obj, search_fields):
+    tokens = set()
+    for ruta in search_fields:
+        tokens.update(termino[:LARGO_TOKEN] for termino in terminos(_valores(obj, ruta)))
+    return tokens
+
+
+def _relaciones(config):
+    """select_related necesario para leer todos los search_fields sin N+1."""
+    rutas = set()
+    for ruta in config.get('search_fields', []):
+        partes = ruta.split('__')[:-1]
+        if partes:
+            rutas.add('__'.join(partes))
+    return sorted(rutas)
+
+
+def indexar(slug, objetos):
+    config = _crud_config()[slug]
+    objetos = list(objetos)
+    if not objetos:
+        return
+    filas = [
+        (slug, token, obj.pk)
+        for obj in objetos
+        for token in tokens_de(obj, config.get('search_fields', []))
+    ]
+    # executemany directo: armar una instancia del modelo por token dominaba el costo de las cargas masivas
+    q = connection.ops.quote_name
+    insertar = f"INSERT INTO {q(TokenBusquedaAdmin._meta.db_table)} ({q('slug')}, {q('token')}, {q('objeto_id')}) VALUES (%s, %s, %s)"
+    with transaction.atomic():
+        TokenBusquedaAdmin.objects.filter(slug=slug, objeto_id__in=[obj.pk for obj in objetos]).delete()
+        with connection.cursor() as cursor:
+            cursor.executemany(insertar, filas)
+
+
+def indexar_ids(slug, ids):
+    config = _crud_config()[slug]
+    ids = list(ids)
+    for inicio in range(0, len(ids), TAMANO_LOTE):
+        lote = ids[inicio:inicio + TAMANO_LOTE]
+        indexar(slug, config['model'].objects.filter(pk__in=lote).select_related(*_relaciones(config)))
+
+
+def desindexar(slug, ids):
+    TokenBusquedaAdmin.objects.filter(slug=slug, objeto_id__in=list(ids)).delete()
+
+
+def _indexar_en_lotes(slug, queryset):
+    lote = []
+    total = 0
+    for obj in queryset.iterator(chunk_size=TAMANO_LOTE):
+        lote.append(obj)
+        if len(lote) >= TAMANO_LOTE:
+            indexar(slug, lote)
+            total += len(lote)
+            lote = []
+    indexar(slug, lote)
+    return total + len(lote)
+
+
+def _queryset_indexable(slug):
+    config = _crud_config()[slug]
+    return config['model'].objects.select_related(*_relaciones(config)).order_by('pk')
+
+
+def reconstruir(slug):
+    """
+    Vuelve a indexar todo el listado. Mientras corre, y hasta que termine,
+    filtrar() sigue con icontains: las filas que se guardan entretanto ya
+    tienen tokens, pero eso no quiere decir que el índice esté completo.
+    """
+    IndiceBusquedaAdmin.objects.filter(slug=slug).delete()
+    TokenBusquedaAdmin.objects.filter(slug=slug).delete()
+    total = _indexar_en_lotes(slug, _queryset_indexable(slug))
+    IndiceBusquedaAdmin.objects.update_or_create(slug=slug, defaults={'construido_en': timezone.now()})
+    return total
+
+
+def reindexar_relacionados(slug, ruta, pk):
+    """Las filas del listado que llegan a `pk` por `ruta` (p. ej. los pedidos de un usuario)."""
+    return _indexar_en_lotes(slug, _queryset_indexable(slug).filter(**{ruta: pk}))
+
+
+def filtrar(slug, config, queryset, texto):
+    """
+    Filtra el listado usando el índice: cada término se busca por rango de
+    prefijo sobre (slug, token), sin recorrer las tablas relacionadas.
+    Hasta que reconstruir() termina el índice de ese listado, cae al
+    icontains de siempre.
+    """
+    lista = terminos(texto)
+    if not lista:
+        return queryset
+    if not IndiceBusquedaAdmin.objects.filter(slug=slug).exists():
+        q_objects = Q()
+        for field in config.get('search_fields', []):
+            q_objects |= Q(**{f"{field}__icontains": texto})
+        return queryset.filter(q_objects)
+
+    for termino in lista:
+        termino = termino[:LARGO_TOKEN]
+        coincidencias = TokenBusquedaAdmin.objects.filter(
+            slug=slug, token__gte=termino, token__lt=termino + '\uffff'
+        ).values('objeto_id')
+        queryset = queryset.filter(pk__in=coincidencias)
+    return queryset
+
+
+# ---------- Mantenimiento incremental por señales ----------
+
+def _dependientes():
+    """
+    Para cada modelo, qué listados hay que reindexar cuando cambia:
+    {Model: [(slug, ruta_hacia_el_modelo o None, campos_locales)]}.
+    """
+    mapa = defaultdict(list)
+    for slug, config in _crud_config().items():
+        campos = defaultdict(set)
+        for ruta in config.get('search_fields', []):
+            partes = ruta.split('__')
+            model = config['model']
+            for profundidad in range(len(partes)):
+                campos[(model, '__'.join(partes[:profundidad]) or None)].add(partes[profundidad])
+                if profundidad < len(partes) - 1:
+                    model = model._meta.get_field(partes[profundidad]).related_model
+        for (model, ruta), locales in campos.items():
+            mapa[model].append((slug, ruta, locales))
+    return mapa
+
+
+def _valores_indexados(instance, campos):
+    # Solo lo ya cargado: con .only() no debe salir una query por fila
+    return {campo: instance.__dict__.get(instance._meta.get_field(campo).attname) for campo in campos}
+
+
+def _cambiaron(original, actuales, campos):
+    return any(original.get(campo) is None or original[campo] != actuales[campo] for campo in campos)
+
+
+def conectar_senales():
+    """
+    Solo post_save: los tokens de un objeto borrado no estorban porque filtrar()
+    siempre cruza contra la tabla viva, y un receptor de post_delete obligaría
+    a Django a borrar fila por fila (sin fast delete). Los borrados masivos
+    llaman a desindexar() y reconstruir() limpia lo que quede.
+
+    Un cambio en un modelo relacionado (el username de un User, el nombre de
+    un Producto) puede tocar miles de filas: solo se reindexan si cambió un
+    campo indexado, al confirmar la transacción y por lotes.
+    """
+    for model, dependientes in _dependientes().items():
+        vigilados = set().union(*(locales for _, ruta, locales in dependientes if ruta is not None))
+
+        def recordar(sender, instance, _vigilados=vigilados, **kwargs):
+            instance._busqueda_admin_original = _valores_indexados(instance, _vigilados)
+
+        def al_guardar(sender, instance, created=False, update_fields=None,
+                       _dependientes=dependientes, _vigilados=vigilados, **kwargs):
+            original = getattr(instance, '_busqueda_admin_original', {})
+            actuales = _valores_indexados(instance, _vigilados)
+            instance._busqueda_admin_original = actuales
+            for slug, ruta, locales in _dependientes:
+                if update_fields is not None and not (set(update_fields) & _campos_o_ids(locales)):
+                    continue
+                if ruta is None:
+                    indexar_ids(slug, [instance.pk])
+                elif not created and _cambiaron(original, actuales, locales):
+                    # Una fila recién creada todavía no tiene quién la apunte
+                    transaction.on_commit(partial(reindexar_relacionados, slug, ruta, instance.pk))
+
+        if vigilados:
+            post_init.connect(recordar, sender=model, weak=False, dispatch_uid=f'busqueda_admin_init_{model._meta.label}')
+        post_save.connect(al_guardar, sender=model, weak=False, dispatch_uid=f'busqueda_admin_save_{model._meta.label}')
+
+
+def _campos_o_ids(campos):
+    # update_fields usa el nombre del campo; para FKs también aceptamos el *_id
+    return campos | {f'{campo}_id' for campo in campos}
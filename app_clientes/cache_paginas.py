@@ -0,0 +1,116 @@
+# app_clientes/cache_paginas.py
+"""
+Caché de página completa para visitantes anónimos en las vistas públicas.
+La llave es la URL más las versiones del contenido que muestra la página,
+así que editar un producto, promoción, categoría o novedad la invalida sin
+borrar nada. Usuarios con sesión iniciada y visitas con mensajes pendientes
+pasan directo a la vista. La vista que llena la caché lee de la primaria
+(ver replicas.py). Sirve igual para vistas async.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .replicas import en_primaria
+
+PREFIJO = 'circley:pagina:'
+
+
+def _tiempo():
+    # Acota lo que no mueve versiones (p. ej. el stock de los destacados del inicio)
+    return getattr(settings, 'PAGINAS_ANONIMAS_SEGUNDOS', 300)
+
+
+def _se_puede_cachear(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # len() no marca los mensajes como leídos; si hay, la página es de este visitante
+    return not len(messages.get_messages(request))
+
+
+async def _se_puede_cachear_async(request):
+    if request.method not in ('GET', 'HEAD') or (await request.auser()).is_authenticated:
+        return False
+    # Los mensajes pueden estar en la sesión, que es síncrona: la misma revisión en un hilo
+    return await sync_to_async(_se_puede_cachear)(request)
+
+
+def _clave(request, llave):
+    base = f"{request.get_full_path()}|{llave}"
+    return PREFIJO + hashlib.md5(base.encode()).hexdigest()
+
+
+def _guardar(clave, respuesta):
+    # Una cookie (CSRF, sesión) haría la página de este visitante
+    if respuesta.status_code != 200 or respuesta.streaming or respuesta.cookies:
+        return None
+    cuerpo = respuesta.content
+    guardada = {
+        'cuerpo': cuerpo,
+        'tipo': respuesta['Content-Type'],
+        'etag': quote_etag(hashlib.sha256(cuerpo).hexdigest()[:32]),
+        'fecha': int(time.time()),
+    }
+    cache.set(clave, guardada, _tiempo())
+    return guardada
+
+
+def _respuesta(request, guardada):
+    respuesta = HttpResponse(guardada['cuerpo'], content_type=guardada['tipo'])
+    respuesta['ETag'] = guardada['etag']
+    respuesta['Last-Modified'] = http_date(guardada['fecha'])
+    respuesta = get_conditional_response(
+        request, etag=guardada['etag'], last_modified=int(guardada['fecha']), response=respuesta,
+    )
+    # El navegador revalida siempre: con el ETag la respuesta suele ser un 304 vacío
+    patch_cache_control(respuesta, max_age=0, must_revalidate=True)
+    patch_vary_headers(respuesta, ('Cookie',))
+    return respuesta
+
+
+def cache_anonima(llave_contenido):
+    """
+    Decorador para vistas públicas. `llave_contenido()` devuelve las
+    versiones de lo que muestra la página; entra en la llave junto con la URL.
+    En vistas async, `llave_contenido` también es async.
+    """
+    def decorador(vista):
+        if iscoroutinefunction(vista):
+            @wraps(vista)
+            async def envoltura_async(request, *args, **kwargs):
+                if not await _se_puede_cachear_async(request):
+                    return await vista(request, *args, **kwargs)
+                clave = _clave(request, await llave_contenido())
+                guardada = cache.get(clave)
+                if guardada is None:
+                    with en_primaria():
+                        respuesta = await vista(request, *args, **kwargs)
+                    guardada = _guardar(clave, respuesta)
+                    if guardada is None:
+                        return respuesta
+                return _respuesta(request, guardada)
+            return envoltura_async
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if not _se_puede_cachear(request):
+                return vista(request, *args, **kwargs)
+            clave = _clave(request, llave_contenido())
+            guardada = cache.get(clave)
+            if guardada is None:
+                with en_primaria():
+                    respuesta = vista(request, *args, **kwargs)
+                guardada = _guardar(clave, respuesta)
+                if guardada is None:
+                    return respuesta
+            return _respuesta(request, guardada)
+        return envoltura
+    return decorador
@@ -0,0 +1,89 @@
+# app_clientes/consultas.py
+from django.core.exceptions import FieldDoesNotExist
+
+_PLANES = {}
+
+# Modelos ajenos a la app a los que no podemos declararles `dependencias`
+DEPENDENCIAS_EXTERNAS = {
+    'auth.user': {'__str__': ('username',)},
+}
+
+
+def _dependencias(model):
+    return getattr(model, 'dependencias', None) or DEPENDENCIAS_EXTERNAS.get(model._meta.label_lower, {})
+
+
+class PlanConsulta:
+    """Joins y columnas que necesita un listado para no hacer queries por fila."""
+
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.only = set()
+        self.completo = True  # False si algún campo no se pudo resolver a columnas
+
+    def aplicar(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(self.prefetch_related))
+        if self.completo and self.only:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def _expandir(plan, model, ruta, prefijo=''):
+    dependencias = _dependencias(model)
+    if ruta in dependencias:
+        for dependencia in dependencias[ruta]:
+            _expandir(plan, model, dependencia, prefijo)
+        return
+
+    nombre, _, resto = ruta.partition('__')
+    if nombre == 'pk':
+        return
+    try:
+        campo = model._meta.get_field(nombre)
+    except FieldDoesNotExist:
+        # Propiedad o método sin dependencias declaradas: no podemos recortar columnas
+        plan.completo = False
+        return
+
+    if campo.many_to_many or campo.one_to_many:
+        plan.prefetch_related.add(prefijo + nombre)
+        return
+
+    if campo.is_relation:
+        plan.select_related.add(prefijo + nombre)
+        plan.only.add(prefijo + nombre)
+        relacionado = campo.related_model
+        if resto:
+            _expandir(plan, relacionado, resto, f'{prefijo}{nombre}__')
+        elif '__str__' in _dependencias(relacionado):
+            _expandir(plan, relacionado, '__str__', f'{prefijo}{nombre}__')
+        else:
+            plan.completo = False
+        return
+
+    plan.only.add(prefijo + nombre)
+
+
+def planear(model, campos):
+    """
+    Deriva select_related/prefetch_related/only() a partir de los campos que
+    se van a leer, siguiendo las `dependencias` declaradas en cada modelo
+    (por ejemplo, qué columnas usa su __str__).
+    """
+    plan = PlanConsulta()
+    for campo in campos:
+        _expandir(plan, model, campo.lstrip('-'))
+    return plan
+
+
+def plan_listado(slug, config):
+    """Plan del listado CRUD: list_fields más los campos de orden de la paginación."""
+    if slug not in _PLANES:
+        model = config['model']
+        orden = config.get('paginacion', {}).get('orden') or model._meta.ordering or []
+        _PLANES[slug] = planear(model, list(config['list_fields']) + list(orden))
+    return _PLANES[slug]
@@ -1,19 +1,46 @@
 # app_clientes/context_processors.py
-from .models import Categoria, Carrito
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils.functional import SimpleLazyObject
+
+from .models import Categoria, Carrito, ItemCarrito
+from .replicas import en_primaria
+from .versiones import obtener_version
+
+TIEMPO_CACHE_MENU = 60 * 60
+
+
+def categorias_menu():
+    """Categorías del menú, cacheadas hasta que se edite alguna Categoria."""
+    clave = f"circley:menu:categorias:{obtener_version('categorias')}"
+    categorias = cache.get(clave)
+    if categorias is None:
+        with en_primaria():
+            categorias = list(Categoria.objects.only('id', 'nombre'))
+        cache.set(clave, categorias, TIEMPO_CACHE_MENU)
+    return categorias
+
+
+def _es_cliente(request):
+    return request.user.is_authenticated and hasattr(request.user, 'cliente')
 
 
 def menu_context(request):
-    categorias = Categoria.objects.all()
-    carrito_activo = None
-    total_items = 0
+    # Todo es perezoso: las plantillas que no usan estas variables no pagan queries
+    def carrito_activo():
+        if not _es_cliente(request):
+            return None
+        return Carrito.objects.filter(cliente=request.user.cliente, activo=True).first()
 
-    if request.user.is_authenticated and hasattr(request.user, 'cliente'):
-        carrito_activo = Carrito.objects.filter(cliente=request.user.cliente, activo=True).first()
-        if carrito_activo:
-            total_items = sum(item.cantidad for item in carrito_activo.items.all())
+    def total_items():
+        if not _es_cliente(request):
+            return 0
+        return ItemCarrito.objects.filter(
+            carrito__cliente=request.user.cliente, carrito__activo=True
+        ).aggregate(total=Sum('cantidad'))['total'] or 0
 
     return {
-        'categorias_menu': categorias,
-        'carrito_activo': carrito_activo,
-        'carrito_total_items': total_items,
-    }
\ No newline at end of file
+        'categorias_menu': SimpleLazyObject(categorias_menu),
+        'carrito_activo': SimpleLazyObject(carrito_activo),
+        'carrito_total_items': SimpleLazyObject(total_items),
+    }
@@ -8,6 +8,15 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    /* --- Seleccionar todas las filas de un listado del panel --- */
+    document.querySelectorAll('.acciones-masivas .seleccionar-todos').forEach(todos => {
+        todos.addEventListener('change', () => {
+            todos.closest('form').querySelectorAll('input[name="seleccion"]').forEach(casilla => {
+                casilla.checked = todos.checked;
+            });
+        });
+    });
+
     /* --- Auto-cierre de mensajes flash --- */
     document.querySelectorAll('.alerta').forEach(msg => {
         setTimeout(() => msg.classList.add('fade-out'), 4500);
@@ -0,0 +1,81 @@
+# app_clientes/exportacion.py
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+TAMANO_LOTE = 2000
+TAMANO_BLOQUE = 64 * 1024
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def valor_campo(obj, campo):
+    """Lo que muestra el listado en una columna: llama métodos y deja None como ''."""
+    valor = getattr(obj, campo, '')
+    if callable(valor):
+        valor = valor()
+    return '' if valor is None else valor
+
+
+class _Eco:
+    """csv.writer escribe aquí y recibimos la línea de vuelta sin acumularla."""
+
+    def write(self, texto):
+        return texto
+
+
+def _lineas_csv(objetos, campos, encabezados):
+    escritor = csv.writer(_Eco())
+    yield '\ufeff' + escritor.writerow(encabezados)  # BOM para que Excel respete los acentos
+    for obj in objetos:
+        yield escritor.writerow([str(valor_campo(obj, campo)) for campo in campos])
+
+
+def _lineas_jsonl(objetos, campos, encabezados):
+    for obj in objetos:
+        fila = {}
+        for campo in campos:
+            valor = valor_campo(obj, campo)
+            fila[campo] = str(valor) if isinstance(valor, models.Model) else valor
+        yield json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _en_bloques(lineas):
+    # Una escritura por fila sería demasiado chica para el socket
+    bloque = []
+    tamano = 0
+    for linea in lineas:
+        bloque.append(linea)
+        tamano += len(linea)
+        if tamano >= TAMANO_BLOQUE:
+            yield ''.join(bloque).encode()
+            bloque = []
+            tamano = 0
+    if bloque:
+        yield ''.join(bloque).encode()
+
+
+def _comprimir(bloques):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # contenedor gzip
+    for bloque in bloques:
+        datos = compresor.compress(bloque)
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+
+def exportar(queryset, campos, encabezados, formato='csv', comprimir=False):
+    """
+    Generador de bytes para StreamingHttpResponse: recorre la consulta con
+    .iterator() en lotes, así que la memoria no depende del número de filas
+    y el primer bloque sale en cuanto llega el primer lote.
+    """
+    generador = _lineas_csv if formato == 'csv' else _lineas_jsonl
+    objetos = queryset.iterator(chunk_size=TAMANO_LOTE)
+    bloques = _en_bloques(generador(objetos, campos, encabezados))
+    return _comprimir(bloques) if comprimir else bloques
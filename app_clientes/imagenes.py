@@ -0,0 +1,163 @@
+# app_clientes/imagenes.py
+"""
+Variantes redimensionadas (WebP y JPEG) de las imágenes subidas. Se guardan
+en MEDIA_ROOT/derivados con el hash del contenido en la ruta, así que la URL
+de una variante nunca cambia de contenido y dos subidas iguales comparten
+archivos. `derivar` solo toca archivos (corre en procesos aparte en el
+backfill); `registrar` guarda el manifiesto en la base y en la caché.
+"""
+import hashlib
+import io
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import ImagenDerivada
+from .replicas import en_primaria, lee_de_replica
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_CACHE = 'circley:imagen:'
+# Segundos que se recuerda que una imagen aún no tiene variantes
+TIEMPO_PENDIENTE = 60
+CARPETA = 'derivados'
+# formato de la URL -> (formato de Pillow, opciones de guardado)
+FORMATOS = {
+    'webp': ('WEBP', {'method': 4}),
+    'jpg': ('JPEG', {'optimize': True, 'progressive': True}),
+}
+ORIENTACION = 0x0112  # etiqueta EXIF; 5 a 8 giran la imagen 90°
+ERRORES_IMAGEN = (OSError, UnidentifiedImageError, Image.DecompressionBombError)
+
+
+def anchos_configurados():
+    return tuple(sorted(getattr(settings, 'IMAGENES_ANCHOS', (160, 320, 640, 1024))))
+
+
+def nombre_variante(huella, ancho, extension):
+    return f'{CARPETA}/{huella[:2]}/{huella}/{ancho}.{extension}'
+
+
+def _anchos_para(ancho_original):
+    # Nunca se agranda: la variante mayor es la original si es más chica que el tope
+    anchos = anchos_configurados()
+    return sorted({ancho for ancho in anchos if ancho < ancho_original} | {min(ancho_original, anchos[-1])})
+
+
+def _aplanar(imagen):
+    # JPEG no tiene transparencia: se pinta sobre blanco
+    if imagen.mode in ('RGBA', 'LA') or (imagen.mode == 'P' and 'transparency' in imagen.info):
+        imagen = imagen.convert('RGBA')
+        fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+        fondo.paste(imagen, mask=imagen.getchannel('A'))
+        return fondo
+    return imagen.convert('RGB')
+
+
+def derivar(nombre, storage=None, forzar=False):
+    """
+    Genera las variantes de `nombre` que falten. No usa la base de datos, así
+    que se puede llamar desde un proceso del pool. Devuelve el manifiesto.
+    """
+    storage = storage or default_storage
+    with storage.open(nombre, 'rb') as archivo:
+        datos = archivo.read()
+    huella = hashlib.sha256(datos).hexdigest()[:32]
+    calidad = getattr(settings, 'IMAGENES_CALIDAD', 80)
+
+    with Image.open(io.BytesIO(datos)) as fuente:
+        # Medidas sin decodificar: si ya están todas las variantes no se toca el pixel
+        ancho, alto = fuente.size
+        if fuente.getexif().get(ORIENTACION, 1) in (5, 6, 7, 8):
+            ancho, alto = alto, ancho
+        anchos = _anchos_para(ancho)
+        pendientes = [
+            (objetivo, extension) for objetivo in anchos for extension in FORMATOS
+            if forzar or not storage.exists(nombre_variante(huella, objetivo, extension))
+        ]
+        if pendientes:
+            imagen = ImageOps.exif_transpose(fuente)
+            if imagen.mode not in ('RGB', 'RGBA'):
+                transparente = imagen.mode in ('LA', 'PA') or 'transparency' in imagen.info
+                imagen = imagen.convert('RGBA' if transparente else 'RGB')
+            # Cada ancho sale del anterior (ya más chico), no de la original
+            reducidas = {}
+            actual = imagen
+            for objetivo in sorted({objetivo for objetivo, _ in pendientes}, reverse=True):
+                actual = actual.resize((objetivo, max(1, round(alto * objetivo / ancho))), Image.LANCZOS, reducing_gap=3.0)
+                reducidas[objetivo] = actual
+            for objetivo, extension in pendientes:
+                formato, opciones = FORMATOS[extension]
+                variante = reducidas[objetivo] if formato == 'WEBP' else _aplanar(reducidas[objetivo])
+                salida = io.BytesIO()
+                variante.save(salida, formato, quality=calidad, **opciones)
+                destino = nombre_variante(huella, objetivo, extension)
+                if forzar and storage.exists(destino):
+                    storage.delete(destino)
+                storage.save(destino, ContentFile(salida.getvalue()))
+
+    return {'huella': huella, 'ancho': ancho, 'alto': alto, 'anchos': anchos}
+
+
+def _clave(nombre):
+    # Los nombres de archivo pueden traer espacios o acentos; memcached no los acepta
+    return PREFIJO_CACHE + hashlib.md5(nombre.encode()).hexdigest()
+
+
+def registrar(nombre, manifiesto):
+    ImagenDerivada.objects.update_or_create(original=nombre, defaults=manifiesto)
+    cache.set(_clave(nombre), manifiesto, timeout=None)
+    return manifiesto
+
+
+def generar_al_subir(nombre):
+    """Para on_commit tras guardar un modelo con imagen: un error no debe tumbar el guardado."""
+    try:
+        registrar(nombre, derivar(nombre))
+    except ERRORES_IMAGEN:
+        logger.warning("No se pudieron generar variantes de %s", nombre, exc_info=True)
+
+
+def asegurar(nombre):
+    """
+    Manifiesto de `nombre`: caché y luego base. Si no hay variantes devuelve
+    None y la plantilla usa la original hasta que la subida (generar_al_subir)
+    o el comando generar_derivados las registren; con IMAGENES_AL_VUELO=True
+    se generan en el render, nunca desde una vista que lee de réplica.
+    """
+    manifiesto = cache.get(_clave(nombre))
+    if manifiesto is not None:
+        return manifiesto or None
+    with en_primaria():
+        fila = ImagenDerivada.objects.filter(original=nombre).values('huella', 'ancho', 'alto', 'anchos').first()
+    if fila:
+        cache.set(_clave(nombre), fila, timeout=None)
+        return fila
+    if not getattr(settings, 'IMAGENES_AL_VUELO', False) or lee_de_replica():
+        # registrar() pisa esta marca en cuanto existan las variantes
+        cache.set(_clave(nombre), {}, timeout=TIEMPO_PENDIENTE)
+        return None
+    try:
+        return registrar(nombre, derivar(nombre))
+    except ERRORES_IMAGEN:
+        logger.warning("No se pudieron generar variantes de %s", nombre, exc_info=True)
+        # Un archivo roto o ausente no se reintenta en cada render
+        cache.set(_clave(nombre), {}, timeout=300)
+        return None
+
+
+def srcset(manifiesto, extension):
+    return ', '.join(
+        f"{default_storage.url(nombre_variante(manifiesto['huella'], ancho, extension))} {ancho}w"
+        for ancho in manifiesto['anchos']
+    )
+
+
+def url_variante(manifiesto, extension, ancho):
+    """La variante más chica que cubre `ancho`, o la mayor que haya."""
+    elegido = next((opcion for opcion in manifiesto['anchos'] if opcion >= ancho), manifiesto['anchos'][-1])
+    return default_storage.url(nombre_variante(manifiesto['huella'], elegido, extension))
@@ -0,0 +1,235 @@
+# app_clientes/importacion.py
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from . import busqueda_admin
+from .busqueda import obtener_backend
+from .models import Categoria, Producto
+from .versiones import invalidar_al_confirmar
+
+TAMANO_LOTE = 2000
+MAX_ERRORES_GUARDADOS = 200
+VERDADEROS = {'1', 'true', 'si', 'sí', 'verdadero', 'x'}
+FALSOS = {'0', 'false', 'no', 'falso', ''}
+
+
+class ResultadoImportacion:
+    """
+    Conteos de la importación. Los errores se guardan hasta un tope para la
+    vista; `al_error` recibe todos (el comando los escribe a un archivo).
+    """
+
+    def __init__(self, al_error=None):
+        self.filas = 0
+        self.importados = 0
+        self.total_errores = 0
+        self.errores = []
+        self.al_error = al_error
+
+    def error(self, linea, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES_GUARDADOS:
+            self.errores.append((linea, mensaje))
+        if self.al_error:
+            self.al_error(linea, mensaje)
+
+
+def _texto(fila, campo, largo, obligatorio=False):
+    valor = (fila.get(campo) or '').strip()
+    if obligatorio and not valor:
+        raise ValueError(f"'{campo}' es obligatorio")
+    if len(valor) > largo:
+        raise ValueError(f"'{campo}' excede {largo} caracteres")
+    return valor
+
+
+def _precio(texto):
+    try:
+        valor = Decimal((texto or '').strip())
+    except InvalidOperation:
+        raise ValueError(f"precio inválido: {texto!r}")
+    if not valor.is_finite() or valor < 0 or valor.as_tuple().exponent < -2 or valor >= Decimal('1e8'):
+        raise ValueError(f"precio fuera de rango o con más de dos decimales: {texto!r}")
+    return valor.quantize(Decimal('0.01'))
+
+
+def _entero(texto, campo):
+    try:
+        valor = int((texto or '0').strip() or '0')
+    except ValueError:
+        raise ValueError(f"'{campo}' no es un entero: {texto!r}")
+    if valor < 0:
+        raise ValueError(f"'{campo}' no puede ser negativo")
+    return valor
+
+
+def _booleano(texto, campo):
+    valor = (texto or '').strip().lower()
+    if valor in VERDADEROS:
+        return True
+    if valor in FALSOS:
+        return False
+    raise ValueError(f"'{campo}' debe ser sí/no: {texto!r}")
+
+
+class Importador:
+    """
+    Lee un CSV fila por fila, valida y guarda por lotes con un solo
+    bulk_create(update_conflicts=True) por lote: la memoria depende del
+    tamaño de lote, no del archivo. Cada lote va en su propia transacción
+    para no tener la escritura bloqueada durante toda la carga.
+    """
+
+    obligatorias = ()
+    actualizables = ()
+
+    def __init__(self, resultado):
+        self.resultado = resultado
+
+    def limpiar(self, fila):
+        raise NotImplementedError
+
+    def llave(self, datos):
+        raise NotImplementedError
+
+    def guardar(self, lote):
+        raise NotImplementedError
+
+    def terminar(self):
+        pass
+
+    def importar(self, lector):
+        columnas = {campo.strip() for campo in (lector.fieldnames or [])}
+        faltantes = [campo for campo in self.obligatorias if campo not in columnas]
+        if faltantes:
+            raise ValueError(f"Faltan columnas: {', '.join(faltantes)}")
+        self.actualizar = [campo for campo in self.actualizables if campo in columnas]
+
+        lote = {}
+        for fila in lector:
+            self.resultado.filas += 1
+            try:
+                datos = self.limpiar({(k or '').strip(): v for k, v in fila.items()})
+            except ValueError as exc:
+                self.resultado.error(lector.line_num, str(exc))
+                continue
+            # Si la misma llave se repite en el lote gana la última fila
+            lote[self.llave(datos)] = datos
+            if len(lote) >= TAMANO_LOTE:
+                self._guardar(lote)
+                lote = {}
+        if lote:
+            self._guardar(lote)
+        self.terminar()
+        return self.resultado
+
+    def _guardar(self, lote):
+        with transaction.atomic():
+            self.guardar(list(lote.values()))
+        self.resultado.importados += len(lote)
+
+
+class ImportadorCategorias(Importador):
+    obligatorias = ('nombre',)
+    actualizables = ('descripcion',)
+
+    def limpiar(self, fila):
+        return {
+            'nombre': _texto(fila, 'nombre', 100, obligatorio=True),
+            'descripcion': _texto(fila, 'descripcion', 10_000),
+        }
+
+    def llave(self, datos):
+        return datos['nombre']
+
+    def guardar(self, lote):
+        objetos = [Categoria(**datos) for datos in lote]
+        if self.actualizar:
+            Categoria.objects.bulk_create(
+                objetos, update_conflicts=True, unique_fields=['nombre'], update_fields=self.actualizar,
+            )
+        else:
+            Categoria.objects.bulk_create(objetos, ignore_conflicts=True)
+        ids = Categoria.objects.filter(nombre__in=[datos['nombre'] for datos in lote]).values_list('pk', flat=True)
+        busqueda_admin.indexar_ids('categorias', ids)
+        invalidar_al_confirmar('categorias')
+
+
+class ImportadorProductos(Importador):
+    """Columnas: categoria (por nombre; se crea si no existe), nombre, precio y opcionales."""
+
+    obligatorias = ('categoria', 'nombre', 'precio')
+    actualizables = ('descripcion', 'precio', 'stock', 'activo')
+
+    def __init__(self, resultado):
+        super().__init__(resultado)
+        self.categorias = {}  # nombre -> id, vive toda la importación
+
+    def limpiar(self, fila):
+        datos = {
+            'categoria': _texto(fila, 'categoria', 100, obligatorio=True),
+            'nombre': _texto(fila, 'nombre', 120, obligatorio=True),
+            'precio': _precio(fila.get('precio')),
+            'descripcion': _texto(fila, 'descripcion', 10_000),
+        }
+        if 'stock' in fila:
+            datos['stock'] = _entero(fila['stock'], 'stock')
+        if 'activo' in fila:
+            datos['activo'] = _booleano(fila['activo'], 'activo')
+        return datos
+
+    def llave(self, datos):
+        return (datos['categoria'], datos['nombre'])
+
+    def _resolver_categorias(self, nombres):
+        faltantes = [nombre for nombre in nombres if nombre not in self.categorias]
+        if not faltantes:
+            return
+        self.categorias.update(Categoria.objects.filter(nombre__in=faltantes).values_list('nombre', 'pk'))
+        nuevas = [nombre for nombre in faltantes if nombre not in self.categorias]
+        if nuevas:
+            Categoria.objects.bulk_create([Categoria(nombre=nombre) for nombre in nuevas], ignore_conflicts=True)
+            creadas = dict(Categoria.objects.filter(nombre__in=nuevas).values_list('nombre', 'pk'))
+            self.categorias.update(creadas)
+            busqueda_admin.indexar_ids('categorias', creadas.values())
+            invalidar_al_confirmar('categorias')
+
+    def guardar(self, lote):
+        self._resolver_categorias({datos['categoria'] for datos in lote})
+        objetos = []
+        for datos in lote:
+            datos = dict(datos)
+            datos['categoria_id'] = self.categorias[datos.pop('categoria')]
+            objetos.append(Producto(**datos))
+        Producto.objects.bulk_create(
+            objetos, update_conflicts=True, unique_fields=['categoria', 'nombre'], update_fields=self.actualizar,
+        )
+
+        # bulk_create no dispara señales: índices y versiones van a mano
+        ids = list(
+            Producto.objects.filter(
+                categoria_id__in={obj.categoria_id for obj in objetos},
+                nombre__in={obj.nombre for obj in objetos},
+            ).values_list('pk', flat=True)
+        )
+        obtener_backend().indexar(ids)
+        busqueda_admin.indexar_ids('productos', ids)
+        invalidar_al_confirmar('precios', 'productos')
+
+
+IMPORTADORES = {
+    'productos': ImportadorProductos,
+    'categorias': ImportadorCategorias,
+}
+
+
+def importar_csv(slug, archivo, al_error=None, encoding='utf-8-sig'):
+    """`archivo` es un binario (subida o archivo abierto en 'rb'); se decodifica al vuelo."""
+    texto = io.TextIOWrapper(archivo, encoding=encoding, newline='')
+    try:
+        return IMPORTADORES[slug](ResultadoImportacion(al_error)).importar(csv.DictReader(texto))
+    finally:
+        texto.detach()
@@ -0,0 +1,228 @@
+# app_clientes/instrumentacion.py
+"""
+Medición por request: queries SQL (cuántas, cuánto tardan y cuáles se
+repiten, la huella típica de un N+1), tiempo de plantillas y latencia total.
+Sale como encabezado Server-Timing y como una línea de log en DEBUG por request,
+junto con las conexiones a la base que abrió la request y el proceso (el
+worker) desde que arrancó, para ver si CONN_MAX_AGE o el pool las reutilizan.
+Solo se mide una muestra (INSTRUMENTACION_MUESTREO, entre 0 y 1) para que se
+pueda dejar prendido en producción; un posible N+1 sale siempre en WARNING.
+"""
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template as PlantillaDjango
+
+logger = logging.getLogger(__name__)
+
+_actual = ContextVar('circley_medicion', default=None)
+# "IN (%s, %s, %s)" con distinto largo es la misma consulta
+_LISTA_PARAMETROS = re.compile(r'%s(?:\s*,\s*%s)+')
+_NUMEROS = re.compile(r'\b\d+\b')
+
+
+def huella(sql):
+    return _NUMEROS.sub('?', _LISTA_PARAMETROS.sub('%s…', sql))
+
+
+class Medicion:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.queries = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_plantillas = 0.0
+        self.huellas = Counter()
+        self.conexiones_nuevas = 0
+        # Una vista async puede consultar desde varios hilos a la vez
+        self._candado = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        # Firma de connection.execute_wrapper()
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self._candado:
+                self.tiempo_sql += duracion
+                self.queries += 1
+                self.huellas[huella(sql)] += 1
+
+    def duplicadas(self):
+        return [(sql, veces) for sql, veces in self.huellas.most_common() if veces > 1]
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    return medicion(execute, sql, params, many, context)
+
+
+def _instalar_medicion_sql(conexion):
+    """
+    El envoltorio queda fijo en la conexión y mide según el contexto: con
+    ASGI las consultas corren en hilos de sync_to_async, con sus propias
+    conexiones, que el middleware no alcanza a envolver. Va al principio de
+    la lista para no estorbar a los execute_wrapper() que se apilan y sacan.
+    """
+    if _medir_consulta not in conexion.execute_wrappers:
+        conexion.execute_wrappers.insert(0, _medir_consulta)
+
+
+class MetricasConexiones:
+    """Conexiones abiertas por este proceso, por alias de base."""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.abiertas = Counter()
+
+    def registrar(self, sender, connection, **kwargs):
+        _instalar_medicion_sql(connection)
+        with self._candado:
+            self.abiertas[connection.alias] += 1
+        medicion = _actual.get()
+        if medicion is not None:
+            medicion.conexiones_nuevas += 1
+
+    def total(self):
+        with self._candado:
+            return sum(self.abiertas.values())
+
+
+metricas_conexiones = MetricasConexiones()
+connection_created.connect(metricas_conexiones.registrar, dispatch_uid='circley_metricas_conexiones')
+
+
+def estado_pool(conexion):
+    """Tamaño, libres y en espera del pool de psycopg; None si la base no usa pool."""
+    pool = getattr(conexion, 'pool', None)
+    if pool is None:
+        return None
+    estadisticas = pool.get_stats()
+    return {
+        'tamano': estadisticas.get('pool_size', 0),
+        'libres': estadisticas.get('pool_available', 0),
+        'esperando': estadisticas.get('requests_waiting', 0),
+    }
+
+
+def _medir_render(render):
+    def envoltura(self, context=None, request=None):
+        medicion = _actual.get()
+        if medicion is None:
+            return render(self, context, request)
+        inicio = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            medicion.tiempo_plantillas += time.perf_counter() - inicio
+    envoltura.circley_medido = True
+    return envoltura
+
+
+def _instalar_medicion_plantillas():
+    # Solo el render de primer nivel (el de render()/get_template()); los include quedan dentro
+    if not getattr(PlantillaDjango.render, 'circley_medido', False):
+        PlantillaDjango.render = _medir_render(PlantillaDjango.render)
+
+
+class InstrumentacionMiddleware:
+    """
+    Va primero en MIDDLEWARE para que la latencia incluya a todos los demás.
+    En respuestas en streaming (exportaciones) solo se mide hasta que la
+    vista devuelve el generador.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.muestreo = float(getattr(settings, 'INSTRUMENTACION_MUESTREO', 0.05))
+        self.umbral_duplicadas = getattr(settings, 'INSTRUMENTACION_UMBRAL_DUPLICADAS', 5)
+        _instalar_medicion_plantillas()
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def _medir(self):
+        return self.muestreo > 0 and random.random() < self.muestreo
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        if not self._medir():
+            return self.get_response(request)
+
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        try:
+            # Conexiones de este hilo abiertas antes de cargar el middleware
+            for conexion in connections.all():
+                _instalar_medicion_sql(conexion)
+            response = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        self.reportar(request, response, medicion)
+        return response
+
+    async def __acall__(self, request):
+        if not self._medir():
+            return await self.get_response(request)
+
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        self.reportar(request, response, medicion)
+        return response
+
+    def reportar(self, request, response, medicion):
+        total = (time.perf_counter() - medicion.inicio) * 1000
+        sql = medicion.tiempo_sql * 1000
+        plantillas = medicion.tiempo_plantillas * 1000
+        response['Server-Timing'] = ', '.join((
+            f'sql;dur={sql:.1f};desc="{medicion.queries} queries"',
+            f'tpl;dur={plantillas:.1f}',
+            f'conn;desc="{medicion.conexiones_nuevas} nuevas"',
+            f'total;dur={total:.1f}',
+        ))
+
+        match = getattr(request, 'resolver_match', None)
+        duplicadas = medicion.duplicadas()
+        datos = {
+            'vista': match.view_name if match else '-',
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'sql': medicion.queries,
+            'sql_ms': round(sql, 1),
+            'tpl_ms': round(plantillas, 1),
+            'total_ms': round(total, 1),
+            'repetidas': sum(veces - 1 for _, veces in duplicadas),
+            'pid': os.getpid(),
+            'conexiones_nuevas': medicion.conexiones_nuevas,
+            'conexiones_proceso': metricas_conexiones.total(),
+        }
+        pool = estado_pool(connections['default'])
+        if pool:
+            datos.update({f'pool_{clave}': valor for clave, valor in pool.items()})
+        logger.debug(' '.join(f'{clave}={valor}' for clave, valor in datos.items()), extra={'medicion': datos})
+        peor = duplicadas[0] if duplicadas else None
+        if peor and peor[1] >= self.umbral_duplicadas:
+            logger.warning(
+                "Posible N+1 en %s: %s veces %s", datos['vista'], peor[1], peor[0][:300],
+                extra={'medicion': datos, 'duplicadas': duplicadas[:5]},
+            )
@@ -0,0 +1,136 @@
+# app_clientes/inventario.py
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import busqueda_admin, totales
+from .models import ItemCarrito, Producto
+
+
+class StockInsuficiente(Exception):
+    pass
+
+
+class ReservaVencida(Exception):
+    """Algún item del carrito ya no está apartado como se cobró (se liberó o cambió)."""
+
+
+def duracion_reserva():
+    return timedelta(minutes=getattr(settings, 'RESERVA_CARRITO_MINUTOS', 60))
+
+
+def _bloquear(queryset):
+    # En SQLite no existe SELECT ... FOR UPDATE; ahí la escritura ya es serial
+    if connection.features.has_select_for_update:
+        return queryset.select_for_update()
+    return queryset
+
+
+def reservar(producto_id, cantidad):
+    """
+    Descuenta stock solo si alcanza, en un único UPDATE condicional.
+    Dos peticiones simultáneas nunca pueden vender la misma unidad.
+    """
+    actualizados = Producto.objects.filter(pk=producto_id, stock__gte=cantidad).update(stock=F('stock') - cantidad)
+    if not actualizados:
+        raise StockInsuficiente(producto_id)
+
+
+def liberar(producto_id, cantidad):
+    Producto.objects.filter(pk=producto_id).update(stock=F('stock') + cantidad)
+
+
+def agregar_item(carrito, producto, cantidad, precio):
+    with transaction.atomic():
+        reservar(producto.pk, cantidad)
+        item, created = _bloquear(ItemCarrito.objects).get_or_create(
+            carrito=carrito,
+            producto=producto,
+            defaults={
+                'cantidad': cantidad,
+                'precio_unitario_actual': precio,
+                'reserva_expira': timezone.now() + duracion_reserva(),
+            },
+        )
+        if not created:
+            item.cantidad = F('cantidad') + cantidad
+            item.precio_unitario_actual = precio
+            item.reserva_expira = timezone.now() + duracion_reserva()
+            item.save(update_fields=['cantidad', 'precio_unitario_actual', 'reserva_expira'])
+            item.refresh_from_db(fields=['cantidad'])
+        totales.aplicar_cambio(carrito, producto, cantidad)
+    return item
+
+
+def ajustar_item(item, nueva_cantidad, precio):
+    with transaction.atomic():
+        item = _bloquear(ItemCarrito.objects.select_related('carrito', 'producto')).get(pk=item.pk)
+        diferencia = nueva_cantidad - item.cantidad
+        if diferencia > 0:
+            reservar(item.producto_id, diferencia)
+        elif diferencia < 0:
+            liberar(item.producto_id, -diferencia)
+        item.cantidad = nueva_cantidad
+        item.precio_unitario_actual = precio
+        item.reserva_expira = timezone.now() + duracion_reserva()
+        item.save(update_fields=['cantidad', 'precio_unitario_actual', 'reserva_expira'])
+        totales.aplicar_cambio(item.carrito, item.producto, diferencia)
+    return item
+
+
+def quitar_item(item):
+    with transaction.atomic():
+        item = _bloquear(ItemCarrito.objects.select_related('carrito', 'producto')).filter(pk=item.pk).first()
+        if item is None:
+            return
+        liberar(item.producto_id, item.cantidad)
+        item.delete()
+        totales.aplicar_cambio(item.carrito, item.producto, -item.cantidad)
+
+
+def consumir_reservas(carrito, items):
+    """
+    Borra los items que el pedido se lleva, pero solo si siguen tal como se
+    leyeron: si liberar_reservas_vencidas() (u otra pestaña) los soltó o
+    cambió mientras tanto, lanza ReservaVencida y la transacción del pedido
+    se deshace. Un solo DELETE condicional; en Postgres espera el bloqueo de
+    filas de la liberación y en SQLite la escritura ya es serial.
+    """
+    vigentes = reduce(or_, (Q(pk=item.pk, cantidad=item.cantidad) for item in items))
+    consumidos, _ = ItemCarrito.objects.filter(vigentes, carrito=carrito).delete()
+    if consumidos != len(items):
+        raise ReservaVencida(carrito.pk)
+
+
+def liberar_reservas_vencidas(ahora=None):
+    """
+    Devuelve al inventario lo apartado en carritos abandonados: un UPDATE
+    para todos los productos y un DELETE para todos los items vencidos.
+    """
+    ahora = ahora or timezone.now()
+    vencidos = ItemCarrito.objects.filter(carrito__activo=True, reserva_expira__lt=ahora)
+    with transaction.atomic():
+        ids = list(_bloquear(vencidos).values_list('pk', flat=True))
+        if not ids:
+            return 0
+        por_producto = (
+            ItemCarrito.objects.filter(pk__in=ids, producto=OuterRef('pk'))
+            .values('producto')
+            .annotate(total=Sum('cantidad'))
+            .values('total')
+        )
+        productos = ItemCarrito.objects.filter(pk__in=ids).values('producto')
+        Producto.objects.filter(pk__in=productos).update(
+            stock=F('stock') + Coalesce(Subquery(por_producto, output_field=IntegerField()), 0)
+        )
+        carritos = set(ItemCarrito.objects.filter(pk__in=ids).values_list('carrito_id', flat=True))
+        ItemCarrito.objects.filter(pk__in=ids).delete()
+        busqueda_admin.desindexar('items_carrito', ids)
+        totales.invalidar(carritos)
+    return len(ids)
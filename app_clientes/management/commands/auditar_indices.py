@@ -0,0 +1,150 @@
+# app_clientes/management/commands/auditar_indices.py
+import re
+from contextlib import nullcontext
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from app_clientes.instrumentacion import huella
+from app_clientes.management.commands.benchmark import base_temporal
+from app_clientes.models import (
+    Carrito, Categoria, Cliente, DetallePedido, ItemCarrito, MensajeContacto, Novedad, Pedido, Producto,
+    ProductoPromocion, Promocion,
+)
+from app_clientes.views import CRUD_CONFIG
+
+# "SCAN tabla" sin USING es recorrer la tabla completa; con USING INDEX es un recorrido ordenado
+ESCANEO = re.compile(r'^SCAN (\S+)$')
+ORDEN_TEMPORAL = 'USE TEMP B-TREE'
+
+
+class Recolector:
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            self.consultas.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def sembrar():
+    """Datos mínimos para que cada vista recorra sus consultas en la base temporal."""
+    hoy = timezone.now().date()
+    categoria = Categoria.objects.create(nombre='Auditoría')
+    productos = [
+        Producto.objects.create(categoria=categoria, nombre=f'Producto {i}', precio=Decimal('10.00') + i, stock=50)
+        for i in range(5)
+    ]
+    promocion = Promocion.objects.create(
+        nombre='Auditoría', tipo_descuento=Promocion.TipoDescuento.PORCENTAJE, valor_descuento=Decimal('10'),
+        fecha_inicio=hoy, fecha_fin=hoy + timedelta(days=7),
+    )
+    ProductoPromocion.objects.create(producto=productos[0], promocion=promocion)
+    Novedad.objects.create(titulo='Auditoría', descripcion='Novedad de prueba')
+    MensajeContacto.objects.create(nombre_remitente='Auditoría', email_remitente='auditoria@example.com', mensaje='Hola')
+    return productos
+
+
+def preparar_usuario(productos):
+    user = User.objects.create_user(username='auditoria-indices', password=None, is_staff=True)
+    cliente = Cliente.objects.create(user=user, direccion='Sin dirección')
+    if productos:
+        carrito = Carrito.objects.create(cliente=cliente)
+        ItemCarrito.objects.create(carrito=carrito, producto=productos[0], cantidad=1, precio_unitario_actual=productos[0].precio)
+        pedido = Pedido.objects.create(cliente=cliente, direccion_envio='Sin dirección', metodo_pago=Pedido.MetodoPago.EFECTIVO)
+        DetallePedido.objects.create(pedido=pedido, producto=productos[0], cantidad=1, precio_unitario_venta=productos[0].precio)
+    return user
+
+
+def urls_auditadas():
+    urls = [reverse(f'app_clientes:{nombre}') for nombre in (
+        'inicio_circley', 'productos_servicios', 'promociones', 'novedades',
+        'ver_carrito', 'checkout', 'historial_pedidos', 'dashboard_admin',
+    )]
+    productos = reverse('app_clientes:productos_servicios')
+    categoria = Categoria.objects.values_list('pk', flat=True).first()
+    if categoria:
+        urls.append(f'{productos}?categoria={categoria}')
+    urls.append(f'{productos}?busqueda=a')
+    for slug in CRUD_CONFIG:
+        listado = reverse(f'app_clientes:ver_{slug}')
+        urls += [listado, f'{listado}?busqueda=a']
+    return urls
+
+
+class Command(BaseCommand):
+    help = (
+        "Recorre las vistas principales, corre EXPLAIN QUERY PLAN sobre cada consulta "
+        "y marca las que recorren una tabla completa o ordenan en una tabla temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--temporal', action='store_true',
+            help="Usa una base desechable con datos de ejemplo en lugar de la configurada.",
+        )
+        parser.add_argument('--url', action='append', default=[], help="URL extra a auditar (se puede repetir).")
+        parser.add_argument('--fallar', action='store_true', help="Termina con error si hay escaneos completos.")
+
+    def handle(self, *args, temporal, url, fallar, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("EXPLAIN QUERY PLAN solo existe en SQLite.")
+
+        with base_temporal() if temporal else nullcontext():
+            hallazgos = self.auditar(temporal, url)
+
+        escaneos = sum(1 for tipo, *_ in hallazgos.values() if tipo == 'ESCANEO')
+        self.stdout.write(
+            f"\n{len(hallazgos)} consultas con hallazgos ({escaneos} escaneos completos, "
+            f"{len(hallazgos) - escaneos} ordenamientos temporales)."
+        )
+        if fallar and escaneos:
+            raise CommandError("Hay consultas que recorren tablas completas.")
+
+    def auditar(self, temporal, extra):
+        hallazgos = {}
+        # Todo lo que se crea para la auditoría se deshace al final
+        with transaction.atomic():
+            productos = sembrar() if temporal else list(Producto.objects.all()[:1])
+            cliente = Client(SERVER_NAME='localhost')
+            cliente.force_login(preparar_usuario(productos))
+
+            for ruta in urls_auditadas() + extra:
+                recolector = Recolector()
+                with connection.execute_wrapper(recolector):
+                    respuesta = cliente.get(ruta)
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"{ruta} → {respuesta.status_code}, {len(recolector.consultas)} consultas"
+                ))
+                for sql, params in recolector.consultas:
+                    clave = huella(sql)
+                    if clave in hallazgos:
+                        continue
+                    hallazgo = self.explicar(sql, params)
+                    if hallazgo:
+                        hallazgos[clave] = hallazgo
+                        tipo, detalle = hallazgo
+                        estilo = self.style.ERROR if tipo == 'ESCANEO' else self.style.WARNING
+                        self.stdout.write(estilo(f"  {tipo} {detalle}"))
+                        self.stdout.write(f"    {sql[:200]}")
+            transaction.set_rollback(True)
+        return hallazgos
+
+    def explicar(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            detalles = [fila[-1] for fila in cursor.fetchall()]
+        for detalle in detalles:
+            if ESCANEO.match(detalle):
+                return 'ESCANEO', detalle
+        for detalle in detalles:
+            if detalle.startswith(ORDEN_TEMPORAL):
+                return 'ORDEN', detalle
+        return None
@@ -0,0 +1,471 @@
+# app_clientes/management/commands/benchmark.py
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from app_clientes.instrumentacion import metricas_conexiones
+from app_clientes.models import (
+    Cliente, Categoria, Producto, Promocion, ProductoPromocion, Carrito, ItemCarrito, Novedad
+)
+
+
+@contextmanager
+def base_temporal(en_archivo=False):
+    """
+    Crea una base de datos de prueba desechable para no tocar la real.
+    Los escenarios con varios hilos necesitan un archivo: la base en memoria
+    compartida de SQLite bloquea tablas completas.
+    """
+    prueba = connection.settings_dict.setdefault('TEST', {})
+    nombre_prueba = prueba.get('NAME')
+    if en_archivo and connection.vendor == 'sqlite':
+        directorio = tempfile.mkdtemp(prefix='circley-benchmark-')
+        prueba['NAME'] = os.path.join(directorio, 'benchmark.sqlite3')
+    nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        prueba['NAME'] = nombre_prueba
+
+
+def cronometrar(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def crear_productos(cantidad, categoria=None, **extra):
+    categoria = categoria or Categoria.objects.create(nombre=f'Benchmark {Categoria.objects.count()}')
+    Producto.objects.bulk_create(
+        Producto(categoria=categoria, nombre=f'Producto {i}', precio=Decimal('10.00') + i % 50, stock=1000, **extra)
+        for i in range(cantidad)
+    )
+    return list(Producto.objects.filter(categoria=categoria))
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def crear_cliente(username='benchmark'):
+    user = User.objects.create_user(username=username, password='benchmark')
+    return Cliente.objects.create(user=user, direccion='Sin dirección')
+
+
+class Command(BaseCommand):
+    help = "Mide queries y tiempos de los caminos críticos sobre una base temporal."
+
+    escenarios = ('promociones', 'busqueda', 'stock', 'checkout', 'importacion', 'sqlite', 'asgi')
+    en_archivo = ('stock', 'importacion', 'sqlite', 'asgi')
+
+    def add_arguments(self, parser):
+        parser.add_argument('escenario', choices=self.escenarios)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--hilos', type=int, default=16)
+        parser.add_argument('--filas', type=int, default=100_000)
+        parser.add_argument('--operaciones', type=int, default=200, help="Operaciones por hilo o cliente (escenarios sqlite y asgi).")
+
+    def handle(self, *args, **options):
+        metodo = getattr(self, f"escenario_{options['escenario']}", None)
+        if metodo is None:
+            raise CommandError(f"Escenario desconocido: {options['escenario']}")
+        with base_temporal(en_archivo=options['escenario'] in self.en_archivo):
+            metodo(options)
+
+    def escenario_promociones(self, options):
+        from app_clientes.views import recalcular_totales_carrito
+
+        hoy = timezone.now().date()
+        productos = crear_productos(40)
+        carrito = Carrito.objects.create(cliente=crear_cliente())
+        ItemCarrito.objects.bulk_create(
+            ItemCarrito(carrito=carrito, producto=producto, cantidad=3, precio_unitario_actual=producto.precio)
+            for producto in productos
+        )
+
+        self.stdout.write(f"{'promociones':>12} {'q. en frío':>11} {'q. en caché':>12} {'ms/recalculo':>13}")
+        creadas = 0
+        for objetivo in (1, 10, 50, 200):
+            for i in range(creadas, objetivo):
+                tipo = Promocion.TipoDescuento.BOGO if i % 2 else Promocion.TipoDescuento.PORCENTAJE
+                promo = Promocion.objects.create(
+                    nombre=f'Promo {i}', tipo_descuento=tipo, valor_descuento=Decimal('5.00'),
+                    fecha_inicio=hoy - timedelta(days=1), fecha_fin=hoy + timedelta(days=1),
+                )
+                ProductoPromocion.objects.bulk_create(
+                    ProductoPromocion(producto=producto, promocion=promo) for producto in productos[i % 4::4]
+                )
+            creadas = objetivo
+
+            with CaptureQueriesContext(connection) as frio:
+                recalcular_totales_carrito(carrito)
+            with CaptureQueriesContext(connection) as caliente:
+                recalcular_totales_carrito(carrito)
+            ms = cronometrar(lambda: recalcular_totales_carrito(carrito), options['repeticiones'])
+            self.stdout.write(f"{objetivo:>12} {len(frio):>11} {len(caliente):>12} {ms:>13.2f}")
+
+    def escenario_busqueda(self, options):
+        from app_clientes.busqueda import BackendIcontains, obtener_backend
+
+        palabras = ['café', 'refresco', 'galleta', 'papas', 'dulce', 'energética', 'jugo', 'pan', 'agua', 'leche']
+        consultas = ['cafe', 'galle', 'energetica', 'pan dulce', 'zzz']
+        backend = obtener_backend()
+        referencia = BackendIcontains()
+        categoria = Categoria.objects.create(nombre='Abarrotes')
+
+        self.stdout.write(f"{'productos':>10} {'consulta':>12} {'icontains ms':>13} {type(backend).__name__ + ' ms':>26}")
+        creados = 0
+        for objetivo in (10_000, 100_000):
+            lote = [
+                Producto(
+                    categoria=categoria, nombre=f'{palabras[i % 10].title()} {palabras[(i // 10) % 10]} {i}',
+                    descripcion=f'Presentación {i % 7} de {palabras[(i * 3) % 10]}', precio=Decimal('15.00'), stock=10,
+                )
+                for i in range(creados, objetivo)
+            ]
+            Producto.objects.bulk_create(lote, batch_size=5000)
+            creados = objetivo
+            backend.reconstruir()
+
+            base = Producto.objects.filter(activo=True)
+            for consulta in consultas:
+                ms_like = cronometrar(lambda: list(referencia.buscar(base, consulta)), options['repeticiones'])
+                ms_fts = cronometrar(lambda: list(backend.buscar(base, consulta)), options['repeticiones'])
+                self.stdout.write(f"{objetivo:>10} {consulta:>12} {ms_like:>13.2f} {ms_fts:>26.2f}")
+
+    def escenario_stock(self, options):
+        from app_clientes.inventario import StockInsuficiente, reservar
+
+        stock_inicial = 500
+        producto = crear_productos(1)[0]
+        Producto.objects.filter(pk=producto.pk).update(stock=stock_inicial)
+        intentos_por_hilo = stock_inicial // options['hilos'] * 2
+        resultados = {'vendidas': 0, 'rechazadas': 0, 'bloqueos': 0}
+        candado = threading.Lock()
+        barrera = threading.Barrier(options['hilos'])
+
+        def comprador():
+            locales = {'vendidas': 0, 'rechazadas': 0, 'bloqueos': 0}
+            barrera.wait()
+            try:
+                for _ in range(intentos_por_hilo):
+                    try:
+                        reservar(producto.pk, 1)
+                        locales['vendidas'] += 1
+                    except StockInsuficiente:
+                        locales['rechazadas'] += 1
+                    except OperationalError:
+                        locales['bloqueos'] += 1
+            finally:
+                connections.close_all()
+            with candado:
+                for clave, valor in locales.items():
+                    resultados[clave] += valor
+
+        hilos = [threading.Thread(target=comprador) for _ in range(options['hilos'])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        segundos = time.perf_counter() - inicio
+
+        stock_final = Producto.objects.get(pk=producto.pk).stock
+        total = sum(resultados.values())
+        self.stdout.write(
+            f"hilos={options['hilos']} intentos={total} vendidas={resultados['vendidas']} "
+            f"rechazadas={resultados['rechazadas']} bloqueos={resultados['bloqueos']}"
+        )
+        self.stdout.write(f"stock final={stock_final} reservas/s={total / segundos:.0f}")
+        if stock_final < 0 or stock_final != stock_inicial - resultados['vendidas']:
+            raise CommandError("Sobreventa detectada: el stock no cuadra con lo vendido.")
+        self.stdout.write(self.style.SUCCESS("Sin sobreventa."))
+
+    def escenario_checkout(self, options):
+        from app_clientes.pedidos import crear_pedido
+
+        cliente = crear_cliente()
+        productos = crear_productos(100)
+
+        self.stdout.write(f"{'líneas':>7} {'queries':>8} {'pedidos/s':>10}  ms por etapa")
+        for lineas in (1, 10, 100):
+            segundos = 0
+            queries = 0
+            etapas = {}
+            for _ in range(options['repeticiones']):
+                carrito = Carrito.objects.create(cliente=cliente)
+                items = ItemCarrito.objects.bulk_create(
+                    ItemCarrito(carrito=carrito, producto=producto, cantidad=2, precio_unitario_actual=producto.precio)
+                    for producto in productos[:lineas]
+                )
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    _, tiempos = crear_pedido(carrito, items, cliente, 'EFECTIVO', cliente.direccion)
+                    segundos += time.perf_counter() - inicio
+                queries = len(capturadas)
+                for nombre, ms in tiempos.items():
+                    etapas[nombre] = etapas.get(nombre, 0) + ms / options['repeticiones']
+            detalle = ' '.join(f'{nombre}={ms:.2f}' for nombre, ms in etapas.items())
+            self.stdout.write(f"{lineas:>7} {queries:>8} {options['repeticiones'] / segundos:>10.0f}  {detalle}")
+
+    def escenario_importacion(self, options):
+        import csv
+        import resource
+
+        from app_clientes.importacion import importar_csv
+
+        directorio = tempfile.mkdtemp(prefix='circley-benchmark-')
+        ruta = os.path.join(directorio, 'catalogo.csv')
+        with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(['categoria', 'nombre', 'descripcion', 'precio', 'stock', 'activo'])
+            for i in range(options['filas']):
+                precio = 'abc' if i % 1000 == 999 else f'{10 + i % 90}.{i % 100:02d}'
+                escritor.writerow([f'Temporada {i % 25}', f'Producto {i}', f'Descripción del producto {i}', precio, i % 300, 'sí'])
+
+        memoria_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        for pasada in ('alta', 'actualización'):
+            inicio = time.perf_counter()
+            with open(ruta, 'rb') as archivo:
+                resultado = importar_csv('productos', archivo)
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(
+                f"{pasada:>14}: {resultado.filas} filas, {resultado.importados} guardadas, "
+                f"{resultado.total_errores} errores en {segundos:.1f}s ({resultado.filas / segundos:.0f} filas/s)"
+            )
+        memoria = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - memoria_antes
+        self.stdout.write(f"productos en base={Producto.objects.count()} memoria pico extra={memoria / 1024:.0f} MB")
+        os.remove(ruta)
+        os.rmdir(directorio)
+
+    def escenario_sqlite(self, options):
+        """
+        Carga mixta con varios hilos (80 % lecturas del catálogo, 20 % altas al
+        carrito) primero con los valores de Django y luego con los ajustes de
+        backend_circley/base_datos.py tomados del entorno (aunque no traiga SQLITE_AJUSTES).
+        """
+        from backend_circley.base_datos import opciones_sqlite, pragmas_sqlite
+        from app_clientes.inventario import agregar_item
+
+        if connection.vendor != 'sqlite':
+            raise CommandError("Este escenario solo aplica a SQLite.")
+
+        productos = crear_productos(200)
+        Producto.objects.update(stock=10_000_000)
+        carritos = [
+            Carrito.objects.create(cliente=crear_cliente(f'benchmark-{i}')) for i in range(options['hilos'])
+        ]
+        ajustes = {**os.environ, 'SQLITE_AJUSTES': '1'}
+        # La base temporal se creó con los ajustes del entorno; la línea base vuelve al journal por omisión
+        fases = (
+            ('sin ajustes', {'journal_mode': 'DELETE'}, {}),
+            ('con ajustes', pragmas_sqlite(ajustes), opciones_sqlite(ajustes)),
+        )
+        configuracion = connection.settings_dict
+
+        self.stdout.write(
+            f"{'fase':>12} {'ops/s':>7} {'bloqueos':>9} {'lect. p50':>10} {'lect. p99':>10} "
+            f"{'escr. p50':>10} {'escr. p99':>10}  (ms)"
+        )
+        for nombre, pragmas, opciones in fases:
+            configuracion['PRAGMAS'] = pragmas
+            configuracion['OPTIONS'] = opciones
+            connections.close_all()
+            latencias = {'lectura': [], 'escritura': []}
+            bloqueos = [0]
+            candado = threading.Lock()
+            barrera = threading.Barrier(options['hilos'])
+
+            def trabajador(indice):
+                locales = {'lectura': [], 'escritura': []}
+                errores = 0
+                barrera.wait()
+                try:
+                    for n in range(options['operaciones']):
+                        tipo = 'escritura' if n % 5 == 0 else 'lectura'
+                        inicio = time.perf_counter()
+                        try:
+                            if tipo == 'escritura':
+                                producto = productos[(indice * 7 + n) % len(productos)]
+                                agregar_item(carritos[indice], producto, 1, producto.precio)
+                            else:
+                                list(Producto.objects.filter(activo=True).order_by('nombre')[:30])
+                                Carrito.objects.filter(pk=carritos[indice].pk, activo=True).first()
+                        except OperationalError:
+                            errores += 1
+                            continue
+                        locales[tipo].append((time.perf_counter() - inicio) * 1000)
+                finally:
+                    connections.close_all()
+                with candado:
+                    for clave, valores in locales.items():
+                        latencias[clave].extend(valores)
+                    bloqueos[0] += errores
+
+            hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(options['hilos'])]
+            inicio = time.perf_counter()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            segundos = time.perf_counter() - inicio
+
+            total = options['hilos'] * options['operaciones']
+            lecturas, escrituras = latencias['lectura'], latencias['escritura']
+            self.stdout.write(
+                f"{nombre:>12} {total / segundos:>7.0f} {bloqueos[0]:>9} "
+                f"{percentil(lecturas, 50):>10.2f} {percentil(lecturas, 99):>10.2f} "
+                f"{percentil(escrituras, 50):>10.2f} {percentil(escrituras, 99):>10.2f}"
+            )
+
+    def escenario_asgi(self, options):
+        """
+        Clientes con sesión (sin caché de página) recorriendo las vistas
+        públicas y el carrito, todos a la vez: WSGI con hilos, ASGI con las
+        vistas síncronas (un salto a hilo por request) y ASGI con las async.
+        """
+        from django.core.handlers.asgi import ASGIHandler
+        from django.core.handlers.wsgi import WSGIHandler
+
+        hoy = timezone.now().date()
+        productos = crear_productos(200)
+        promocion = Promocion.objects.create(
+            nombre='Benchmark', tipo_descuento=Promocion.TipoDescuento.PORCENTAJE, valor_descuento=Decimal('10'),
+            fecha_inicio=hoy - timedelta(days=1), fecha_fin=hoy + timedelta(days=1),
+        )
+        ProductoPromocion.objects.bulk_create(
+            ProductoPromocion(producto=producto, promocion=promocion) for producto in productos[:20]
+        )
+        Novedad.objects.bulk_create(Novedad(titulo=f'Novedad {i}', descripcion='Benchmark') for i in range(10))
+        cookies = []
+        for i in range(options['hilos']):
+            cliente = crear_cliente(f'benchmark-{i}')
+            carrito = Carrito.objects.create(cliente=cliente)
+            ItemCarrito.objects.bulk_create(
+                ItemCarrito(carrito=carrito, producto=producto, cantidad=2, precio_unitario_actual=producto.precio)
+                for producto in productos[:5]
+            )
+            navegador = Client()
+            navegador.force_login(cliente.user)
+            cookies.append(f"{settings.SESSION_COOKIE_NAME}={navegador.cookies[settings.SESSION_COOKIE_NAME].value}")
+        rutas = ['/', '/productos/', '/promociones/', '/novedades/', '/carrito/']
+
+        fases = (
+            ('wsgi', 'backend_circley.urls', self._carga_wsgi, WSGIHandler),
+            ('asgi sync', 'backend_circley.urls', self._carga_asgi, ASGIHandler),
+            ('asgi async', 'backend_circley.urls_asgi', self._carga_asgi, ASGIHandler),
+        )
+        self.stdout.write(
+            f"{'fase':>11} {'req/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'errores':>8} {'conexiones':>11}"
+        )
+        for nombre, urlconf, carga, Handler in fases:
+            connections.close_all()
+            # Sin muestreo: se mide la vista, no la línea de log
+            with override_settings(ROOT_URLCONF=urlconf, INSTRUMENTACION_MUESTREO=0):
+                abiertas = metricas_conexiones.total()
+                inicio = time.perf_counter()
+                latencias, codigos = carga(Handler(), cookies, rutas, options['operaciones'])
+                segundos = time.perf_counter() - inicio
+                abiertas = metricas_conexiones.total() - abiertas
+            errores = sum(veces for codigo, veces in codigos.items() if codigo >= 400)
+            self.stdout.write(
+                f"{nombre:>11} {len(latencias) / segundos:>7.0f} {percentil(latencias, 50):>8.2f} "
+                f"{percentil(latencias, 99):>8.2f} {errores:>8} {abiertas:>11}"
+            )
+
+    def _carga_wsgi(self, aplicacion, cookies, rutas, operaciones):
+        fabrica = RequestFactory(SERVER_NAME='localhost')
+        latencias, codigos = [], Counter()
+        candado = threading.Lock()
+        barrera = threading.Barrier(len(cookies))
+
+        def trabajador(cookie):
+            locales, vistos = [], Counter()
+            barrera.wait()
+            try:
+                for n in range(operaciones):
+                    entorno = fabrica.get(rutas[n % len(rutas)], HTTP_COOKIE=cookie).environ
+                    estado = {}
+                    inicio = time.perf_counter()
+                    cuerpo = aplicacion(entorno, lambda codigo, encabezados, *args: estado.update(codigo=codigo))
+                    try:
+                        b''.join(cuerpo)
+                    finally:
+                        cuerpo.close()
+                    locales.append((time.perf_counter() - inicio) * 1000)
+                    vistos[int(estado['codigo'][:3])] += 1
+            finally:
+                connections.close_all()
+            with candado:
+                latencias.extend(locales)
+                codigos.update(vistos)
+
+        hilos = [threading.Thread(target=trabajador, args=(cookie,)) for cookie in cookies]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return latencias, codigos
+
+    def _carga_asgi(self, aplicacion, cookies, rutas, operaciones):
+        latencias, codigos = [], Counter()
+
+        async def peticion(ruta, cookie):
+            alcance = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': ruta, 'raw_path': ruta.encode(), 'query_string': b'', 'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            enviado = False
+            terminada = asyncio.Event()
+            respuesta = {}
+
+            async def recibir():
+                nonlocal enviado
+                if not enviado:
+                    enviado = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # Django escucha una desconexión mientras procesa
+                await terminada.wait()
+                return {'type': 'http.disconnect'}
+
+            async def enviar(mensaje):
+                if mensaje['type'] == 'http.response.start':
+                    respuesta['codigo'] = mensaje['status']
+
+            await aplicacion(alcance, recibir, enviar)
+            terminada.set()
+            return respuesta['codigo']
+
+        async def cliente(cookie):
+            for n in range(operaciones):
+                inicio = time.perf_counter()
+                codigo = await peticion(rutas[n % len(rutas)], cookie)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                codigos[codigo] += 1
+
+        async def principal():
+            await asyncio.gather(*(cliente(cookie) for cookie in cookies))
+
+        asyncio.run(principal())
+        return latencias, codigos
@@ -0,0 +1,67 @@
+# app_clientes/management/commands/generar_derivados.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from app_clientes import imagenes
+from app_clientes.models import ImagenDerivada, Novedad, Producto, Promocion
+from app_clientes.versiones import incrementar_version
+
+MODELOS = (Producto, Promocion, Novedad)
+
+
+def _iniciar_trabajador():
+    # Con spawn el proceso arranca sin Django configurado; con fork no hace nada
+    django.setup()
+
+
+def _derivar(nombre, forzar):
+    try:
+        return nombre, imagenes.derivar(nombre, forzar=forzar), None
+    except imagenes.ERRORES_IMAGEN as exc:
+        return nombre, None, str(exc)
+
+
+class Command(BaseCommand):
+    help = "Genera las variantes WebP/JPEG de las imágenes ya subidas, en paralelo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--forzar', action='store_true', help="Regenera aunque ya existan variantes.")
+
+    def handle(self, *args, procesos, forzar, **options):
+        nombres = set()
+        for model in MODELOS:
+            nombres.update(model.objects.exclude(imagen_url='').exclude(imagen_url=None).values_list('imagen_url', flat=True))
+        if not forzar:
+            nombres -= set(ImagenDerivada.objects.filter(original__in=nombres).values_list('original', flat=True))
+        if not nombres:
+            self.stdout.write("No hay imágenes pendientes.")
+            return
+
+        inicio = time.perf_counter()
+        generadas = errores = 0
+        # Los hijos no deben heredar la conexión abierta del padre
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=max(1, procesos), initializer=_iniciar_trabajador) as pool:
+            futuros = [pool.submit(_derivar, nombre, forzar) for nombre in sorted(nombres)]
+            for futuro in as_completed(futuros):
+                nombre, manifiesto, error = futuro.result()
+                if error:
+                    errores += 1
+                    self.stderr.write(f"{nombre}: {error}")
+                    continue
+                imagenes.registrar(nombre, manifiesto)
+                generadas += 1
+
+        if generadas:
+            # Las tarjetas en caché aún apuntan a la imagen original
+            for espacio in ('productos', 'promociones', 'novedades'):
+                incrementar_version(espacio)
+        self.stdout.write(self.style.SUCCESS(
+            f"{generadas} imágenes con variantes, {errores} con error en {time.perf_counter() - inicio:.1f} s"
+        ))
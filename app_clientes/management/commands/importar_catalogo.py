@@ -0,0 +1,46 @@
+# app_clientes/management/commands/importar_catalogo.py
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_clientes.importacion import IMPORTADORES, importar_csv
+
+
+class Command(BaseCommand):
+    help = "Importa (o actualiza) productos o categorías desde un CSV, por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--modelo', choices=sorted(IMPORTADORES), default='productos')
+        parser.add_argument('--errores', help="Ruta del CSV donde escribir las filas rechazadas.")
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        reporte = open(options['errores'], 'w', newline='', encoding='utf-8') if options['errores'] else None
+        escritor = csv.writer(reporte) if reporte else None
+        if escritor:
+            escritor.writerow(['linea', 'error'])
+
+        inicio = time.perf_counter()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_csv(
+                    options['modelo'], archivo,
+                    al_error=(lambda linea, mensaje: escritor.writerow([linea, mensaje])) if escritor else None,
+                    encoding=options['encoding'],
+                )
+        except (OSError, ValueError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            if reporte:
+                reporte.close()
+        segundos = time.perf_counter() - inicio
+
+        if not escritor:
+            for linea, mensaje in resultado.errores:
+                self.stderr.write(f"línea {linea}: {mensaje}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.filas} filas leídas, {resultado.importados} guardadas, "
+            f"{resultado.total_errores} con error en {segundos:.1f}s"
+        ))
@@ -0,0 +1,12 @@
+# app_clientes/management/commands/liberar_reservas.py
+from django.core.management.base import BaseCommand
+
+from app_clientes.inventario import liberar_reservas_vencidas
+
+
+class Command(BaseCommand):
+    help = "Devuelve al inventario el stock apartado por carritos abandonados."
+
+    def handle(self, *args, **options):
+        liberados = liberar_reservas_vencidas()
+        self.stdout.write(self.style.SUCCESS(f"{liberados} items de carrito liberados"))
@@ -0,0 +1,12 @@
+# app_clientes/management/commands/purgar_claves_idempotencia.py
+from django.core.management.base import BaseCommand
+
+from app_clientes.pedidos import purgar_claves_vencidas
+
+
+class Command(BaseCommand):
+    help = "Borra los tokens de checkout más viejos que IDEMPOTENCIA_HORAS."
+
+    def handle(self, *args, **options):
+        borradas = purgar_claves_vencidas()
+        self.stdout.write(self.style.SUCCESS(f"{borradas} claves de idempotencia borradas"))
@@ -0,0 +1,22 @@
+# app_clientes/management/commands/reindexar_busqueda_admin.py
+from django.core.management.base import BaseCommand, CommandError
+
+from app_clientes import busqueda_admin
+from app_clientes.views import CRUD_CONFIG
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de los listados del panel administrativo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help="Listados a reindexar (por defecto todos).")
+
+    def handle(self, *args, **options):
+        slugs = options['slugs'] or list(CRUD_CONFIG)
+        desconocidos = [slug for slug in slugs if slug not in CRUD_CONFIG]
+        if desconocidos:
+            raise CommandError(f"Listados desconocidos: {', '.join(desconocidos)}")
+
+        for slug in slugs:
+            total = busqueda_admin.reconstruir(slug)
+            self.stdout.write(self.style.SUCCESS(f"{slug}: {total} registros indexados"))
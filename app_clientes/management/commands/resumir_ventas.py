@@ -0,0 +1,12 @@
+# app_clientes/management/commands/resumir_ventas.py
+from django.core.management.base import BaseCommand
+
+from app_clientes.analitica import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los resúmenes de ventas del dashboard a partir de los pedidos existentes."
+
+    def handle(self, *args, **options):
+        for tabla, filas in reconstruir().items():
+            self.stdout.write(self.style.SUCCESS(f"{tabla}: {filas} filas"))
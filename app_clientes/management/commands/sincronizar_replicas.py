@@ -0,0 +1,39 @@
+# app_clientes/management/commands/sincronizar_replicas.py
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from app_clientes.replicas import replicas_lectura
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia la base primaria SQLite sobre cada réplica de DB_REPLICAS. Sirve para "
+        "probar el enrutamiento en local; con otros motores la replicación la hace el servidor."
+    )
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError("Solo aplica cuando la primaria es SQLite.")
+        alias_replicas = replicas_lectura()
+        if not alias_replicas:
+            self.stdout.write("No hay réplicas configuradas (DB_REPLICAS).")
+            return
+
+        primaria = connections[DEFAULT_DB_ALIAS]
+        primaria.ensure_connection()
+        for alias in alias_replicas:
+            connections[alias].close()
+            inicio = time.perf_counter()
+            # backup() copia una foto consistente aunque la primaria siga recibiendo escrituras
+            destino = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+            try:
+                primaria.connection.backup(destino)
+            finally:
+                destino.close()
+            self.stdout.write(self.style.SUCCESS(
+                f"{alias}: copiada en {time.perf_counter() - inicio:.2f} s"
+            ))
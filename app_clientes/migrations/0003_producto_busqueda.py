@@ -0,0 +1,35 @@
+from django.db import migrations
+
+TABLA_FTS = 'app_clientes_producto_busqueda'
+
+
+def crear_indice(apps, schema_editor):
+    # Solo SQLite usa la tabla FTS5; Postgres busca sobre las columnas originales
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} "
+        f"USING fts5(nombre, descripcion, categoria, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {TABLA_FTS} (rowid, nombre, descripcion, categoria) "
+        f"SELECT p.id, p.nombre, p.descripcion, c.nombre "
+        f"FROM app_clientes_producto p JOIN app_clientes_categoria c ON c.id = p.categoria_id"
+    )
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_clientes', '0002_carrito_subtotal_carrito_total_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
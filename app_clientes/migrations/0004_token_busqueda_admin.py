@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_clientes', '0003_producto_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenBusquedaAdmin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.CharField(max_length=50)),
+                ('token', models.CharField(max_length=64)),
+                ('objeto_id', models.BigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['slug', 'token', 'objeto_id'], name='token_busqueda_idx'), models.Index(fields=['slug', 'objeto_id'], name='token_objeto_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_clientes', '0004_token_busqueda_admin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemcarrito',
+            name='reserva_expira',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
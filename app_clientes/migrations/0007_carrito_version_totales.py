@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_clientes', '0006_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrito',
+            name='version_totales',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:30
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_clientes', '0007_carrito_version_totales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenPedidosEstado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado_pedido', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_CAMINO', 'En camino'), ('ENTREGADO', 'Entregado'), ('CANCELADO', 'Cancelado')], max_length=20)),
+                ('metodo_pago', models.CharField(choices=[('EFECTIVO', 'Pago en efectivo'), ('TARJETA', 'Tarjeta'), ('TRANSFERENCIA', 'Transferencia/Depósito')], max_length=20)),
+                ('pedidos', models.IntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'unique_together': {('fecha', 'estado_pedido', 'metodo_pago')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenVentasHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('hora', models.PositiveSmallIntegerField()),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('descuentos', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'unique_together': {('fecha', 'hora')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DescuentoPedido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descuentos', to='app_clientes.pedido')),
+                ('promocion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_clientes.promocion')),
+            ],
+            options={
+                'unique_together': {('pedido', 'promocion')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenDescuentoPromocion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('descuento', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('promocion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_clientes.promocion')),
+            ],
+            options={
+                'unique_together': {('fecha', 'promocion')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenVentasCategoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_clientes.categoria')),
+            ],
+            options={
+                'unique_together': {('fecha', 'categoria')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenVentasProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_clientes.producto')),
+            ],
+            options={
+                'unique_together': {('fecha', 'producto')},
+            },
+        ),
+    ]
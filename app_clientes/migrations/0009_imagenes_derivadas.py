@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_clientes', '0008_resumenes_ventas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImagenDerivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original', models.CharField(max_length=255, unique=True)),
+                ('huella', models.CharField(max_length=64)),
+                ('ancho', models.PositiveIntegerField()),
+                ('alto', models.PositiveIntegerField()),
+                ('anchos', models.JSONField(default=list)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:48
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def unificar_carritos_activos(apps, schema_editor):
+    """
+    Antes de la restricción: si un cliente tiene varios carritos activos se
+    conserva el más reciente y se le pasan los items de los demás (el stock
+    ya estaba reservado, así que solo se suman cantidades).
+    """
+    Carrito = apps.get_model('app_clientes', 'Carrito')
+    ItemCarrito = apps.get_model('app_clientes', 'ItemCarrito')
+    repetidos = (
+        Carrito.objects.filter(activo=True).values('cliente_id')
+        .annotate(carritos=Count('id')).filter(carritos__gt=1).values_list('cliente_id', flat=True)
+    )
+    for cliente_id in list(repetidos):
+        conservado, *sobrantes = Carrito.objects.filter(cliente_id=cliente_id, activo=True).order_by('-fecha_actualizacion', '-id')
+        items = {item.producto_id: item for item in ItemCarrito.objects.filter(carrito=conservado)}
+        for item in ItemCarrito.objects.filter(carrito__in=sobrantes).order_by('id'):
+            destino = items.get(item.producto_id)
+            if destino:
+                destino.cantidad += item.cantidad
+                destino.save(update_fields=['cantidad'])
+                item.delete()
+            else:
+                item.carrito = conservado
+                item.save(update_fields=['carrito'])
+                items[item.producto_id] = item
+        Carrito.objects.filter(pk__in=[carrito.pk for carrito in sobrantes]).update(activo=False)
+        # Los totales guardados ya no corresponden a los items
+        Carrito.objects.filter(pk=conservado.pk).update(version_totales='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_clientes', '0009_imagenes_derivadas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mensajecontacto',
+            index=models.Index(fields=['leido', '-fecha_envio'], name='mensaje_leido_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['cliente', '-fecha_pedido'], name='pedido_cliente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estado_pedido', '-fecha_pedido'], name='pedido_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['activo', 'stock'], name='producto_activo_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['nombre'], name='producto_catalogo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='promocion',
+            index=models.Index(fields=['activo', 'fecha_inicio', 'fecha_fin'], name='promocion_activo_fechas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='promocion',
+            index=models.Index(condition=models.Q(('activo', True), ('activa', True), _connector='OR'), fields=['fecha_inicio', 'fecha_fin'], name='promocion_vigente_idx'),
+        ),
+        migrations.RunPython(unificar_carritos_activos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='carrito',
+            constraint=models.UniqueConstraint(condition=models.Q(('activo', True)), fields=('cliente',), name='carrito_activo_unico'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_clientes', '0010_indices_rutas_calientes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='promocion',
+            name='tipo_descuento',
+            field=models.CharField(choices=[('porcentaje', 'Descuento porcentual'), ('bogo', '2x1 / lleva N paga M')], max_length=20),
+        ),
+    ]
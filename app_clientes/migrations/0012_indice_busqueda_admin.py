@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_clientes', '0011_promocion_tipo_descuento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusquedaAdmin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.CharField(max_length=50, unique=True)),
+                ('construido_en', models.DateTimeField()),
+            ],
+        ),
+    ]
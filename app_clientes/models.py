@@ -1,5 +1,6 @@
 # app_clientes/models.py
 from django.db import models
+from django.db.models import F, Q, Sum
 from django.contrib.auth.models import User
 from django.utils import timezone
 from decimal import Decimal
@@ -12,6 +13,9 @@ class Cliente(models.Model):
     telefono = models.CharField(max_length=20, blank=True)
     direccion = models.TextField(blank=True)
 
+    # Campos que lee __str__, para que los listados puedan planear sus joins
+    dependencias = {'__str__': ('user__first_name', 'user__last_name', 'user__username')}
+
     class Meta:
         ordering = ['user__username']
 
@@ -23,6 +27,8 @@ class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     descripcion = models.TextField(blank=True)
 
+    dependencias = {'__str__': ('nombre',)}
+
     class Meta:
         verbose_name_plural = "Categorías"
         ordering = ['nombre']
@@ -50,8 +56,18 @@ class Promocion(models.Model):
     imagen_url = models.ImageField(upload_to='promociones/', blank=True, null=True)
     activo = models.BooleanField(default=True)
 
+    dependencias = {'__str__': ('nombre',)}
+
     class Meta:
         ordering = ['-fecha_inicio', 'nombre']
+        indexes = [
+            models.Index(fields=['activo', 'fecha_inicio', 'fecha_fin'], name='promocion_activo_fechas_idx'),
+            # cargar_promociones() busca las vigentes entre las que están en catálogo o en carrito
+            models.Index(
+                fields=['fecha_inicio', 'fecha_fin'], condition=Q(activo=True) | Q(activa=True),
+                name='promocion_vigente_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.nombre
@@ -80,29 +96,43 @@ class Producto(models.Model):
     activo = models.BooleanField(default=True)
     promociones = models.ManyToManyField(Promocion, through='ProductoPromocion', related_name='productos')
 
+    dependencias = {'__str__': ('nombre',)}
+
     class Meta:
         ordering = ['nombre']
         unique_together = ('categoria', 'nombre')
+        indexes = [
+            models.Index(fields=['activo', 'stock'], name='producto_activo_stock_idx'),
+            # El catálogo solo lista activos y ordena por nombre
+            models.Index(fields=['nombre'], condition=Q(activo=True), name='producto_catalogo_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
 
+    def obtener_promociones_vigentes(self):
+        # Sale de la foto en caché de promociones, sin query por producto
+        if not hasattr(self, 'promociones_vigentes'):
+            from .promociones import promociones_activas
+            self.promociones_vigentes = promociones_activas().promociones_de(self.pk)
+        return self.promociones_vigentes
+
     def precio_con_descuento(self):
-        hoy = timezone.now().date()
         precio_final = self.precio
-        for promo in self.promociones.filter(activo=True, fecha_inicio__lte=hoy, fecha_fin__gte=hoy):
+        for promo in self.obtener_promociones_vigentes():
             precio_final = promo.aplicar_descuento(precio_final)
         return precio_final.quantize(Decimal('0.01'))
 
     def tiene_descuento_activo(self):
-        hoy = timezone.now().date()
-        return self.promociones.filter(activo=True, fecha_inicio__lte=hoy, fecha_fin__gte=hoy).exists()
+        return bool(self.obtener_promociones_vigentes())
 
 
 class ProductoPromocion(models.Model):
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
     promocion = models.ForeignKey(Promocion, on_delete=models.CASCADE)
 
+    dependencias = {'__str__': ('producto', 'promocion')}
+
     class Meta:
         unique_together = ('producto', 'promocion')
 
@@ -116,6 +146,8 @@ class Novedad(models.Model):
     fecha_publicacion = models.DateField(default=timezone.now)
     imagen_url = models.ImageField(upload_to='novedades/', blank=True, null=True)
 
+    dependencias = {'__str__': ('titulo',)}
+
     class Meta:
         ordering = ['-fecha_publicacion']
 
@@ -131,18 +163,27 @@ class Carrito(models.Model):
     subtotal = models.DecimalField(max_digits=10,decimal_places=2, default=Decimal("0.00"))
     total_descuento = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
     total = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
+    # Llave de promociones y precios con la que se calcularon los totales (ver totales.py)
+    version_totales = models.CharField(max_length=64, blank=True, default='')
+
+    dependencias = {'__str__': ('id', 'cliente')}
 
     class Meta:
         ordering = ['-fecha_actualizacion']
+        constraints = [
+            # Un solo carrito activo por cliente; también es el índice de la búsqueda del carrito
+            models.UniqueConstraint(fields=['cliente'], condition=Q(activo=True), name='carrito_activo_unico'),
+        ]
 
     def __str__(self):
         return f'Carrito #{self.id} - {self.cliente}'
     
     def calcular_subtotal(self):
-        return sum(item.subtotal() for item in self.items.all())
+        importe = self.items.aggregate(importe=Sum(F('precio_unitario_actual') * F('cantidad')))['importe']
+        return (importe or Decimal('0.00')).quantize(Decimal('0.01'))
 
     def calcular_total(self):
-        return sum(item.subtotal() for item in self.items.all())
+        return self.calcular_subtotal()
     
     def vaciar(self):
         self.items.all().delete()
@@ -155,6 +196,9 @@ class ItemCarrito(models.Model):
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
     cantidad = models.PositiveIntegerField(default=1)
     precio_unitario_actual = models.DecimalField(max_digits=10, decimal_places=2)
+    reserva_expira = models.DateTimeField(blank=True, null=True)
+
+    dependencias = {'__str__': ('producto', 'cantidad')}
 
     class Meta:
         unique_together = ('carrito', 'producto')
@@ -191,8 +235,17 @@ class Pedido(models.Model):
     confirmado_cliente = models.BooleanField(default=False)
     confirmado_admin = models.BooleanField(default=False)
 
+    dependencias = {
+        '__str__': ('id', 'cliente'),
+        'fecha_de_pedido': ('fecha_pedido',),
+    }
+
     class Meta:
         ordering = ['-fecha_pedido']
+        indexes = [
+            models.Index(fields=['cliente', '-fecha_pedido'], name='pedido_cliente_fecha_idx'),
+            models.Index(fields=['estado_pedido', '-fecha_pedido'], name='pedido_estado_fecha_idx'),
+        ]
 
     def __str__(self):
         return f'Pedido #{self.id} - {self.cliente}'
@@ -225,6 +278,8 @@ class DetallePedido(models.Model):
     cantidad = models.PositiveIntegerField()
     precio_unitario_venta = models.DecimalField(max_digits=10, decimal_places=2)
 
+    dependencias = {'__str__': ('producto', 'cantidad')}
+
     class Meta:
         verbose_name_plural = 'Detalles de Pedido'
 
@@ -235,6 +290,30 @@ class DetallePedido(models.Model):
         return (self.precio_unitario_venta * self.cantidad).quantize(Decimal('0.01'))
 
 
+class DescuentoPedido(models.Model):
+    """Cuánto descontó cada promoción en un pedido; permite reconstruir los resúmenes."""
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='descuentos')
+    promocion = models.ForeignKey(Promocion, on_delete=models.CASCADE, related_name='+')
+    monto = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        unique_together = ('pedido', 'promocion')
+
+    def __str__(self):
+        return f'{self.promocion} -{self.monto}'
+
+
+class ClaveIdempotencia(models.Model):
+    """Token de un envío de checkout; un reintento con el mismo token no crea otro pedido."""
+    clave = models.CharField(max_length=64, unique=True)
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='claves_idempotencia')
+    pedido = models.ForeignKey(Pedido, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.clave
+
+
 class MensajeContacto(models.Model):
     nombre_remitente = models.CharField(max_length=120)
     email_remitente = models.EmailField()
@@ -242,12 +321,113 @@ class MensajeContacto(models.Model):
     fecha_envio = models.DateTimeField(auto_now_add=True)
     leido = models.BooleanField(default=False)
 
+    dependencias = {
+        '__str__': ('nombre_remitente', 'email_remitente'),
+        'fecha_envio_legible': ('fecha_envio',),
+    }
+
     @property
     def fecha_envio_legible(self):
         return date_format(localtime(self.fecha_envio), "d/m/Y H:i")
     
     class Meta:
         ordering = ['-fecha_envio']
+        indexes = [
+            models.Index(fields=['leido', '-fecha_envio'], name='mensaje_leido_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.nombre_remitente} - {self.email_remitente}'
+
+
+class TokenBusquedaAdmin(models.Model):
+    """Índice invertido de los search_fields de cada listado del panel."""
+    slug = models.CharField(max_length=50)
+    token = models.CharField(max_length=64)
+    objeto_id = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['slug', 'token', 'objeto_id'], name='token_busqueda_idx'),
+            models.Index(fields=['slug', 'objeto_id'], name='token_objeto_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.slug}:{self.token} → {self.objeto_id}'
+
+
+class IndiceBusquedaAdmin(models.Model):
+    """Listados cuyo índice ya se construyó completo; los demás buscan con icontains."""
+    slug = models.CharField(max_length=50, unique=True)
+    construido_en = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.slug} ({self.construido_en:%Y-%m-%d %H:%M})'
+
+
+# ---------- Resúmenes de ventas (los mantiene analitica.py) ----------
+
+class ResumenVentasHora(models.Model):
+    fecha = models.DateField()
+    hora = models.PositiveSmallIntegerField()
+    pedidos = models.PositiveIntegerField(default=0)
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    descuentos = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        unique_together = ('fecha', 'hora')
+
+
+class ResumenVentasProducto(models.Model):
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        unique_together = ('fecha', 'producto')
+
+
+class ResumenVentasCategoria(models.Model):
+    fecha = models.DateField()
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='+')
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        unique_together = ('fecha', 'categoria')
+
+
+class ResumenPedidosEstado(models.Model):
+    fecha = models.DateField()
+    estado_pedido = models.CharField(max_length=20, choices=Pedido.EstadoPedido.choices)
+    metodo_pago = models.CharField(max_length=20, choices=Pedido.MetodoPago.choices)
+    pedidos = models.IntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        unique_together = ('fecha', 'estado_pedido', 'metodo_pago')
+
+
+class ResumenDescuentoPromocion(models.Model):
+    fecha = models.DateField()
+    promocion = models.ForeignKey(Promocion, on_delete=models.CASCADE, related_name='+')
+    pedidos = models.PositiveIntegerField(default=0)
+    descuento = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        unique_together = ('fecha', 'promocion')
+
+
+class ImagenDerivada(models.Model):
+    """Variantes redimensionadas de una imagen subida (las genera imagenes.py)."""
+    original = models.CharField(max_length=255, unique=True)
+    huella = models.CharField(max_length=64)
+    ancho = models.PositiveIntegerField()
+    alto = models.PositiveIntegerField()
+    anchos = models.JSONField(default=list)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f'{self.nombre_remitente} - {self.email_remitente}'
\ No newline at end of file
+        return f'{self.original} → {self.huella}'
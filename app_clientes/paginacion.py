@@ -0,0 +1,139 @@
+# app_clientes/paginacion.py
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+
+POR_PAGINA_DEFECTO = 25
+TIEMPO_CACHE_CONTEO = 60 * 5
+
+
+def _codificar(valores):
+    texto = json.dumps(valores, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def _decodificar(cursor):
+    relleno = '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(cursor + relleno).decode())
+
+
+def _campo(model, ruta):
+    """Resuelve 'cliente__user__username' al Field final."""
+    partes = ruta.split('__')
+    for parte in partes[:-1]:
+        model = model._meta.get_field(parte).related_model
+    return model._meta.get_field(partes[-1])
+
+
+def _valor(obj, ruta):
+    for parte in ruta.split('__'):
+        obj = getattr(obj, parte)
+    return obj
+
+
+class PaginaKeyset:
+    """
+    Paginación por llave (seek): en vez de OFFSET filtra por los valores de la
+    última fila vista, así que cada página cuesta lo mismo sin importar qué
+    tan lejos esté. El orden siempre termina en pk para que sea total.
+    Los campos de orden no deben admitir NULL.
+    """
+
+    def __init__(self, queryset, orden=None, por_pagina=POR_PAGINA_DEFECTO):
+        model = queryset.model
+        orden = list(orden or model._meta.ordering or ['-pk'])
+        if not any(campo.lstrip('-') in ('pk', 'id') for campo in orden):
+            orden.append('-pk' if orden[0].startswith('-') else 'pk')
+        self.queryset = queryset
+        self.orden = orden
+        self.rutas = [
+            model._meta.pk.name if campo.lstrip('-') == 'pk' else campo.lstrip('-') for campo in orden
+        ]
+        self.descendente = [campo.startswith('-') for campo in orden]
+        self.campos = [_campo(model, ruta) for ruta in self.rutas]
+        self.por_pagina = por_pagina
+
+    def _filtro(self, valores, hacia_atras):
+        filtro = Q()
+        for i, ruta in enumerate(self.rutas):
+            mayor = self.descendente[i] == hacia_atras
+            paso = Q(**{f"{ruta}__{'gt' if mayor else 'lt'}": valores[i]})
+            for previa, valor in zip(self.rutas[:i], valores[:i]):
+                paso &= Q(**{previa: valor})
+            filtro |= paso
+        return filtro
+
+    def _valores_cursor(self, cursor):
+        """Valores del cursor ya convertidos; uno alterado o viejo cuenta como sin cursor."""
+        try:
+            crudos = _decodificar(cursor)
+            if not isinstance(crudos, list) or len(crudos) != len(self.campos):
+                return None
+            valores = [campo.to_python(valor) for campo, valor in zip(self.campos, crudos)]
+        except (ValueError, TypeError, ValidationError):
+            return None
+        # Los campos de orden no admiten NULL y "__gt=None" no es una consulta válida
+        return None if any(valor is None for valor in valores) else valores
+
+    def cursor(self, obj):
+        return _codificar([_valor(obj, ruta) for ruta in self.rutas])
+
+    def obtener(self, despues=None, antes=None):
+        queryset = self.queryset
+        hacia_atras = bool(antes) and not despues
+        valores = self._valores_cursor(antes if hacia_atras else despues) if (despues or antes) else None
+
+        if valores is not None:
+            queryset = queryset.filter(self._filtro(valores, hacia_atras))
+        if hacia_atras:
+            orden = [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in self.orden]
+        else:
+            orden = self.orden
+
+        objetos = list(queryset.order_by(*orden)[:self.por_pagina + 1])
+        hay_mas = len(objetos) > self.por_pagina
+        objetos = objetos[:self.por_pagina]
+        if hacia_atras:
+            objetos.reverse()
+
+        self.objetos = objetos
+        if hacia_atras:
+            self.tiene_siguiente = True
+            self.tiene_anterior = hay_mas
+        else:
+            self.tiene_siguiente = hay_mas
+            self.tiene_anterior = valores is not None
+        self.cursor_siguiente = self.cursor(objetos[-1]) if objetos and self.tiene_siguiente else None
+        self.cursor_anterior = self.cursor(objetos[0]) if objetos and self.tiene_anterior else None
+        return self
+
+
+def conteo_aproximado(queryset):
+    """
+    Conteo barato para mostrar "~N registros". En Postgres usa la estimación
+    del planificador para tablas sin filtro; en otro caso cachea el COUNT
+    unos minutos por consulta.
+    """
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table],
+            )
+            fila = cursor.fetchone()
+        if fila and fila[0] >= 0:
+            return fila[0]
+
+    sql, params = queryset.query.sql_with_params()
+    huella = hashlib.sha1(f'{sql}|{params}'.encode()).hexdigest()
+    clave = f'circley:conteo:{huella}'
+    total = cache.get(clave)
+    if total is None:
+        total = queryset.count()
+        cache.set(clave, total, TIEMPO_CACHE_CONTEO)
+    return total
@@ -0,0 +1,46 @@
+# app_clientes/precios.py
+from .promociones import apromociones_activas, promociones_activas
+from .versiones import llave_versiones
+
+
+def con_precios(productos):
+    """
+    Asigna a cada producto sus promociones vigentes tomadas de la foto en
+    caché, de modo que precio final y descuento no hagan queries por tarjeta.
+    """
+    foto = promociones_activas()
+    productos = list(productos)
+    for producto in productos:
+        producto.promociones_vigentes = foto.promociones_de(producto.pk)
+    return productos
+
+
+async def acon_precios(productos):
+    """con_precios() para vistas async: un queryset se lee con el ORM async."""
+    foto = await apromociones_activas()
+    # La búsqueda por rango ya devuelve una lista
+    productos = [producto async for producto in productos] if hasattr(productos, '__aiter__') else list(productos)
+    for producto in productos:
+        producto.promociones_vigentes = foto.promociones_de(producto.pk)
+    return productos
+
+
+def llave_tarjetas_productos():
+    """
+    Lo que cambia una tarjeta de producto además de su pk: el producto, su
+    categoría y las promociones vigentes (versión y día en que se armó la foto).
+    """
+    foto = promociones_activas()
+    return f"{llave_versiones('productos', 'categorias')}:{foto.version}:{foto.desde}"
+
+
+async def allave_tarjetas_productos():
+    foto = await apromociones_activas()
+    return f"{llave_versiones('productos', 'categorias')}:{foto.version}:{foto.desde}"
+
+
+def precio_efectivo(producto):
+    """Precio a cobrar del producto con las promociones vigentes aplicadas."""
+    if producto.tiene_descuento_activo():
+        return producto.precio_con_descuento()
+    return producto.precio
@@ -0,0 +1,223 @@
+# app_clientes/promociones.py
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Min, Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Promocion, ProductoPromocion
+from .replicas import en_primaria
+from .versiones import obtener_version
+
+CERO = Decimal("0.00")
+CENTAVO = Decimal("0.01")
+TIEMPO_CACHE = 60 * 60 * 24
+
+
+def redondear(valor):
+    return valor.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+class ReglaPromocion:
+    """
+    Promoción vigente junto con los ids de productos a los que aplica. El
+    descuento recae solo sobre `productos` (como antes); `combo` únicamente
+    decide si la promoción entra, según cuántos de esos productos hay en el carrito.
+    """
+
+    def __init__(self, promocion, productos=(), combo=()):
+        self.promocion = promocion
+        self.productos = frozenset(productos)
+        self.combo = frozenset(combo)
+
+    @property
+    def relevantes(self):
+        """Productos cuyo cambio en el carrito puede mover esta promoción."""
+        return self.productos | self.combo
+
+    @property
+    def aplica_a_todo(self):
+        """Un porcentaje sin productos descuenta sobre todo el carrito: cualquier cambio lo mueve."""
+        return not self.productos and self.promocion.tipo_descuento == Promocion.TipoDescuento.PORCENTAJE
+
+    def combo_cumplido(self, productos_en_carrito):
+        if not self.combo:
+            return True
+        requeridos = self.promocion.productos_requeridos or len(self.combo)
+        return len(self.combo & productos_en_carrito) >= requeridos
+
+
+class PromocionesActivas:
+    """
+    Foto de las promociones vigentes entre `desde` y `hasta` (exclusivo).
+    `catalogo` son las que afectan el precio mostrado (activo) y `reglas`
+    las que evalúa el carrito (activa).
+    """
+
+    def __init__(self, version, desde, hasta, promociones, productos, combos):
+        self.version = version
+        self.desde = desde
+        self.hasta = hasta
+        self.catalogo = [promo for promo in promociones if promo.activo]
+        self.reglas = [
+            ReglaPromocion(promo, productos[promo.pk], combos[promo.pk])
+            for promo in promociones if promo.activa
+        ]
+        self.por_producto = defaultdict(list)
+        for promo in self.catalogo:
+            for producto_id in productos[promo.pk]:
+                self.por_producto[producto_id].append(promo)
+
+    def vigente(self, version, hoy):
+        return self.version == version and self.desde <= hoy and (self.hasta is None or hoy < self.hasta)
+
+    def promociones_de(self, producto_id):
+        return list(self.por_producto.get(producto_id, ()))
+
+    @cached_property
+    def productos_con_reglas(self):
+        """Productos cuyo cambio en el carrito puede mover el descuento (sin contar las reglas globales)."""
+        return frozenset().union(*(regla.relevantes for regla in self.reglas))
+
+    @cached_property
+    def hay_reglas_globales(self):
+        return any(regla.aplica_a_todo for regla in self.reglas)
+
+    def mueve_descuento(self, producto_id):
+        return self.hay_reglas_globales or producto_id in self.productos_con_reglas
+
+
+def cargar_promociones(version, hoy=None):
+    """
+    Arma la foto de promociones vigentes con un número fijo de queries.
+    La foto caduca en la siguiente fecha en la que alguna promoción empieza
+    o termina, así que no hay que invalidarla a medianoche.
+    """
+    hoy = hoy or timezone.now().date()
+    candidatas = Promocion.objects.filter(Q(activo=True) | Q(activa=True))
+    # La foto se guarda bajo `version`: se lee de la primaria aunque la vista use réplica
+    with en_primaria():
+        promociones = list(candidatas.filter(fecha_inicio__lte=hoy, fecha_fin__gte=hoy))
+        ids = [promo.pk for promo in promociones]
+
+        productos = defaultdict(set)
+        for promo_id, producto_id in ProductoPromocion.objects.filter(promocion_id__in=ids).values_list('promocion_id', 'producto_id'):
+            productos[promo_id].add(producto_id)
+
+        combos = defaultdict(set)
+        Combo = Promocion.productos_combo.through
+        for promo_id, producto_id in Combo.objects.filter(promocion_id__in=ids).values_list('promocion_id', 'producto_id'):
+            combos[promo_id].add(producto_id)
+
+        proxima = candidatas.filter(fecha_inicio__gt=hoy).aggregate(inicio=Min('fecha_inicio'))['inicio']
+
+    fronteras = [promo.fecha_fin + timedelta(days=1) for promo in promociones]
+    if proxima:
+        fronteras.append(proxima)
+
+    return PromocionesActivas(version, hoy, min(fronteras, default=None), promociones, productos, combos)
+
+
+_local = {'foto': None}
+ESTADISTICAS = Counter()
+
+
+def _foto_en_cache(version, hoy):
+    foto = _local['foto']
+    if foto is not None and foto.vigente(version, hoy):
+        ESTADISTICAS['aciertos_locales'] += 1
+        return foto
+
+    foto = cache.get(f'circley:promociones:{version}')
+    if foto is not None and foto.vigente(version, hoy):
+        ESTADISTICAS['aciertos_compartidos'] += 1
+        _local['foto'] = foto
+        return foto
+    ESTADISTICAS['fallos'] += 1
+    return None
+
+
+def _guardar_foto(foto):
+    cache.set(f'circley:promociones:{foto.version}', foto, TIEMPO_CACHE)
+    _local['foto'] = foto
+    return foto
+
+
+def promociones_activas():
+    """
+    Devuelve la foto vigente buscando primero en memoria del proceso, luego
+    en la caché compartida de Django y solo al final en la base de datos.
+    """
+    hoy = timezone.now().date()
+    version = obtener_version('promociones')
+    return _foto_en_cache(version, hoy) or _guardar_foto(cargar_promociones(version, hoy))
+
+
+async def apromociones_activas():
+    """Versión para vistas async: solo sale del event loop si hay que ir a la base."""
+    hoy = timezone.now().date()
+    version = obtener_version('promociones')
+    foto = _foto_en_cache(version, hoy)
+    if foto is None:
+        foto = _guardar_foto(await sync_to_async(cargar_promociones)(version, hoy))
+    return foto
+
+
+def estadisticas_cache():
+    return dict(ESTADISTICAS)
+
+
+def descuento_bogo(items, regla):
+    total_descuento = CERO
+    for item in items:
+        if item.producto_id in regla.productos:
+            pares = item.cantidad // 2
+            if pares:
+                precio_unitario = item.precio_unitario_actual or item.producto.precio
+                total_descuento += redondear(pares * precio_unitario)
+    return total_descuento
+
+
+def descuento_porcentaje(items, regla):
+    if regla.productos:
+        items = [item for item in items if item.producto_id in regla.productos]
+
+    subtotal = sum((item.cantidad * item.producto.precio for item in items), CERO)
+    if subtotal <= 0 or not regla.promocion.valor_descuento:
+        return CERO
+
+    porcentaje = Decimal(regla.promocion.valor_descuento) / Decimal("100")
+    return redondear(subtotal * porcentaje)
+
+
+CALCULOS = {
+    Promocion.TipoDescuento.BOGO: descuento_bogo,
+    Promocion.TipoDescuento.PORCENTAJE: descuento_porcentaje,
+}
+
+
+def evaluar_carrito(items, reglas):
+    """
+    Calcula subtotal y descuentos de un carrito en memoria.
+    `items` debe traer el producto cargado (select_related). Devuelve
+    (subtotal, total_descuento, {promocion_id: descuento}).
+    """
+    items = list(items)
+    subtotal = redondear(sum((item.cantidad * item.producto.precio for item in items), CERO))
+    en_carrito = {item.producto_id for item in items}
+
+    por_promocion = {}
+    for regla in reglas:
+        calculo = CALCULOS.get(regla.promocion.tipo_descuento)
+        if calculo is None or not regla.combo_cumplido(en_carrito):
+            continue
+        descuento = calculo(items, regla)
+        if descuento:
+            por_promocion[regla.promocion.pk] = descuento
+
+    total_descuento = sum(por_promocion.values(), CERO).quantize(CENTAVO)
+    return subtotal, total_descuento, por_promocion
@@ -0,0 +1,165 @@
+# app_clientes/replicas.py
+"""
+Lecturas en réplicas, escrituras en la primaria.
+
+Solo las vistas marcadas con @lectura_en_replica leen de una réplica
+(REPLICAS_LECTURA en settings); todo lo demás, y cualquier lectura dentro de
+una transacción, va a 'default'. Cuando una request escribe, el navegador
+recibe una cookie que durante REPLICAS_VENTANA_PRIMARIA segundos manda sus
+lecturas a la primaria, así ve lo que acaba de guardar aunque la réplica
+vaya atrasada.
+
+Lo que se guarda en una caché con llave de versión (foto de promociones,
+menú, tarjetas, páginas) se arma con en_primaria(): la versión sale de la
+caché y ya es la nueva, y una réplica atrasada dejaría bajo ella los datos
+viejos hasta la siguiente edición.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+COOKIE_PRIMARIA = 'circley_primaria'
+
+# Una sesión que aún no llega a la réplica se leería vacía y Django borraría la cookie
+APPS_SIEMPRE_PRIMARIA = {'sessions'}
+
+# Escrituras de mantenimiento que el visitante no vuelve a leer (las variantes de
+# imagen que se registran al pintar una tarjeta): no fijan su sesión a la primaria
+MODELOS_SIN_FIJAR = {'app_clientes.ImagenDerivada'}
+
+_estado = ContextVar('circley_replicas', default=None)
+_primaria_forzada = ContextVar('circley_primaria_forzada', default=False)
+
+
+@dataclass
+class EstadoRequest:
+    en_replica: bool = False
+    escribio: bool = False
+
+
+def replicas_lectura():
+    return getattr(settings, 'REPLICAS_LECTURA', [])
+
+
+def _ventana():
+    return getattr(settings, 'REPLICAS_VENTANA_PRIMARIA', 10)
+
+
+def lee_de_replica():
+    """Si las lecturas de este punto de la request irían a una réplica."""
+    estado = _estado.get()
+    return bool(estado and estado.en_replica and replicas_lectura() and not _primaria_forzada.get())
+
+
+@contextmanager
+def en_primaria():
+    """Dentro del bloque todas las lecturas van a 'default', también desde hilos de sync_to_async."""
+    token = _primaria_forzada.set(True)
+    try:
+        yield
+    finally:
+        _primaria_forzada.reset(token)
+
+
+class EnrutadorReplicas:
+    """DATABASE_ROUTERS: las réplicas son copias de 'default', nunca se migran ni se escriben."""
+
+    def db_for_read(self, model, **hints):
+        if not lee_de_replica() or model._meta.app_label in APPS_SIEMPRE_PRIMARIA:
+            return DEFAULT_DB_ALIAS
+        # Dentro de atomic() (select_for_update, lectura antes de escribir) manda la primaria
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas_lectura())
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None and model._meta.label not in MODELOS_SIN_FIJAR:
+            estado.escribio = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas y primaria tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas_lectura()
+
+
+class ReplicasMiddleware:
+    """
+    Debe ir antes de SessionMiddleware: así la escritura de la sesión (p. ej.
+    al iniciar sesión) también cuenta como escritura.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        estado = EstadoRequest()
+        request.circley_primaria = COOKIE_PRIMARIA in request.COOKIES
+        token = _estado.set(estado)
+        try:
+            response = self.get_response(request)
+        finally:
+            _estado.reset(token)
+        return self.fijar_primaria(estado, response)
+
+    async def __acall__(self, request):
+        # sync_to_async copia el contexto: el ORM en otro hilo ve y marca este mismo estado
+        estado = EstadoRequest()
+        request.circley_primaria = COOKIE_PRIMARIA in request.COOKIES
+        token = _estado.set(estado)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _estado.reset(token)
+        return self.fijar_primaria(estado, response)
+
+    def fijar_primaria(self, estado, response):
+        if estado.escribio and replicas_lectura():
+            response.set_cookie(COOKIE_PRIMARIA, '1', max_age=_ventana(), httponly=True, samesite='Lax')
+        return response
+
+
+def lectura_en_replica(vista):
+    """Las consultas de la vista van a una réplica, salvo que la sesión esté fijada a la primaria."""
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(request, *args, **kwargs):
+            estado = _estado.get()
+            if estado is None or getattr(request, 'circley_primaria', False):
+                return await vista(request, *args, **kwargs)
+            anterior = estado.en_replica
+            estado.en_replica = True
+            try:
+                return await vista(request, *args, **kwargs)
+            finally:
+                estado.en_replica = anterior
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        estado = _estado.get()
+        if estado is None or getattr(request, 'circley_primaria', False):
+            return vista(request, *args, **kwargs)
+        anterior = estado.en_replica
+        estado.en_replica = True
+        try:
+            return vista(request, *args, **kwargs)
+        finally:
+            estado.en_replica = anterior
+    return envoltura
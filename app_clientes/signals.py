@@ -0,0 +1,136 @@
+# app_clientes/signals.py
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import analitica, busqueda_admin, imagenes
+from .busqueda import obtener_backend
+from .models import Categoria, Novedad, Pedido, Producto, Promocion, ProductoPromocion
+from .versiones import invalidar_al_confirmar
+
+
+@receiver(post_save, sender=Promocion)
+@receiver(post_delete, sender=Promocion)
+@receiver(post_save, sender=ProductoPromocion)
+@receiver(post_delete, sender=ProductoPromocion)
+def invalidar_promociones(sender, **kwargs):
+    invalidar_al_confirmar('promociones')
+
+
+@receiver(m2m_changed, sender=ProductoPromocion)
+@receiver(m2m_changed, sender=Promocion.productos_combo.through)
+def invalidar_relaciones_promociones(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidar_al_confirmar('promociones')
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_categorias(sender, **kwargs):
+    invalidar_al_confirmar('categorias')
+
+
+CAMPOS_BUSQUEDA = {'nombre', 'descripcion', 'categoria', 'categoria_id'}
+
+
+def _cambio_relevante(update_fields, campos):
+    # save(update_fields=['stock']) del carrito no debe reindexar
+    return update_fields is None or bool(set(update_fields) & campos)
+
+
+@receiver(post_save, sender=Producto)
+def invalidar_precios(sender, instance, created=False, update_fields=None, **kwargs):
+    # Un producto nuevo no está en ningún carrito; un cambio de precio mueve sus totales
+    if not created and _cambio_relevante(update_fields, {'precio'}):
+        invalidar_al_confirmar('precios')
+
+
+@receiver(post_delete, sender=Producto)
+def invalidar_precios_al_borrar(sender, **kwargs):
+    invalidar_al_confirmar('precios', 'productos')
+
+
+# Lo que se ve en la tarjeta del catálogo; el stock que mueve el carrito no cuenta
+CAMPOS_TARJETA = {'nombre', 'descripcion', 'precio', 'imagen_url', 'categoria', 'categoria_id', 'activo'}
+
+
+@receiver(post_save, sender=Producto)
+def invalidar_tarjetas_productos(sender, update_fields=None, **kwargs):
+    if _cambio_relevante(update_fields, CAMPOS_TARJETA):
+        invalidar_al_confirmar('productos')
+
+
+@receiver(post_save, sender=Novedad)
+@receiver(post_delete, sender=Novedad)
+def invalidar_novedades(sender, **kwargs):
+    invalidar_al_confirmar('novedades')
+
+
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, update_fields=None, **kwargs):
+    if _cambio_relevante(update_fields, CAMPOS_BUSQUEDA):
+        obtener_backend().indexar([instance.pk])
+
+
+@receiver(post_delete, sender=Producto)
+def desindexar_producto(sender, instance, **kwargs):
+    obtener_backend().eliminar([instance.pk])
+
+
+@receiver(post_save, sender=Categoria)
+def reindexar_categoria(sender, instance, created=False, update_fields=None, **kwargs):
+    if not created and _cambio_relevante(update_fields, {'nombre'}):
+        obtener_backend().indexar(instance.productos.values_list('pk', flat=True))
+
+
+CAMPOS_RESUMEN_PEDIDO = ('estado_pedido', 'metodo_pago', 'total')
+
+
+@receiver(post_init, sender=Pedido)
+def recordar_resumen_pedido(sender, instance, **kwargs):
+    # Solo lo ya cargado: con .only() no debe salir una query por fila
+    valores = tuple(instance.__dict__.get(campo) for campo in CAMPOS_RESUMEN_PEDIDO)
+    instance._resumen_original = None if None in valores else valores
+
+
+@receiver(post_save, sender=Pedido)
+def resumir_cambio_pedido(sender, instance, created=False, update_fields=None, **kwargs):
+    # Las altas las suma crear_pedido con sus líneas; aquí solo se mueven las existentes
+    original = instance._resumen_original
+    recordar_resumen_pedido(sender, instance)
+    if created or original is None or not _cambio_relevante(update_fields, set(CAMPOS_RESUMEN_PEDIDO)):
+        return
+    if original != instance._resumen_original:
+        analitica.registrar_cambio(instance, *original)
+
+
+@receiver(post_delete, sender=Pedido)
+def resumir_baja_pedido(sender, instance, **kwargs):
+    # Cubre el borrado desde el panel, las acciones masivas y la cascada de un cliente
+    analitica.rehacer_dia_al_confirmar(instance)
+
+
+@receiver(post_init, sender=Producto)
+@receiver(post_init, sender=Promocion)
+@receiver(post_init, sender=Novedad)
+def recordar_imagen(sender, instance, **kwargs):
+    # Se guarda el nombre: el FieldFile es el mismo objeto que luego cambia al subir
+    valor = instance.__dict__.get('imagen_url')
+    instance._imagen_original = getattr(valor, 'name', valor) or ''
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Promocion)
+@receiver(post_save, sender=Novedad)
+def derivar_imagen(sender, instance, update_fields=None, **kwargs):
+    # Las variantes se generan al confirmar, fuera de la transacción del guardado
+    original = instance._imagen_original
+    recordar_imagen(sender, instance)
+    nombre = instance.imagen_url.name if instance.imagen_url else ''
+    if nombre and nombre != original and _cambio_relevante(update_fields, {'imagen_url'}):
+        transaction.on_commit(partial(imagenes.generar_al_subir, nombre))
+
+
+busqueda_admin.conectar_senales()
@@ -1,8 +1,11 @@
 # app_clientes/templatetags/ui_extras.py
 import re
+from functools import lru_cache
 from django import template
 from django.utils.safestring import mark_safe
-from django.utils.html import conditional_escape
+from django.utils.html import conditional_escape, format_html
+
+from app_clientes import imagenes
 
 register = template.Library()
 
@@ -14,12 +17,16 @@ def currency(value):
     except (TypeError, ValueError):
         return value
 
+@lru_cache(maxsize=256)
+def _patron_resaltado(search):
+    return re.compile(re.escape(search), re.IGNORECASE)
+
 @register.filter
 def highlight(text, search):
     if not search:
         return text
     text = conditional_escape(text)
-    pattern = re.compile(re.escape(search), re.IGNORECASE)
+    pattern = _patron_resaltado(search)
     highlighted = pattern.sub(lambda m: f'<span class="resaltado">{m.group(0)}</span>', text)
     return mark_safe(highlighted)
 
@@ -77,6 +84,25 @@ def file_url(value):
         return ''
     return getattr(value, 'url', '')
 
+@register.simple_tag
+def imagen_responsiva(archivo, alt='', sizes='(max-width: 600px) 90vw, 280px', ancho=320):
+    """
+    <picture> con srcset WebP y JPEG de las variantes de `archivo`; `ancho` elige
+    la variante del src para navegadores sin srcset. Sin variantes, la original.
+    """
+    if not archivo:
+        return ''
+    manifiesto = imagenes.asegurar(archivo.name)
+    if not manifiesto:
+        return format_html('<img src="{}" alt="{}" loading="lazy" decoding="async">', archivo.url, alt)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" width="{}" height="{}" loading="lazy" decoding="async"></picture>',
+        imagenes.srcset(manifiesto, 'webp'), sizes,
+        imagenes.url_variante(manifiesto, 'jpg', ancho), imagenes.srcset(manifiesto, 'jpg'), sizes,
+        alt, manifiesto['ancho'], manifiesto['alto'],
+    )
+
 @register.filter
 def fk_value(instance, field_name):
     """Devuelve el PK del campo foráneo (o el valor directo)."""
@@ -1,3 +1,926 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import io
+import json
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages.storage.session import SessionStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image as PILImage
+
+from backend_circley.base_datos import opciones_sqlite, pragmas_sqlite
+from backend_circley.cache_compartida import cache_por_omision
+
+from . import (
+    acciones, analitica, busqueda, busqueda_admin, exportacion, imagenes, importacion, inventario, promociones,
+    replicas, totales, vistas_async,
+)
+from .cache_paginas import _se_puede_cachear_async, cache_anonima
+from .instrumentacion import InstrumentacionMiddleware
+from .models import (
+    Carrito, Categoria, ClaveIdempotencia, Cliente, DescuentoPedido, DetallePedido, ImagenDerivada, ItemCarrito,
+    MensajeContacto, Novedad, Pedido, Producto, ProductoPromocion, Promocion, ResumenPedidosEstado,
+    ResumenVentasHora, ResumenVentasProducto,
+)
+from .paginacion import PaginaKeyset
+from .pedidos import PedidoDuplicado, crear_pedido, purgar_claves_vencidas
+from .precios import llave_tarjetas_productos
+from .promociones import ReglaPromocion, evaluar_carrito, promociones_activas
+from .versiones import llave_versiones
+from .views import CRUD_CONFIG, TIEMPO_TARJETAS, tiempo_tarjetas
+
+
+def crear_productos(cantidad, categoria=None):
+    categoria = categoria or Categoria.objects.create(nombre='Pruebas')
+    return [
+        Producto.objects.create(categoria=categoria, nombre=f'Producto {i:02d}', precio=Decimal('10.00') + i, stock=10)
+        for i in range(cantidad)
+    ]
+
+
+def crear_admin(username='admin-pruebas'):
+    return User.objects.create_user(username=username, password='x', is_staff=True)
+
+
+def sembrar(cantidad, prefijo='s'):
+    """`cantidad` filas de cada modelo del panel, cada una con sus propias filas relacionadas."""
+    hoy = timezone.now().date()
+    for i in range(cantidad):
+        user = User.objects.create_user(username=f'{prefijo}-cliente-{i}', first_name='Nombre', last_name=f'{i}')
+        cliente = Cliente.objects.create(user=user, direccion='Calle')
+        categoria = Categoria.objects.create(nombre=f'{prefijo}-categoria-{i}')
+        producto = Producto.objects.create(categoria=categoria, nombre=f'{prefijo}-producto-{i}', precio=Decimal('10.00'), stock=10)
+        promocion = Promocion.objects.create(
+            nombre=f'{prefijo}-promo-{i}', tipo_descuento=Promocion.TipoDescuento.PORCENTAJE,
+            valor_descuento=Decimal('5'), fecha_inicio=hoy, fecha_fin=hoy,
+        )
+        ProductoPromocion.objects.create(producto=producto, promocion=promocion)
+        Novedad.objects.create(titulo=f'{prefijo}-novedad-{i}', descripcion='Texto')
+        carrito = Carrito.objects.create(cliente=cliente)
+        ItemCarrito.objects.create(carrito=carrito, producto=producto, cantidad=1, precio_unitario_actual=producto.precio)
+        pedido = Pedido.objects.create(cliente=cliente, direccion_envio='Calle', metodo_pago=Pedido.MetodoPago.EFECTIVO)
+        DetallePedido.objects.create(pedido=pedido, producto=producto, cantidad=1, precio_unitario_venta=producto.precio)
+        MensajeContacto.objects.create(nombre_remitente=f'{prefijo}-{i}', email_remitente='a@example.com', mensaje='Hola')
+
+
+def crear_promocion(nombre='Promo', productos=(), **campos):
+    hoy = timezone.localdate()
+    campos = {
+        'tipo_descuento': Promocion.TipoDescuento.PORCENTAJE, 'valor_descuento': Decimal('10'),
+        'fecha_inicio': hoy, 'fecha_fin': hoy, **campos,
+    }
+    promocion = Promocion.objects.create(nombre=nombre, **campos)
+    for producto in productos:
+        ProductoPromocion.objects.create(producto=producto, promocion=promocion)
+    return promocion
+
+
+def cursor_crudo(valor):
+    return base64.urlsafe_b64encode(json.dumps(valor).encode()).decode().rstrip('=')
+
+
+@contextmanager
+def request_en_replica():
+    estado = replicas.EstadoRequest(en_replica=True)
+    token = replicas._estado.set(estado)
+    try:
+        yield estado
+    finally:
+        replicas._estado.reset(token)
+
+
+def item(producto_id, cantidad, precio):
+    producto = SimpleNamespace(pk=producto_id, precio=Decimal(precio))
+    return SimpleNamespace(producto_id=producto_id, producto=producto, cantidad=cantidad, precio_unitario_actual=producto.precio)
+
+
+class EvaluadorPromocionesTests(SimpleTestCase):
+    def test_combo_habilita_pero_no_recibe_descuento(self):
+        promo = Promocion(pk=1, tipo_descuento=Promocion.TipoDescuento.BOGO, productos_requeridos=1)
+        regla = ReglaPromocion(promo, productos={10}, combo={20})
+        items = [item(10, 2, '5.00'), item(20, 2, '7.00')]
+
+        subtotal, descuento, _ = evaluar_carrito(items, [regla])
+
+        self.assertEqual(subtotal, Decimal('24.00'))
+        # Solo el par del producto 10; el 20 es parte del combo, no del objetivo
+        self.assertEqual(descuento, Decimal('5.00'))
+
+    def test_combo_incompleto_no_aplica(self):
+        promo = Promocion(pk=1, tipo_descuento=Promocion.TipoDescuento.PORCENTAJE, valor_descuento=Decimal('10'))
+        regla = ReglaPromocion(promo, productos={10}, combo={20, 30})
+
+        _, descuento, _ = evaluar_carrito([item(10, 1, '100.00'), item(20, 1, '1.00')], [regla])
+
+        self.assertEqual(descuento, Decimal('0.00'))
+
+    def test_porcentaje_sin_productos_aplica_a_todo(self):
+        promo = Promocion(pk=1, tipo_descuento=Promocion.TipoDescuento.PORCENTAJE, valor_descuento=Decimal('10'))
+        regla = ReglaPromocion(promo)
+
+        _, descuento, _ = evaluar_carrito([item(10, 1, '100.00'), item(20, 2, '50.00')], [regla])
+
+        self.assertEqual(descuento, Decimal('20.00'))
+
+
+class PaginaKeysetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_productos(5)
+
+    def paginar(self, **cursor):
+        return PaginaKeyset(Producto.objects.all(), orden=['nombre'], por_pagina=2).obtener(**cursor)
+
+    def test_recorre_las_paginas(self):
+        primera = self.paginar()
+        segunda = self.paginar(despues=primera.cursor_siguiente)
+        self.assertEqual([p.nombre for p in segunda.objetos], ['Producto 02', 'Producto 03'])
+        anterior = self.paginar(antes=segunda.cursor_anterior)
+        self.assertEqual([p.nombre for p in anterior.objetos], ['Producto 00', 'Producto 01'])
+
+    def test_cursor_alterado_es_primera_pagina(self):
+        primera = [p.pk for p in self.paginar().objetos]
+        for crudo in (['Producto 01', 'abc'], {'a': 1}, ['Producto 01'], ['Producto 01', 1, 2], [None, 1], 'x', 7):
+            with self.subTest(cursor=crudo):
+                pagina = self.paginar(despues=cursor_crudo(crudo))
+                self.assertEqual([p.pk for p in pagina.objetos], primera)
+        self.assertEqual([p.pk for p in self.paginar(despues='%%no-es-base64').objetos], primera)
+
+    def test_vista_no_falla_con_cursor_alterado(self):
+        self.client.force_login(crear_admin())
+        url = reverse('app_clientes:ver_productos')
+        for crudo in (['abc', 1], {'a': 1}, ['x']):
+            with self.subTest(cursor=crudo):
+                self.assertEqual(self.client.get(url, {'despues': cursor_crudo(crudo)}).status_code, 200)
+
+
+class ListadosCrudTests(TestCase):
+    # Sesión, usuario, página de filas, menú de categorías y el cliente del encabezado
+    CONSULTAS_LISTADO = 5
+
+    def esperadas(self, slug):
+        conteo = CRUD_CONFIG[slug].get('paginacion', {}).get('conteo_aproximado')
+        return self.CONSULTAS_LISTADO + (1 if conteo else 0)
+
+    def test_consultas_por_slug_no_crecen_con_las_filas(self):
+        admin = crear_admin()
+        sembrar(1)
+        for filas in (1, 20):
+            if filas > 1:
+                sembrar(filas - 1, prefijo='mas')
+            for slug in CRUD_CONFIG:
+                with self.subTest(slug=slug, filas=filas):
+                    cache.clear()
+                    self.client.force_login(admin)
+                    with self.assertNumQueries(self.esperadas(slug)):
+                        respuesta = self.client.get(reverse(f'app_clientes:ver_{slug}'))
+                    self.assertEqual(respuesta.status_code, 200)
+
+
+class ExportacionCrudTests(TestCase):
+    def setUp(self):
+        self.productos = crear_productos(3)
+        self.client.force_login(crear_admin())
+
+    def exportar(self, **params):
+        respuesta = self.client.get(reverse('app_clientes:exportar_crud', args=['productos']), params)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b''.join(respuesta.streaming_content)
+
+    def test_csv_en_bloques(self):
+        with mock.patch.object(exportacion, 'TAMANO_BLOQUE', 1):
+            respuesta = self.client.get(reverse('app_clientes:exportar_crud', args=['productos']))
+            bloques = list(respuesta.streaming_content)
+        self.assertTrue(respuesta.streaming)
+        # Con bloques de un carácter sale una escritura por línea: encabezado y tres filas
+        self.assertEqual(len(bloques), 4)
+        filas = list(csv.reader(io.StringIO(b''.join(bloques).decode('utf-8-sig'))))
+        self.assertEqual(filas[0], ['id', 'Nombre', 'Categoría', 'Precio', 'Stock', 'Activo'])
+        self.assertEqual([fila[1] for fila in filas[1:]], ['Producto 00', 'Producto 01', 'Producto 02'])
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+
+    def test_jsonl(self):
+        respuesta, cuerpo = self.exportar(formato='jsonl')
+        filas = [json.loads(linea) for linea in cuerpo.decode().splitlines()]
+        self.assertEqual([fila['id'] for fila in filas], [producto.pk for producto in self.productos])
+        self.assertEqual(filas[0]['categoria'], 'Pruebas')
+        self.assertEqual(respuesta['Content-Type'], 'application/x-ndjson; charset=utf-8')
+
+    def test_gzip_valido(self):
+        _, plano = self.exportar()
+        respuesta, comprimido = self.exportar(gzip='1')
+        self.assertEqual(gzip.decompress(comprimido), plano)
+        self.assertEqual(respuesta['Content-Type'], 'application/gzip')
+        self.assertIn('.csv.gz"', respuesta['Content-Disposition'])
+
+    def test_respeta_la_busqueda(self):
+        _, cuerpo = self.exportar(formato='jsonl', busqueda='Producto 01')
+        self.assertEqual([json.loads(linea)['nombre'] for linea in cuerpo.decode().splitlines()], ['Producto 01'])
+
+    def test_solo_administradores(self):
+        url = reverse('app_clientes:exportar_crud', args=['productos'])
+        cliente = User.objects.create_user(username='cliente', password='x')
+        self.client.force_login(cliente)
+        self.assertRedirects(self.client.get(url), reverse('app_clientes:inicio_circley'), fetch_redirect_response=False)
+        self.client.logout()
+        self.assertRedirects(self.client.get(url), reverse('app_clientes:login'), fetch_redirect_response=False)
+
+
+class ImportacionCsvTests(TestCase):
+    def importar(self, *lineas, **kwargs):
+        return importacion.importar_csv('productos', io.BytesIO('\n'.join(lineas).encode()), **kwargs)
+
+    def test_actualiza_existentes_y_crea_nuevos(self):
+        existente = crear_productos(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = self.importar(
+                'categoria,nombre,precio,stock',
+                'Pruebas,Producto 00,99.50,3',
+                'Nueva,Producto nuevo,5,1',
+            )
+
+        self.assertEqual((resultado.filas, resultado.importados, resultado.total_errores), (2, 2, 0))
+        existente.refresh_from_db()
+        self.assertEqual((existente.precio, existente.stock), (Decimal('99.50'), 3))
+        nuevo = Producto.objects.get(nombre='Producto nuevo')
+        self.assertEqual((nuevo.categoria.nombre, nuevo.precio), ('Nueva', Decimal('5.00')))
+        self.assertEqual(Producto.objects.count(), 2)
+
+    def test_filas_invalidas_no_detienen_los_otros_lotes(self):
+        reportados = []
+        with mock.patch.object(importacion, 'TAMANO_LOTE', 2):
+            resultado = self.importar(
+                'categoria,nombre,precio',
+                'Pruebas,Uno,1',
+                'Pruebas,Dos,2',
+                'Pruebas,Tres,caro',
+                'Pruebas,Cuatro,4.001',
+                'Pruebas,Cinco,5',
+                al_error=lambda linea, mensaje: reportados.append(linea),
+            )
+
+        self.assertEqual((resultado.filas, resultado.importados, resultado.total_errores), (5, 3, 2))
+        self.assertEqual([linea for linea, _ in resultado.errores], [4, 5])
+        self.assertEqual(reportados, [4, 5])
+        self.assertEqual(set(Producto.objects.values_list('nombre', flat=True)), {'Uno', 'Dos', 'Cinco'})
+
+    def test_faltan_columnas_obligatorias(self):
+        with self.assertRaisesMessage(ValueError, 'Faltan columnas: precio'):
+            self.importar('categoria,nombre', 'Pruebas,Uno')
+        self.assertFalse(Producto.objects.exists())
+
+
+class BusquedaFTSTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre='Bebidas')
+        otra = Categoria.objects.create(nombre='Otros')
+        # Inactivos y de otra categoría con mejor rango que el que sí debe salir
+        for i in range(3):
+            Producto.objects.create(categoria=otra, nombre=f'Café café café {i}', precio=Decimal('1.00'), activo=i % 2 == 0)
+        cls.buscado = Producto.objects.create(categoria=cls.categoria, nombre='Té con café', precio=Decimal('1.00'))
+
+    def test_filtros_se_aplican_antes_del_limite(self):
+        productos = Producto.objects.filter(activo=True, categoria=self.categoria)
+        with mock.patch.object(busqueda, 'LIMITE_RESULTADOS', 2):
+            resultado = busqueda.BackendSQLiteFTS5().buscar(productos, 'cafe')
+        self.assertEqual([p.pk for p in resultado], [self.buscado.pk])
+
+
+class BusquedaAdminTests(TestCase):
+    def buscar(self, slug, texto):
+        config = CRUD_CONFIG[slug]
+        return list(busqueda_admin.filtrar(slug, config, config['model'].objects.all(), texto))
+
+    def test_icontains_hasta_reconstruir(self):
+        categoria = Categoria.objects.create(nombre='Bebidas')
+        # El post_save ya dejó tokens, pero el listado no está indexado completo
+        self.assertEqual(self.buscar('categorias', 'ebida'), [categoria])
+        busqueda_admin.reconstruir('categorias')
+        self.assertEqual(self.buscar('categorias', 'ebida'), [])
+        self.assertEqual(self.buscar('categorias', 'bebi'), [categoria])
+
+    def test_relacionados_solo_si_cambia_un_campo_indexado(self):
+        sembrar(1)
+        busqueda_admin.reconstruir('pedidos')
+        user = User.objects.get()
+
+        user.email = 'otro@example.com'
+        with self.captureOnCommitCallbacks() as pendientes:
+            user.save()
+        self.assertEqual(pendientes, [])
+
+        user.username = 'renombrado'
+        with self.captureOnCommitCallbacks(execute=True) as pendientes:
+            user.save()
+            # Se reindexa al confirmar, no dentro de la transacción del guardado
+            self.assertEqual(self.buscar('pedidos', 'renombrado'), [])
+        self.assertTrue(pendientes)
+        self.assertEqual(self.buscar('pedidos', 'renombrado'), list(Pedido.objects.all()))
+
+
+class ConCarritoTestCase(TestCase):
+    """Un cliente con dos unidades del primer producto apartadas en su carrito."""
+
+    def setUp(self):
+        # Versión nueva: ninguna foto de promociones de otra prueba sigue vigente
+        cache.clear()
+        user = User.objects.create_user(username='comprador')
+        self.cliente = Cliente.objects.create(user=user, direccion='Calle')
+        self.productos = crear_productos(10)
+        self.producto = self.productos[0]
+        self.carrito = Carrito.objects.create(cliente=self.cliente)
+        inventario.agregar_item(self.carrito, self.producto, 2, self.producto.precio)
+
+    def comprar(self, items):
+        return crear_pedido(self.carrito, items, self.cliente, Pedido.MetodoPago.EFECTIVO, 'Calle')
+
+
+class CheckoutReservasTests(ConCarritoTestCase):
+    def test_consume_las_reservas(self):
+        pedido, _ = self.comprar(list(self.carrito.items.all()))
+        self.assertEqual(pedido.detalles.get().cantidad, 2)
+        self.assertFalse(ItemCarrito.objects.exists())
+
+    def test_numero_fijo_de_consultas(self):
+        for lineas in (1, 10):
+            with self.subTest(lineas=lineas):
+                Carrito.objects.filter(cliente=self.cliente).update(activo=False)
+                self.carrito = Carrito.objects.create(cliente=self.cliente)
+                for producto in self.productos[:lineas]:
+                    inventario.agregar_item(self.carrito, producto, 1, producto.precio)
+                items = list(self.carrito.items.select_related('producto'))
+                with self.assertNumQueries(20):
+                    self.comprar(items)
+
+    def test_encabezado_y_desglose_de_la_misma_evaluacion(self):
+        promocion = crear_promocion()
+        cache.clear()
+        # Totales guardados que ya no cuadran con las promociones vigentes
+        Carrito.objects.filter(pk=self.carrito.pk).update(subtotal=Decimal('20.00'), total_descuento=0, total=Decimal('20.00'))
+        self.carrito.refresh_from_db()
+
+        pedido, _ = self.comprar(list(self.carrito.items.select_related('producto')))
+
+        desglose = list(DescuentoPedido.objects.filter(pedido=pedido).values_list('promocion_id', 'monto'))
+        self.assertEqual(desglose, [(promocion.pk, Decimal('2.00'))])
+        self.assertEqual((pedido.subtotal, pedido.descuento_total, pedido.total), (Decimal('20.00'), Decimal('2.00'), Decimal('18.00')))
+
+    def test_reserva_liberada_antes_de_confirmar_aborta(self):
+        items = list(self.carrito.items.all())
+        inventario.liberar_reservas_vencidas(ahora=timezone.now() + inventario.duracion_reserva() * 2)
+
+        with self.assertRaises(inventario.ReservaVencida):
+            self.comprar(items)
+        self.assertFalse(Pedido.objects.exists())
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 10)
+
+    def test_cantidad_cambiada_antes_de_confirmar_aborta(self):
+        items = list(self.carrito.items.all())
+        inventario.ajustar_item(items[0], 1, self.producto.precio)
+
+        with self.assertRaises(inventario.ReservaVencida):
+            self.comprar(items)
+        self.assertEqual(self.carrito.items.get().cantidad, 1)
+
+
+class ResumenesVentasTests(ConCarritoTestCase):
+    def test_borrar_pedido_rehace_su_dia(self):
+        pedido, _ = self.comprar(list(self.carrito.items.select_related('producto')))
+        Carrito.objects.filter(cliente=self.cliente).update(activo=False)
+        self.carrito = Carrito.objects.create(cliente=self.cliente)
+        inventario.agregar_item(self.carrito, self.productos[1], 1, self.productos[1].precio)
+        otro, _ = self.comprar(list(self.carrito.items.select_related('producto')))
+        self.assertEqual(ResumenVentasHora.objects.get().pedidos, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido.delete()
+
+        hora = ResumenVentasHora.objects.get()
+        self.assertEqual((hora.pedidos, hora.unidades, hora.ingresos), (1, 1, otro.total))
+        self.assertEqual(list(ResumenVentasProducto.objects.values_list('producto_id', flat=True)), [self.productos[1].pk])
+        self.assertEqual(ResumenPedidosEstado.objects.get().pedidos, 1)
+
+    def test_estados_usan_el_periodo(self):
+        viejo = timezone.localdate() - timedelta(days=60)
+        ResumenPedidosEstado.objects.create(
+            fecha=viejo, estado_pedido=Pedido.EstadoPedido.ENTREGADO, metodo_pago=Pedido.MetodoPago.EFECTIVO,
+            pedidos=3, ingresos=Decimal('30.00'),
+        )
+        self.comprar(list(self.carrito.items.select_related('producto')))
+
+        resumen = analitica.resumen_dashboard(dias=30)
+
+        self.assertEqual([fila['estado_pedido'] for fila in resumen['estados']], [Pedido.EstadoPedido.PENDIENTE])
+        self.assertEqual(resumen['total_pedidos'], 4)
+
+
+class IdempotenciaCheckoutTests(ConCarritoTestCase):
+    def enviar_checkout(self, clave):
+        return self.client.post(reverse('app_clientes:checkout'), {
+            'metodo_pago': Pedido.MetodoPago.EFECTIVO, 'direccion_envio': 'Calle', 'token_idempotencia': clave,
+        })
+
+    def test_reenvio_devuelve_el_pedido_original(self):
+        self.client.force_login(self.cliente.user)
+        primera = self.enviar_checkout('token-1')
+        segunda = self.enviar_checkout('token-1')
+
+        pedido = Pedido.objects.get()
+        self.assertEqual(ClaveIdempotencia.objects.get(clave='token-1').pedido, pedido)
+        for respuesta in (primera, segunda):
+            self.assertRedirects(respuesta, reverse('app_clientes:historial_pedidos'), fetch_redirect_response=False)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 8)
+
+    def test_clave_tomada_por_otra_peticion(self):
+        pedido, _ = self.comprar(list(self.carrito.items.select_related('producto')))
+        ClaveIdempotencia.objects.create(clave='token-1', cliente=self.cliente, pedido=pedido)
+        self.carrito = Carrito.objects.create(cliente=self.cliente)
+        inventario.agregar_item(self.carrito, self.productos[1], 1, self.productos[1].precio)
+        items = list(self.carrito.items.select_related('producto'))
+
+        with self.assertRaises(PedidoDuplicado) as duplicado:
+            crear_pedido(self.carrito, items, self.cliente, Pedido.MetodoPago.EFECTIVO, 'Calle', clave='token-1')
+
+        self.assertEqual(duplicado.exception.pedido_id, pedido.pk)
+        self.assertEqual(Pedido.objects.count(), 1)
+        self.assertTrue(self.carrito.items.exists())
+
+    def test_carrera_en_la_vista(self):
+        # Las dos peticiones pasan la consulta previa; la segunda choca con la restricción única
+        self.client.force_login(self.cliente.user)
+        pedido, _ = self.comprar(list(self.carrito.items.select_related('producto')))
+        ClaveIdempotencia.objects.create(clave='token-1', cliente=self.cliente, pedido=pedido)
+        self.carrito = Carrito.objects.create(cliente=self.cliente)
+        inventario.agregar_item(self.carrito, self.productos[1], 1, self.productos[1].precio)
+
+        with mock.patch('app_clientes.views.pedido_de_clave', return_value=None):
+            respuesta = self.enviar_checkout('token-1')
+
+        self.assertRedirects(respuesta, reverse('app_clientes:historial_pedidos'), fetch_redirect_response=False)
+        self.assertEqual(Pedido.objects.count(), 1)
+        self.assertEqual(
+            [str(mensaje) for mensaje in messages.get_messages(respuesta.wsgi_request)],
+            ['Tu pedido ya había sido registrado.'],
+        )
+
+    @override_settings(IDEMPOTENCIA_HORAS=24)
+    def test_purga_solo_las_vencidas(self):
+        ahora = timezone.now()
+        ClaveIdempotencia.objects.create(clave='vieja', cliente=self.cliente)
+        ClaveIdempotencia.objects.create(clave='reciente', cliente=self.cliente)
+        ClaveIdempotencia.objects.filter(clave='vieja').update(fecha_creacion=ahora - timedelta(hours=25))
+        ClaveIdempotencia.objects.filter(clave='reciente').update(fecha_creacion=ahora - timedelta(hours=23))
+
+        self.assertEqual(purgar_claves_vencidas(ahora), 1)
+        self.assertEqual(list(ClaveIdempotencia.objects.values_list('clave', flat=True)), ['reciente'])
+
+
+class AccionesMasivasTests(TestCase):
+    def test_activar_promocion_solo_toca_activo(self):
+        hoy = timezone.localdate()
+        promocion = Promocion.objects.create(
+            nombre='Cerrada', tipo_descuento=Promocion.TipoDescuento.PORCENTAJE, valor_descuento=Decimal('5'),
+            fecha_inicio=hoy, fecha_fin=hoy, activo=False, activa=False,
+        )
+        for clave, esperado in (('activar', True), ('desactivar', False)):
+            with self.subTest(accion=clave):
+                _, accion = acciones.ACCIONES[clave]
+                accion('promociones', CRUD_CONFIG['promociones'], Promocion.objects.filter(pk=promocion.pk), [promocion.pk], None)
+                promocion.refresh_from_db()
+                self.assertEqual((promocion.activo, promocion.activa), (esperado, False))
+
+
+@override_settings(REPLICAS_LECTURA=['replica'])
+class ReplicasTests(SimpleTestCase):
+    enrutador = replicas.EnrutadorReplicas()
+
+    def test_llenado_de_caches_lee_de_la_primaria(self):
+        with request_en_replica():
+            self.assertEqual(self.enrutador.db_for_read(Producto), 'replica')
+            self.assertEqual(tiempo_tarjetas(), 0)
+            with replicas.en_primaria():
+                self.assertEqual(self.enrutador.db_for_read(Producto), 'default')
+                self.assertEqual(tiempo_tarjetas(), TIEMPO_TARJETAS)
+
+    def test_pagina_se_arma_en_la_primaria_al_fallar_la_cache(self):
+        lecturas = []
+
+        @cache_anonima(lambda: 'v1')
+        def vista(request):
+            lecturas.append(replicas.lee_de_replica())
+            return HttpResponse('hola')
+
+        request = RequestFactory().get('/pagina-de-prueba/')
+        request.user = AnonymousUser()
+        cache.clear()
+        with request_en_replica():
+            vista(request)
+            vista(request)
+        self.assertEqual(lecturas, [False])
+
+    def test_variantes_de_imagen_no_fijan_la_primaria(self):
+        with request_en_replica() as estado:
+            self.enrutador.db_for_write(ImagenDerivada)
+            self.assertFalse(estado.escribio)
+            self.enrutador.db_for_write(Producto)
+            self.assertTrue(estado.escribio)
+
+
+class VistasAsyncTests(TestCase):
+    def request_anonima(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+
+        async def auser():
+            return request.user
+        request.auser = auser
+        request.session = SessionStore()
+        request._messages = SessionStorage(request)
+        return request
+
+    def test_mensajes_en_la_sesion_evitan_la_cache(self):
+        request = self.request_anonima()
+        self.assertTrue(async_to_sync(_se_puede_cachear_async)(request))
+        messages.info(request, 'Guardado en la sesión')
+        self.assertFalse(async_to_sync(_se_puede_cachear_async)(request))
+
+    def test_hilos_del_executor_cierran_sus_conexiones(self):
+        with mock.patch.object(vistas_async.connections, 'close_all') as cerrar:
+            resultados = async_to_sync(vistas_async.en_paralelo)(lambda: 1, lambda: 2)
+        self.assertEqual(resultados, [1, 2])
+        self.assertEqual(cerrar.call_count, 2)
+
+
+class AjustesSQLiteTests(SimpleTestCase):
+    def test_apagados_por_omision(self):
+        # journal_mode=WAL cambia la cabecera del db.sqlite3 que está en el repositorio
+        self.assertEqual((pragmas_sqlite({}), opciones_sqlite({})), ({}, {}))
+
+    def test_sqlite_ajustes_los_activa(self):
+        entorno = {'SQLITE_AJUSTES': '1'}
+        self.assertEqual(pragmas_sqlite(entorno)['journal_mode'], 'WAL')
+        self.assertEqual(opciones_sqlite(entorno), {'transaction_mode': 'IMMEDIATE'})
+
+
+class CacheCompartidaTests(SimpleTestCase):
+    def test_sin_cache_url_queda_en_memoria(self):
+        self.assertEqual(cache_por_omision({})['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+
+    def test_redis_y_memcached(self):
+        redis = cache_por_omision({'CACHE_URL': 'redis://cache:6379/1'})
+        self.assertEqual(
+            (redis['BACKEND'], redis['LOCATION']),
+            ('django.core.cache.backends.redis.RedisCache', 'redis://cache:6379/1'),
+        )
+        memcached = cache_por_omision({'CACHE_URL': 'memcached://cache:11211', 'CACHE_PREFIJO': 'otro'})
+        self.assertEqual((memcached['LOCATION'], memcached['KEY_PREFIX']), ('cache:11211', 'otro'))
+
+    def test_esquema_desconocido(self):
+        with self.assertRaises(ImproperlyConfigured):
+            cache_por_omision({'CACHE_URL': 'locmem://'})
+
+
+class InstrumentacionTests(TestCase):
+    @override_settings(INSTRUMENTACION_MUESTREO=1.0)
+    def test_linea_por_request_en_debug(self):
+        with self.assertLogs('app_clientes.instrumentacion', 'DEBUG') as registro:
+            respuesta = self.client.get(reverse('app_clientes:novedades'))
+        self.assertIn('Server-Timing', respuesta)
+        self.assertEqual([linea.levelname for linea in registro.records], ['DEBUG'])
+
+    @override_settings(INSTRUMENTACION_MUESTREO=1.0, INSTRUMENTACION_UMBRAL_DUPLICADAS=2)
+    def test_posible_n_mas_uno_en_warning(self):
+        def vista(request):
+            for pk in (1, 2, 3):
+                Producto.objects.filter(pk=pk).exists()
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/')
+        with self.assertLogs('app_clientes.instrumentacion', 'DEBUG') as registro:
+            InstrumentacionMiddleware(vista)(request)
+        self.assertEqual([linea.levelname for linea in registro.records], ['DEBUG', 'WARNING'])
+
+
+class TotalesIncrementalesTests(TestCase):
+    def setUp(self):
+        # Versión nueva: ninguna foto de promociones de otra prueba sigue vigente
+        cache.clear()
+        user = User.objects.create_user(username='comprador')
+        self.carrito = Carrito.objects.create(cliente=Cliente.objects.create(user=user, direccion='Calle'))
+        self.productos = crear_productos(3)
+
+    def recorrer_carrito(self):
+        """Alta, alta, ajuste y baja; después de cada paso los totales guardados cuadran con el evaluador."""
+        cache.clear()
+        p0, p1, _ = self.productos
+        pasos = (
+            lambda: inventario.agregar_item(self.carrito, p0, 2, p0.precio),
+            lambda: inventario.agregar_item(self.carrito, p1, 1, p1.precio),
+            lambda: inventario.ajustar_item(self.carrito.items.get(producto=p1), 3, p1.precio),
+            lambda: inventario.quitar_item(self.carrito.items.get(producto=p0)),
+        )
+        for numero, paso in enumerate(pasos):
+            paso()
+            carrito = Carrito.objects.get(pk=self.carrito.pk)
+            totales.asegurar(carrito)
+            subtotal, descuento, _ = evaluar_carrito(carrito.items.select_related('producto'), promociones_activas().reglas)
+            with self.subTest(paso=numero):
+                self.assertEqual(
+                    (carrito.subtotal, carrito.total_descuento, carrito.total),
+                    (subtotal, descuento, subtotal - descuento),
+                )
+        return descuento
+
+    def test_porcentaje_sobre_todo_el_carrito(self):
+        crear_promocion()
+        # Al final quedan 3 x 11.00 con 10 %
+        self.assertEqual(self.recorrer_carrito(), Decimal('3.30'))
+
+    def test_porcentaje_por_producto(self):
+        crear_promocion(productos=[self.productos[0]])
+        self.assertEqual(self.recorrer_carrito(), Decimal('0.00'))
+
+    def test_sin_promociones_por_deltas(self):
+        self.assertEqual(self.recorrer_carrito(), Decimal('0.00'))
+
+
+class FotoPromocionesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        promociones.ESTADISTICAS.clear()
+        self.hoy = timezone.now().date()
+        self.producto = crear_productos(1)[0]
+
+    def reglas(self):
+        return {regla.promocion.pk: regla for regla in promociones_activas().reglas}
+
+    def test_guardar_y_borrar_promocion_invalidan(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            promocion = crear_promocion(fecha_inicio=self.hoy, fecha_fin=self.hoy)
+        self.assertIn(promocion.pk, self.reglas())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            promocion.activa = False
+            promocion.save()
+        self.assertNotIn(promocion.pk, self.reglas())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            promocion.delete()
+        self.assertEqual(promociones_activas().catalogo, [])
+
+    def test_producto_promocion_invalida(self):
+        promocion = crear_promocion(fecha_inicio=self.hoy, fecha_fin=self.hoy)
+        self.assertEqual(promociones_activas().promociones_de(self.producto.pk), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enlace = ProductoPromocion.objects.create(producto=self.producto, promocion=promocion)
+        self.assertEqual(promociones_activas().promociones_de(self.producto.pk), [promocion])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enlace.delete()
+        self.assertEqual(promociones_activas().promociones_de(self.producto.pk), [])
+
+    def test_cambios_del_combo_invalidan(self):
+        promocion = crear_promocion(fecha_inicio=self.hoy, fecha_fin=self.hoy)
+        self.assertEqual(self.reglas()[promocion.pk].combo, frozenset())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            promocion.productos_combo.add(self.producto)
+        self.assertEqual(self.reglas()[promocion.pk].combo, {self.producto.pk})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            promocion.productos_combo.clear()
+        self.assertEqual(self.reglas()[promocion.pk].combo, frozenset())
+
+    def test_caduca_al_terminar_una_promocion(self):
+        promocion = crear_promocion(fecha_inicio=self.hoy, fecha_fin=self.hoy)
+        foto = promociones_activas()
+        self.assertEqual(foto.hasta, self.hoy + timedelta(days=1))
+
+        manana = timezone.now() + timedelta(days=1)
+        with mock.patch('app_clientes.promociones.timezone.now', return_value=manana):
+            siguiente = promociones_activas()
+        self.assertIsNot(siguiente, foto)
+        self.assertNotIn(promocion.pk, {regla.promocion.pk for regla in siguiente.reglas})
+
+    def test_caduca_al_empezar_una_promocion(self):
+        inicio = self.hoy + timedelta(days=3)
+        promocion = crear_promocion(fecha_inicio=inicio, fecha_fin=inicio)
+        self.assertEqual(promociones_activas().hasta, inicio)
+
+        with mock.patch('app_clientes.promociones.timezone.now', return_value=timezone.now() + timedelta(days=3)):
+            self.assertIn(promocion.pk, self.reglas())
+
+    def test_estadisticas_de_aciertos_y_fallos(self):
+        promociones_activas()
+        promociones_activas()
+        # Otro proceso: sin foto en memoria, la toma de la caché compartida
+        with mock.patch.dict(promociones._local, foto=None):
+            promociones_activas()
+        self.assertEqual(
+            promociones.estadisticas_cache(),
+            {'fallos': 1, 'aciertos_locales': 1, 'aciertos_compartidos': 1},
+        )
+
+
+class ImagenResponsivaTests(TestCase):
+    plantilla = Template("{% load ui_extras %}{% imagen_responsiva archivo 'Foto' %}")
+
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=media.name, MEDIA_URL='/media/')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        contenido = io.BytesIO()
+        PILImage.new('RGB', (800, 400), 'red').save(contenido, 'PNG')
+        self.nombre = default_storage.save('productos/foto.png', ContentFile(contenido.getvalue()))
+        self.archivo = SimpleNamespace(name=self.nombre, url=default_storage.url(self.nombre))
+
+    def render(self):
+        return self.plantilla.render(Context({'archivo': self.archivo}))
+
+    def test_sin_variantes_muestra_la_original(self):
+        html = self.render()
+        self.assertHTMLEqual(html, '<img src="/media/productos/foto.png" alt="Foto" loading="lazy" decoding="async">')
+        self.assertFalse(ImagenDerivada.objects.exists())
+        self.assertFalse(default_storage.exists(imagenes.CARPETA))
+        # La falta queda anotada: los siguientes renders no consultan la base
+        with self.assertNumQueries(0):
+            self.assertEqual(self.render(), html)
+
+    def test_srcset_de_las_variantes(self):
+        self.render()
+        imagenes.generar_al_subir(self.nombre)
+        html = self.render()
+
+        huella = ImagenDerivada.objects.get(original=self.nombre).huella
+        base = f'/media/{imagenes.CARPETA}/{huella[:2]}/{huella}'
+        webp = ', '.join(f'{base}/{ancho}.webp {ancho}w' for ancho in (160, 320, 640, 800))
+        jpg = ', '.join(f'{base}/{ancho}.jpg {ancho}w' for ancho in (160, 320, 640, 800))
+        sizes = '(max-width: 600px) 90vw, 280px'
+        self.assertHTMLEqual(html, (
+            f'<picture><source type="image/webp" srcset="{webp}" sizes="{sizes}">'
+            f'<img src="{base}/320.jpg" srcset="{jpg}" sizes="{sizes}" alt="Foto" width="800" height="400"'
+            ' loading="lazy" decoding="async"></picture>'
+        ))
+
+    @override_settings(IMAGENES_AL_VUELO=True, REPLICAS_LECTURA=['replica'])
+    def test_al_vuelo_solo_fuera_de_la_replica(self):
+        with request_en_replica():
+            self.assertIsNone(imagenes.asegurar(self.nombre))
+        self.assertFalse(ImagenDerivada.objects.exists())
+
+        cache.clear()
+        self.assertEqual(imagenes.asegurar(self.nombre)['anchos'], [160, 320, 640, 800])
+        self.assertTrue(ImagenDerivada.objects.filter(original=self.nombre).exists())
+
+
+class TarjetasCacheTests(TestCase):
+    """Cada cambio que se ve en una tarjeta mueve su llave y la tarjeta se vuelve a pintar."""
+
+    def setUp(self):
+        cache.clear()
+        self.producto = crear_productos(1)[0]
+        # Con sesión no hay caché de página: solo queda la del fragmento
+        self.client.force_login(User.objects.create_user(username='visitante'))
+
+    def guardar(self, objeto, **campos):
+        for campo, valor in campos.items():
+            setattr(objeto, campo, valor)
+        with self.captureOnCommitCallbacks(execute=True):
+            objeto.save()
+
+    def productos(self):
+        return self.client.get(reverse('app_clientes:productos_servicios'))
+
+    def test_producto(self):
+        self.assertContains(self.productos(), '<h3>Producto 00</h3>', html=True)
+        llave = llave_tarjetas_productos()
+        self.guardar(self.producto, nombre='Renombrado')
+        self.assertNotEqual(llave_tarjetas_productos(), llave)
+        respuesta = self.productos()
+        self.assertContains(respuesta, '<h3>Renombrado</h3>', html=True)
+        self.assertNotContains(respuesta, 'Producto 00')
+
+    def test_categoria(self):
+        self.assertContains(self.productos(), '<span class="categoria-tag">Pruebas</span>', html=True)
+        llave = llave_tarjetas_productos()
+        self.guardar(self.producto.categoria, nombre='Bebidas')
+        self.assertNotEqual(llave_tarjetas_productos(), llave)
+        self.assertContains(self.productos(), '<span class="categoria-tag">Bebidas</span>', html=True)
+
+    def test_promocion(self):
+        hoy = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            promocion = crear_promocion(productos=[self.producto], fecha_inicio=hoy, fecha_fin=hoy)
+        self.assertContains(self.productos(), '<span>9.00</span>', html=True)
+        llave = llave_tarjetas_productos()
+        self.guardar(promocion, valor_descuento=Decimal('50'))
+        self.assertNotEqual(llave_tarjetas_productos(), llave)
+        self.assertContains(self.productos(), '<span>5.00</span>', html=True)
+
+    def test_novedad(self):
+        novedad = Novedad.objects.create(titulo='Apertura', descripcion='Nueva sucursal')
+        url = reverse('app_clientes:novedades')
+        self.assertContains(self.client.get(url), '<h3>Apertura</h3>', html=True)
+        llave = llave_versiones('novedades')
+        self.guardar(novedad, titulo='Reapertura')
+        self.assertNotEqual(llave_versiones('novedades'), llave)
+        self.assertContains(self.client.get(url), '<h3>Reapertura</h3>', html=True)
+
+
+class CacheAnonimaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.producto = crear_productos(1)[0]
+        self.url = reverse('app_clientes:productos_servicios')
+        self.renders = 0
+
+    def vista_contada(self, cookie=False):
+        @cache_anonima(lambda: 'v1')
+        def vista(request):
+            self.renders += 1
+            respuesta = HttpResponse('pagina')
+            if cookie:
+                respuesta.set_cookie('preferencia', '1')
+            return respuesta
+        return vista
+
+    def request(self, user=None):
+        request = RequestFactory().get('/pagina-de-prueba/')
+        request.user = user or AnonymousUser()
+        request.session = SessionStore()
+        request._messages = SessionStorage(request)
+        return request
+
+    def test_segunda_visita_sale_de_la_cache(self):
+        primera = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            segunda = self.client.get(self.url)
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+        self.assertIn('Cookie', segunda['Vary'])
+
+    def test_if_none_match_devuelve_304(self):
+        etag = self.client.get(self.url)['ETag']
+        respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+
+    def test_usuarios_con_sesion_no_usan_la_cache(self):
+        vista = self.vista_contada()
+        user = User.objects.create_user(username='visitante')
+        vista(self.request(user))
+        respuesta = vista(self.request(user))
+        self.assertEqual(self.renders, 2)
+        self.assertNotIn('ETag', respuesta)
+
+    def test_mensajes_pendientes_no_usan_la_cache(self):
+        vista = self.vista_contada()
+        vista(self.request())
+        request = self.request()
+        messages.info(request, 'Gracias por escribirnos')
+        vista(request)
+        self.assertEqual(self.renders, 2)
+        vista(self.request())
+        self.assertEqual(self.renders, 2)
+
+    def test_respuesta_con_cookie_no_se_guarda(self):
+        vista = self.vista_contada(cookie=True)
+        vista(self.request())
+        respuesta = vista(self.request())
+        self.assertEqual(self.renders, 2)
+        self.assertIn('preferencia', respuesta.cookies)
+
+    def test_guardar_un_producto_invalida_la_pagina(self):
+        self.assertContains(self.client.get(self.url), '<h3>Producto 00</h3>', html=True)
+        self.producto.nombre = 'Renombrado'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.save()
+        respuesta = self.client.get(self.url)
+        self.assertContains(respuesta, '<h3>Renombrado</h3>', html=True)
+        self.assertNotContains(respuesta, 'Producto 00')
@@ -0,0 +1,79 @@
+# app_clientes/totales.py
+from decimal import Decimal
+
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import Carrito
+from .promociones import evaluar_carrito, promociones_activas
+from .versiones import obtener_version
+
+# Sube cuando cambia cómo se calculan los totales: los carritos guardados con la
+# llave anterior se recalculan en su siguiente asegurar()
+ESQUEMA_TOTALES = 2
+
+
+def llave_totales(foto=None):
+    """
+    Identifica todo lo que entra en los totales además de los items: la foto
+    de promociones (versión y hasta cuándo vale) y la versión de precios.
+    """
+    foto = foto or promociones_activas()
+    return f"{ESQUEMA_TOTALES}:{foto.version}:{foto.hasta}:{obtener_version('precios')}"
+
+
+def recalcular(carrito, items=None, foto=None):
+    """Recalculo completo con el evaluador; deja guardada la llave con la que se hizo."""
+    foto = foto or promociones_activas()
+    if items is None:
+        items = carrito.items.select_related("producto")
+    subtotal, total_descuento, _ = evaluar_carrito(items, foto.reglas)
+
+    carrito.subtotal = subtotal
+    carrito.total_descuento = total_descuento
+    carrito.total = max(Decimal("0.00"), subtotal - total_descuento)
+    carrito.version_totales = llave_totales(foto)
+    carrito.save(update_fields=["subtotal", "total", "total_descuento", "version_totales"])
+    return total_descuento
+
+
+def asegurar(carrito, items=None):
+    """
+    Los totales guardados valen mientras la llave no cambie; solo entonces
+    se leen los items y se recalcula.
+    """
+    foto = promociones_activas()
+    if carrito.version_totales != llave_totales(foto):
+        recalcular(carrito, items, foto)
+
+
+def aplicar_cambio(carrito, producto, delta_cantidad):
+    """
+    Ajusta los totales después de sumar o restar `delta_cantidad` unidades de
+    `producto`. Si el producto no participa en ninguna regla del carrito el
+    descuento no cambia y basta un UPDATE con aritmética de deltas; si
+    participa, o hay un porcentaje sobre todo el carrito (los porcentajes
+    redondean sobre el agregado y los combos dependen de qué más hay en el
+    carrito), se recalcula completo.
+    """
+    foto = promociones_activas()
+    if foto.mueve_descuento(producto.pk):
+        # Incluye cambios de precio sin cambio de cantidad (el 2x1 usa el precio del item)
+        recalcular(carrito, foto=foto)
+        return
+    if not delta_cantidad:
+        return
+
+    delta = producto.precio * delta_cantidad
+    actualizados = Carrito.objects.filter(pk=carrito.pk, version_totales=llave_totales(foto)).update(
+        subtotal=F('subtotal') + delta,
+        total=Greatest(F('subtotal') + delta - F('total_descuento'), Value(Decimal("0.00"))),
+    )
+    if not actualizados:
+        # Los totales guardados ya no valían: no se puede sumar sobre ellos
+        recalcular(carrito, foto=foto)
+
+
+def invalidar(carritos):
+    """Para borrados masivos de items: el siguiente asegurar() recalcula."""
+    Carrito.objects.filter(pk__in=carritos).update(version_totales='')
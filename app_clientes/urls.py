@@ -32,12 +32,14 @@ urlpatterns = [
 
     path('admin/categorias/', views.ver_categorias, name='ver_categorias'),
     path('admin/categorias/agregar/', views.agregar_categorias, name='agregar_categorias'),
+    path('admin/categorias/importar/', views.importar_categorias, name='importar_categorias'),
     path('admin/categorias/<int:pk>/editar/', views.actualizar_categorias, name='actualizar_categorias'),
     path('admin/categorias/<int:pk>/actualizar/', views.realizar_actualizacion_categorias, name='realizar_actualizacion_categorias'),
     path('admin/categorias/<int:pk>/eliminar/', views.borrar_categorias, name='borrar_categorias'),
 
     path('admin/productos/', views.ver_productos, name='ver_productos'),
     path('admin/productos/agregar/', views.agregar_productos, name='agregar_productos'),
+    path('admin/productos/importar/', views.importar_productos, name='importar_productos'),
     path('admin/productos/<int:pk>/editar/', views.actualizar_productos, name='actualizar_productos'),
     path('admin/productos/<int:pk>/actualizar/', views.realizar_actualizacion_productos, name='realizar_actualizacion_productos'),
     path('admin/productos/<int:pk>/eliminar/', views.borrar_productos, name='borrar_productos'),
@@ -90,4 +92,7 @@ urlpatterns = [
     path('admin/mensajes-contacto/<int:pk>/editar/', views.actualizar_mensajes_contacto, name='actualizar_mensajes_contacto'),
     path('admin/mensajes-contacto/<int:pk>/actualizar/', views.realizar_actualizacion_mensajes_contacto, name='realizar_actualizacion_mensajes_contacto'),
     path('admin/mensajes-contacto/<int:pk>/eliminar/', views.borrar_mensajes_contacto, name='borrar_mensajes_contacto'),
-]
\ No newline at end of file
+
+    path('admin/<slug:slug>/exportar/', views.exportar_crud, name='exportar_crud'),
+    path('admin/<slug:slug>/acciones/', views.acciones_crud, name='acciones_crud'),
+]
@@ -0,0 +1,21 @@
+# app_clientes/urls_async.py
+"""Las rutas de urls.py con las vistas async donde existen; la usa el sitio con ASGI."""
+from django.urls import URLPattern
+
+from . import urls, vistas_async
+
+app_name = urls.app_name
+
+VISTAS_ASYNC = {
+    'inicio_circley': vistas_async.inicio_circley,
+    'productos_servicios': vistas_async.productos_servicios,
+    'promociones': vistas_async.promociones_view,
+    'novedades': vistas_async.novedades_view,
+    'ver_carrito': vistas_async.ver_carrito,
+}
+
+urlpatterns = [
+    URLPattern(ruta.pattern, VISTAS_ASYNC[ruta.name], ruta.default_args, ruta.name)
+    if ruta.name in VISTAS_ASYNC else ruta
+    for ruta in urls.urlpatterns
+]
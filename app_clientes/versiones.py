@@ -0,0 +1,46 @@
+# app_clientes/versiones.py
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+PREFIJO = 'circley:version:'
+
+
+def _version_inicial():
+    # Si la llave se pierde (reinicio o desalojo) no reutilizamos una versión vieja
+    return int(time.time() * 1000)
+
+
+def obtener_version(espacio):
+    clave = PREFIJO + espacio
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, _version_inicial(), timeout=None)
+        version = cache.get(clave)
+    return version
+
+
+def llave_versiones(*espacios):
+    """Varias versiones en una sola lectura, unidas para usarlas en una llave de caché."""
+    encontradas = cache.get_many([PREFIJO + espacio for espacio in espacios])
+    return ':'.join(
+        str(encontradas.get(PREFIJO + espacio) or obtener_version(espacio)) for espacio in espacios
+    )
+
+
+def incrementar_version(espacio):
+    clave = PREFIJO + espacio
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        cache.add(clave, _version_inicial(), timeout=None)
+        return cache.get(clave)
+
+
+def invalidar_al_confirmar(*espacios):
+    """Incrementa las versiones cuando la transacción actual se confirme."""
+    def _incrementar():
+        for espacio in espacios:
+            incrementar_version(espacio)
+    transaction.on_commit(_incrementar)
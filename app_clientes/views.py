@@ -1,4 +1,5 @@
 # app_clientes/views.py
+from datetime import datetime
 from decimal import Decimal, ROUND_HALF_UP
 from functools import wraps
 from django.shortcuts import render, redirect, get_object_or_404
@@ -6,12 +7,10 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db import transaction
-from django.db.models import Q
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponseForbidden
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.http import Http404, JsonResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.urls import reverse
-from django.db.models import Sum, F
 from django.utils.formats import date_format
 from django.utils.timezone import localtime
 
@@ -20,6 +19,19 @@ from .models import (
     Cliente, Categoria, Producto, Promocion, ProductoPromocion,
     Novedad, Carrito, ItemCarrito, Pedido, DetallePedido, MensajeContacto
 )
+from . import acciones, busqueda_admin, inventario, totales
+from .analitica import resumen_dashboard
+from .busqueda import buscar_productos
+from .cache_paginas import cache_anonima
+from .consultas import plan_listado
+from .exportacion import FORMATOS, exportar, valor_campo
+from .importacion import IMPORTADORES, importar_csv
+from .paginacion import POR_PAGINA_DEFECTO, PaginaKeyset, conteo_aproximado
+from .pedidos import PedidoDuplicado, crear_pedido, nueva_clave, pedido_de_clave
+from .precios import con_precios, llave_tarjetas_productos, precio_efectivo
+from .promociones import promociones_activas
+from .replicas import lectura_en_replica, lee_de_replica
+from .versiones import llave_versiones
 from .templatetags.ui_extras import highlight  # opcional si deseas usar en vista
 
 
@@ -36,7 +48,7 @@ def admin_required(view_func):
 
 
 def obtener_precio_producto(producto: Producto):
-    return producto.precio_con_descuento() if producto.tiene_descuento_activo() else producto.precio
+    return precio_efectivo(producto)
 
 
 def obtener_carrito_cliente(cliente: Cliente):
@@ -45,19 +57,45 @@ def obtener_carrito_cliente(cliente: Cliente):
 
 
 # ---------- Vistas públicas / clientes ----------
+# Las llaves de las tarjetas llevan versiones; el tiempo solo limpia las huérfanas
+TIEMPO_TARJETAS = 60 * 60 * 24
+
+
+def tiempo_tarjetas():
+    # Leyendo de una réplica se usan las tarjetas guardadas pero no se guardan nuevas:
+    # quedarían datos atrasados bajo la versión vigente ({% cache %} con 0 no guarda)
+    return 0 if lee_de_replica() else TIEMPO_TARJETAS
+
+
+def _llave_promociones():
+    # El menú de categorías de base.html entra en todas las páginas públicas
+    foto = promociones_activas()
+    return f"{llave_versiones('categorias')}:{foto.version}:{foto.desde}"
+
+
+def _llave_novedades():
+    return llave_versiones('categorias', 'novedades')
+
+
+@lectura_en_replica
+@cache_anonima(llave_tarjetas_productos)
 def inicio_circley(request):
-    productos = Producto.objects.filter(activo=True, stock__gt=0).select_related('categoria')[:6]
+    productos = con_precios(Producto.objects.filter(activo=True, stock__gt=0).select_related('categoria')[:6])
     promociones = Promocion.objects.filter(activo=True)[:6]
     novedades = Novedad.objects.all()[:3]
     contexto = {
         'productos_destacados': productos,
         'promociones_destacadas': promociones,
         'novedades_recientes': novedades,
+        'llave_tarjetas': llave_tarjetas_productos(),
+        'tiempo_tarjetas': tiempo_tarjetas(),
         'titulo_pagina': 'Inicio',
     }
     return render(request, 'usuario/index.html', contexto)
 
 
+@lectura_en_replica
+@cache_anonima(llave_tarjetas_productos)
 def productos_servicios(request):
     categoria_id = request.GET.get('categoria')
     search = request.GET.get('busqueda', '').strip()
@@ -67,73 +105,32 @@ def productos_servicios(request):
         productos = productos.filter(categoria_id=categoria_id)
 
     if search:
-        productos = productos.filter(
-            Q(nombre__icontains=search) |
-            Q(descripcion__icontains=search) |
-            Q(categoria__nombre__icontains=search)
-        )
+        productos = buscar_productos(productos, search)
         messages.info(request, f"Resultados filtrados por: {search}")
 
     contexto = {
-        'productos': productos,
+        'productos': con_precios(productos),
         'busqueda': search,
+        'llave_tarjetas': llave_tarjetas_productos(),
+        'tiempo_tarjetas': tiempo_tarjetas(),
         'titulo_pagina': 'Productos y Servicios',
     }
     return render(request, 'usuario/ps.html', contexto)
 
 
+@lectura_en_replica
+@cache_anonima(_llave_promociones)
 def promociones_view(request):
-    hoy = timezone.now().date()
-    promociones = Promocion.objects.filter(
-        activo=True,
-        fecha_inicio__lte=hoy,
-        fecha_fin__gte=hoy
-    )
+    foto = promociones_activas()
     return render(request, 'usuario/p.html', {
-        'promociones': promociones,
+        'promociones': foto.catalogo,
+        'llave_tarjetas': foto.version,
+        'tiempo_tarjetas': tiempo_tarjetas(),
         'titulo_pagina': 'Promociones'
     })
 
-def aplicar_promociones(carrito):
-    hoy = timezone.now().date()
-    total_descuento = Decimal("0.00")
-
-    promociones = (
-        Promocion.objects.filter(activa=True)
-        .filter(
-            Q(fecha_inicio__isnull=True) | Q(fecha_inicio__lte=hoy),
-            Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=hoy),
-        )
-        .prefetch_related("productos")  # opcional si usas M2M con productos
-    )
-
-    for promo in promociones:
-        if promo.tipo_descuento == Promocion.TipoDescuento.BOGO:
-            total_descuento += aplicar_bogo(carrito, promo)
-        elif promo.tipo_descuento == Promocion.TipoDescuento.PORCENTAJE:
-            total_descuento += aplicar_porcentaje(carrito, promo)
-
-    subtotal = carrito.subtotal or Decimal("0.00")
-    total_descuento = total_descuento.quantize(Decimal("0.01"))
-    carrito.total = max(Decimal("0.00"), subtotal - total_descuento)
-    carrito.total_descuento = total_descuento
-    carrito.save(update_fields=["total", "total_descuento"])
-
-    return total_descuento
-
-def aplicar_bogo(carrito, promo):
-    total_descuento = Decimal("0.00")
-
-    for item in carrito.items.all():
-        if promo.productos.filter(pk=item.producto_id).exists():
-            pares = item.cantidad // 2
-            if pares:
-                precio_unitario = item.precio_unitario_actual or item.producto.precio
-                descuento = (pares * precio_unitario).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-                total_descuento += descuento
-                print(f"BOGO {promo}: {item.producto} -> {descuento}")
-
-    return total_descuento
+def aplicar_promociones(carrito, items=None):
+    return totales.recalcular(carrito, items)
 
 def aplicar_promocion_dos_por_uno(item):
     if item.cantidad < 2:
@@ -143,37 +140,22 @@ def aplicar_promocion_dos_por_uno(item):
     precio_unitario = item.precio_unitario_actual or item.producto.precio
     return (pares * precio_unitario).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
-def aplicar_porcentaje(carrito, promo):
-    queryset = carrito.items.all()
-    if promo.productos.exists():
-        queryset = queryset.filter(producto__in=promo.productos.all())
-
-    subtotal = queryset.aggregate(
-        total=Sum(F("cantidad") * F("producto__precio"))
-    )["total"] or Decimal("0.00")
-
-    if subtotal <= 0 or not promo.valor_descuento:
-        return Decimal("0.00")
-
-    porcentaje = Decimal(promo.valor_descuento) / Decimal("100")
-    descuento = subtotal * porcentaje
-    return descuento.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+def recalcular_totales_carrito(carrito, items=None):
+    aplicar_promociones(carrito, items)
 
-def recalcular_totales_carrito(carrito):
-    subtotal = carrito.items.aggregate(
-        total=Sum(F("cantidad") * F("producto__precio"))
-    )["total"] or Decimal("0.00")
 
-    subtotal = subtotal.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    carrito.subtotal = subtotal
-    carrito.save(update_fields=["subtotal"])
-
-    aplicar_promociones(carrito)
+def asegurar_totales_carrito(carrito, items=None):
+    # Los totales se mantienen al agregar/quitar; solo se recalculan si cambiaron promociones o precios
+    totales.asegurar(carrito, items)
 
+@lectura_en_replica
+@cache_anonima(_llave_novedades)
 def novedades_view(request):
     novedades = Novedad.objects.all()
     return render(request, 'usuario/n.html', {
         'novedades': novedades,
+        'llave_tarjetas': llave_versiones('novedades'),
+        'tiempo_tarjetas': tiempo_tarjetas(),
         'titulo_pagina': 'Novedades'
     })
 
@@ -268,9 +250,9 @@ def ver_carrito(request):
         return redirect("app_clientes:login")
 
     carrito = obtener_carrito_cliente(request.user.cliente)
-    recalcular_totales_carrito(carrito)
+    items = list(carrito.items.select_related("producto"))
+    asegurar_totales_carrito(carrito, items)
 
-    items = carrito.items.select_related("producto")
     contexto = {
         "carrito": carrito,
         "items": items,
@@ -295,25 +277,14 @@ def agregar_al_carrito(request, producto_id):
         messages.error(request, "La cantidad debe ser positiva.")
         return redirect(request.META.get('HTTP_REFERER', 'app_clientes:inicio_circley'))
 
-    if producto.stock < cantidad:
-        messages.error(request, "No hay stock suficiente.")
-        return redirect(request.META.get('HTTP_REFERER', 'app_clientes:inicio_circley'))
-
     carrito = obtener_carrito_cliente(request.user.cliente)
     precio_actual = obtener_precio_producto(producto)
 
-    item, created = ItemCarrito.objects.get_or_create(
-        carrito=carrito,
-        producto=producto,
-        defaults={'cantidad': cantidad, 'precio_unitario_actual': precio_actual}
-    )
-    if not created:
-        item.cantidad += cantidad
-        item.precio_unitario_actual = precio_actual
-        item.save(update_fields=['cantidad', 'precio_unitario_actual'])
-
-    producto.stock -= cantidad
-    producto.save(update_fields=['stock'])
+    try:
+        inventario.agregar_item(carrito, producto, cantidad, precio_actual)
+    except inventario.StockInsuficiente:
+        messages.error(request, "No hay stock suficiente.")
+        return redirect(request.META.get('HTTP_REFERER', 'app_clientes:inicio_circley'))
 
     messages.success(
         request,
@@ -331,18 +302,12 @@ def actualizar_item_carrito(request, item_id):
     if nueva_cantidad <= 0:
         return eliminar_item_carrito(request, item_id)
 
-    diferencia = nueva_cantidad - item.cantidad
-    producto = item.producto
-
-    if diferencia > 0 and producto.stock < diferencia:
+    try:
+        inventario.ajustar_item(item, nueva_cantidad, obtener_precio_producto(item.producto))
+    except inventario.StockInsuficiente:
         messages.error(request, "No hay stock suficiente para aumentar la cantidad.")
         return redirect('app_clientes:ver_carrito')
 
-    producto.stock -= diferencia
-    producto.save(update_fields=['stock'])
-    item.cantidad = nueva_cantidad
-    item.precio_unitario_actual = obtener_precio_producto(producto)
-    item.save(update_fields=['cantidad', 'precio_unitario_actual'])
     messages.success(request, "Cantidad actualizada.")
     return redirect('app_clientes:ver_carrito')
 
@@ -350,10 +315,7 @@ def actualizar_item_carrito(request, item_id):
 @login_required
 def eliminar_item_carrito(request, item_id):
     item = get_object_or_404(ItemCarrito, pk=item_id, carrito__cliente__user=request.user)
-    producto = item.producto
-    producto.stock += item.cantidad
-    producto.save(update_fields=['stock'])
-    item.delete()
+    inventario.quitar_item(item)
     messages.info(request, "Producto retirado del carrito.")
     return redirect('app_clientes:ver_carrito')
 
@@ -364,46 +326,47 @@ def checkout(request):
         messages.warning(request, "Debes ser cliente para completar una compra.")
         return redirect("app_clientes:login")
 
+    # Un reintento del mismo envío llega con el carrito ya vacío: se contesta antes de tocarlo
+    clave = request.POST.get("token_idempotencia") if request.method == "POST" else None
+    if clave and pedido_de_clave(clave, request.user.cliente):
+        messages.info(request, "Tu pedido ya había sido registrado.")
+        return redirect("app_clientes:historial_pedidos")
+
     carrito = obtener_carrito_cliente(request.user.cliente)
-    items = carrito.items.select_related("producto")
+    items = list(carrito.items.select_related("producto"))
 
-    if not items.exists():
+    if not items:
         messages.info(request, "Tu carrito está vacío.")
         return redirect("app_clientes:inicio_circley")
 
     # Asegura que subtotal/total del carrito estén actualizados
-    recalcular_totales_carrito(carrito)
+    asegurar_totales_carrito(carrito, items)
 
     if request.method == "POST":
         metodo_pago = request.POST.get("metodo_pago")
         direccion_envio = request.POST.get("direccion_envio") or request.user.cliente.direccion
         fecha_estimada = request.POST.get("fecha_entrega_estimada")
 
-        with transaction.atomic():
-            pedido = Pedido.objects.create(
-                cliente=request.user.cliente,
-                direccion_envio=direccion_envio,
+        if fecha_estimada:
+            try:
+                fecha_estimada = timezone.make_aware(datetime.strptime(fecha_estimada, "%Y-%m-%d"))
+            except ValueError:
+                fecha_estimada = None
+
+        try:
+            crear_pedido(
+                carrito, items, request.user.cliente,
                 metodo_pago=metodo_pago,
-                subtotal=carrito.subtotal,
-                descuento_total=carrito.total_descuento,
-                total=carrito.total,
+                direccion_envio=direccion_envio,
+                fecha_entrega_estimada=fecha_estimada or None,
+                clave=clave,
             )
-
-            for item in items:
-                DetallePedido.objects.create(
-                    pedido=pedido,
-                    producto=item.producto,
-                    cantidad=item.cantidad,
-                    precio_unitario_venta=item.precio_unitario_actual,
-                )
-
-            if fecha_estimada:
-                try:
-                    pedido.fecha_entrega_estimada = timezone.datetime.strptime(fecha_estimada, "%Y-%m-%d")
-                except ValueError:
-                    pass
-            pedido.save()
-            carrito.vaciar()
+        except PedidoDuplicado:
+            messages.info(request, "Tu pedido ya había sido registrado.")
+            return redirect("app_clientes:historial_pedidos")
+        except inventario.ReservaVencida:
+            messages.warning(request, "Parte de tu carrito se liberó mientras confirmabas. Revísalo antes de volver a intentarlo.")
+            return redirect("app_clientes:ver_carrito")
 
         messages.success(request, "Pedido generado correctamente.")
         return redirect("app_clientes:historial_pedidos")
@@ -415,6 +378,7 @@ def checkout(request):
         "total_descuento": carrito.total_descuento,
         "total_a_pagar": carrito.total,
         "metodos_pago": Pedido.MetodoPago.choices,
+        "token_idempotencia": nueva_clave(),
         "titulo_pagina": "Checkout",
     }
     return render(request, "usuario/checkout.html", contexto)
@@ -481,10 +445,12 @@ CRUD_CONFIG = {
         'create_template': 'admin/categorias/agregar_categorias.html',
         'update_template': 'admin/categorias/actualizar_categorias.html',
         'delete_template': 'admin/categorias/borrar_categorias.html',
+        'import_template': 'admin/categorias/importar_categorias.html',
         "url_lista": "app_clientes:ver_categorias",
         'list_fields': ['id', 'nombre', 'descripcion'],
         'form_fields': ['nombre', 'descripcion'],
         'search_fields': ['nombre', 'descripcion'],
+        'acciones': ['borrar'],
         'labels': {
             'nombre': 'Nombre',
             'descripcion': 'Descripción'
@@ -496,11 +462,13 @@ CRUD_CONFIG = {
         'create_template': 'admin/productos/agregar_productos.html',
         'update_template': 'admin/productos/actualizar_productos.html',
         'delete_template': 'admin/productos/borrar_productos.html',
+        'import_template': 'admin/productos/importar_productos.html',
         "url_lista": "app_clientes:ver_productos",
         'list_fields': ['id', 'nombre', 'categoria', 'precio', 'stock', 'activo'],
         'form_fields': ['nombre', 'descripcion', 'precio', 'stock', 'categoria', 'imagen_url', 'activo'],
         'many_to_many_fields': ['promociones'],
         'search_fields': ['nombre', 'descripcion', 'categoria__nombre'],
+        'acciones': ['activar', 'desactivar', 'reprecio', 'borrar'],
         'foreign_keys': {'categoria': Categoria.objects.all()},
         'boolean_fields': ['activo'],
         'file_fields': ['imagen_url'],
@@ -525,6 +493,7 @@ CRUD_CONFIG = {
         'form_fields': ['nombre', 'descripcion', 'tipo_descuento', 'valor_descuento', 'fecha_inicio', 'fecha_fin', 'imagen_url', 'activo'],
         'many_to_many_fields': ['productos'],
         'search_fields': ['nombre', 'descripcion'],
+        'acciones': ['activar', 'desactivar', 'borrar'],
         'choices_fields': {'tipo_descuento': Promocion.TipoDescuento.choices},
         'boolean_fields': ['activo'],
         'file_fields': ['imagen_url'],
@@ -549,6 +518,7 @@ CRUD_CONFIG = {
         'list_fields': ['id', 'titulo', 'fecha_publicacion'],
         'form_fields': ['titulo', 'descripcion', 'fecha_publicacion', 'imagen_url'],
         'search_fields': ['titulo', 'descripcion'],
+        'acciones': ['borrar'],
         'file_fields': ['imagen_url'],
         'labels': {
             'titulo': 'Título',
@@ -567,6 +537,7 @@ CRUD_CONFIG = {
         'list_fields': ['id', 'producto', 'promocion'],
         'form_fields': ['producto', 'promocion'],
         'search_fields': ['producto__nombre', 'promocion__nombre'],
+        'acciones': ['borrar'],
         'foreign_keys': {
             'producto': Producto.objects.all(),
             'promocion': Promocion.objects.all()
@@ -587,6 +558,8 @@ CRUD_CONFIG = {
                         'metodo_pago', 'fecha_envio', 'fecha_entrega_estimada',
                         'confirmado_cliente', 'confirmado_admin'],
         'search_fields': ['cliente__user__username', 'estado_pedido', 'metodo_pago'],
+        'acciones': ['avanzar_estado'],
+        'paginacion': {'orden': ['-fecha_pedido'], 'por_pagina': 50, 'conteo_aproximado': True},
         'foreign_keys': {'cliente': Cliente.objects.all()},
         'boolean_fields': ['confirmado_cliente', 'confirmado_admin'],
         'choices_fields': {
@@ -605,6 +578,68 @@ CRUD_CONFIG = {
             'fecha_de_pedido': 'Fecha_pedido'
         }
     },
+    'carritos': {
+        'model': Carrito,
+        'list_template': 'admin/carritos/ver_carritos.html',
+        'create_template': 'admin/carritos/agregar_carritos.html',
+        'update_template': 'admin/carritos/actualizar_carritos.html',
+        'delete_template': 'admin/carritos/borrar_carritos.html',
+        "url_lista": "app_clientes:ver_carritos",
+        'list_fields': ['id', 'cliente', 'activo', 'total', 'fecha_actualizacion'],
+        'form_fields': ['cliente', 'activo'],
+        'search_fields': ['cliente__user__username'],
+        'paginacion': {'orden': ['-fecha_actualizacion'], 'por_pagina': 50, 'conteo_aproximado': True},
+        'foreign_keys': {'cliente': Cliente.objects.all()},
+        'boolean_fields': ['activo'],
+        'labels': {
+            'cliente': 'Cliente',
+            'activo': 'Activo'
+        }
+    },
+    'items_carrito': {
+        'model': ItemCarrito,
+        'list_template': 'admin/items_carrito/ver_items_carrito.html',
+        'create_template': 'admin/items_carrito/agregar_items_carrito.html',
+        'update_template': 'admin/items_carrito/actualizar_items_carrito.html',
+        'delete_template': 'admin/items_carrito/borrar_items_carrito.html',
+        "url_lista": "app_clientes:ver_items_carrito",
+        'list_fields': ['id', 'carrito', 'producto', 'cantidad', 'precio_unitario_actual'],
+        'form_fields': ['carrito', 'producto', 'cantidad', 'precio_unitario_actual'],
+        'search_fields': ['producto__nombre', 'carrito__cliente__user__username'],
+        'paginacion': {'orden': ['-pk'], 'por_pagina': 50, 'conteo_aproximado': True},
+        'foreign_keys': {
+            'carrito': Carrito.objects.all(),
+            'producto': Producto.objects.all()
+        },
+        'labels': {
+            'carrito': 'Carrito',
+            'producto': 'Producto',
+            'cantidad': 'Cantidad',
+            'precio_unitario_actual': 'Precio unitario'
+        }
+    },
+    'detalles_pedido': {
+        'model': DetallePedido,
+        'list_template': 'admin/detalles_pedido/ver_detalles_pedido.html',
+        'create_template': 'admin/detalles_pedido/agregar_detalles_pedido.html',
+        'update_template': 'admin/detalles_pedido/actualizar_detalles_pedido.html',
+        'delete_template': 'admin/detalles_pedido/borrar_detalles_pedido.html',
+        "url_lista": "app_clientes:ver_detalles_pedido",
+        'list_fields': ['id', 'pedido', 'producto', 'cantidad', 'precio_unitario_venta'],
+        'form_fields': ['pedido', 'producto', 'cantidad', 'precio_unitario_venta'],
+        'search_fields': ['producto__nombre'],
+        'paginacion': {'orden': ['-pk'], 'por_pagina': 50, 'conteo_aproximado': True},
+        'foreign_keys': {
+            'pedido': Pedido.objects.all(),
+            'producto': Producto.objects.all()
+        },
+        'labels': {
+            'pedido': 'Pedido',
+            'producto': 'Producto',
+            'cantidad': 'Cantidad',
+            'precio_unitario_venta': 'Precio de venta'
+        }
+    },
     'mensajes_contacto': {
         'model': MensajeContacto,
         'list_template': 'admin/mensajes_contacto/ver_mensajes_contacto.html',
@@ -614,6 +649,8 @@ CRUD_CONFIG = {
         'list_fields': ['id', 'nombre_remitente', 'email_remitente', 'fecha_envio_legible', 'mensaje','leido'],
         'form_fields': ['leido'],
         'search_fields': ['nombre_remitente', 'email_remitente', 'mensaje'],
+        'acciones': ['marcar_leido', 'marcar_no_leido', 'borrar'],
+        'paginacion': {'orden': ['-fecha_envio'], 'por_pagina': 50, 'conteo_aproximado': True},
         'boolean_fields': ['leido'],
         'labels': {
             'nombre_remitente': 'Nombre',
@@ -626,38 +663,55 @@ CRUD_CONFIG = {
 }
 
 
+def _url_pagina(request, **cursor):
+    valor = next(iter(cursor.values()))
+    if not valor:
+        return ''
+    params = request.GET.copy()
+    params.pop('despues', None)
+    params.pop('antes', None)
+    params.update(cursor)
+    return f"?{params.urlencode()}"
+
+
+@lectura_en_replica
 def crud_list_view(request, slug):
     config = CRUD_CONFIG[slug]
     Model = config['model']
     queryset = Model.objects.all()
     search = request.GET.get('busqueda', '').strip()
+    plan = plan_listado(slug, config)
 
     if search:
-        q_objects = Q()
-        for field in config.get('search_fields', []):
-            q_objects |= Q(**{f"{field}__icontains": search})
-        queryset = queryset.filter(q_objects)
+        queryset = busqueda_admin.filtrar(slug, config, queryset, search)
         messages.info(request, f"Resultados filtrados por: {search}")
 
+    paginacion = config.get('paginacion', {})
+    pagina = PaginaKeyset(
+        plan.aplicar(queryset),
+        orden=paginacion.get('orden'),
+        por_pagina=paginacion.get('por_pagina', POR_PAGINA_DEFECTO),
+    ).obtener(despues=request.GET.get('despues'), antes=request.GET.get('antes'))
+
     rows = []
-    for obj in queryset:
-        valores = []
-        for field in config['list_fields']:
-            valor = getattr(obj, field, '')
-            if callable(valor):
-                valor = valor()
-            if valor is None:
-                valor = ''
-            valores.append(str(valor))
+    for obj in pagina.objetos:
         rows.append({
             'id': obj.pk,
-            'values': valores,
+            'values': [str(valor_campo(obj, field)) for field in config['list_fields']],
         })
 
     contexto = {
         'config': config,
-        'objetos': queryset,
+        'objetos': pagina.objetos,
+        'url_exportar': reverse('app_clientes:exportar_crud', args=[slug]),
+        'url_importar': reverse(f'app_clientes:importar_{slug}') if 'import_template' in config else '',
+        'acciones': acciones.opciones(config),
+        'url_acciones': reverse('app_clientes:acciones_crud', args=[slug]),
         'rows': rows,
+        'pagina': pagina,
+        'url_siguiente': _url_pagina(request, despues=pagina.cursor_siguiente),
+        'url_anterior': _url_pagina(request, antes=pagina.cursor_anterior),
+        'total_aproximado': conteo_aproximado(queryset) if paginacion.get('conteo_aproximado') else None,
         'busqueda': search,
         'slug': slug,
         'titulo_seccion': config.get('titulo', slug.replace('_', ' ').title()),
@@ -665,6 +719,86 @@ def crud_list_view(request, slug):
     return render(request, config['list_template'], contexto)
 
 
+@admin_required
+def exportar_crud(request, slug):
+    slug = slug.replace('-', '_')
+    if slug not in CRUD_CONFIG:
+        raise Http404("Listado desconocido")
+    config = CRUD_CONFIG[slug]
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        formato = 'csv'
+    comprimir = request.GET.get('gzip') == '1'
+
+    queryset = config['model'].objects.all()
+    search = request.GET.get('busqueda', '').strip()
+    if search:
+        queryset = busqueda_admin.filtrar(slug, config, queryset, search)
+    # Mismo plan que el listado (joins y columnas justas), en orden de pk para recorrer estable
+    queryset = plan_listado(slug, config).aplicar(queryset).order_by('pk')
+
+    campos = config['list_fields']
+    labels = config.get('labels', {})
+    encabezados = [labels.get(campo, campo) for campo in campos]
+    respuesta = StreamingHttpResponse(
+        exportar(queryset, campos, encabezados, formato, comprimir),
+        content_type='application/gzip' if comprimir else FORMATOS[formato],
+    )
+    nombre = f"{slug}-{timezone.localdate():%Y%m%d}.{formato}{'.gz' if comprimir else ''}"
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return respuesta
+
+
+@admin_required
+def acciones_crud(request, slug):
+    slug = slug.replace('-', '_')
+    if slug not in CRUD_CONFIG:
+        raise Http404("Listado desconocido")
+    regreso = request.POST.get('regreso') or reverse(f'app_clientes:ver_{slug}')
+    if not url_has_allowed_host_and_scheme(regreso, allowed_hosts={request.get_host()}):
+        regreso = reverse(f'app_clientes:ver_{slug}')
+    if request.method != 'POST':
+        return redirect(regreso)
+
+    nombre = request.POST.get('accion', '')
+    try:
+        afectados = acciones.ejecutar(
+            slug, CRUD_CONFIG[slug], nombre, request.POST.getlist('seleccion'), request.POST.get('parametro'),
+        )
+    except acciones.AccionInvalida as exc:
+        messages.error(request, str(exc))
+    else:
+        messages.success(request, f"{acciones.ACCIONES[nombre][0]}: {afectados} registros.")
+    return redirect(regreso)
+
+
+def crud_import_view(request, slug):
+    config = CRUD_CONFIG[slug]
+    importador = IMPORTADORES[slug]
+    resultado = None
+
+    if request.method == 'POST':
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            messages.error(request, "Selecciona un archivo CSV.")
+        else:
+            try:
+                resultado = importar_csv(slug, archivo.file)
+            except (ValueError, UnicodeDecodeError) as exc:
+                messages.error(request, f"No se pudo leer el archivo: {exc}")
+            else:
+                messages.success(request, f"Importación terminada: {resultado.importados} registros guardados.")
+
+    return render(request, config['import_template'], {
+        'config': config,
+        'resultado': resultado,
+        'obligatorias': importador.obligatorias,
+        'opcionales': [campo for campo in importador.actualizables if campo not in importador.obligatorias],
+        'slug': slug,
+        'titulo_seccion': config.get('titulo', slug.replace('_', ' ').title()),
+    })
+
+
 def crud_create_update(request, slug, instance=None):
     config = CRUD_CONFIG[slug]
     Model = config['model']
@@ -759,9 +893,11 @@ def crud_delete(request, slug, pk):
 # -------- Wrapper functions con los nombres solicitados --------
 @admin_required
 def dashboard_admin(request):
+    # Lo relativo a pedidos sale de los resúmenes; su costo no crece con el historial
+    resumen = resumen_dashboard()
     return render(request, 'admin/dashboard.html', {
+        **resumen,
         'total_clientes': Cliente.objects.count(),
-        'total_pedidos': Pedido.objects.count(),
         'total_productos': Producto.objects.count(),
         'total_promociones_activas': Promocion.objects.filter(activo=True).count(),
         'titulo_pagina': 'Panel Circle Y'
@@ -805,6 +941,11 @@ def agregar_categorias(request):
     return crud_create_update(request, 'categorias')
 
 
+@admin_required
+def importar_categorias(request):
+    return crud_import_view(request, 'categorias')
+
+
 @admin_required
 def actualizar_categorias(request, pk):
     categoria = get_object_or_404(Categoria, pk=pk)
@@ -831,6 +972,11 @@ def agregar_productos(request):
     return crud_create_update(request, 'productos')
 
 
+@admin_required
+def importar_productos(request):
+    return crud_import_view(request, 'productos')
+
+
 @admin_required
 def actualizar_productos(request, pk):
     producto = get_object_or_404(Producto, pk=pk)
@@ -0,0 +1,152 @@
+# app_clientes/vistas_async.py
+"""
+Versiones async de las vistas públicas y del carrito, para cuando el sitio
+corre con ASGI (ver urls_async.py). Las lecturas usan el ORM async; el render
+sigue siendo síncrono porque las plantillas todavía pueden tocar la base
+(menú, usuario de la sesión, variantes de imágenes) y va en un solo
+sync_to_async al final.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db import connections
+from django.shortcuts import redirect, render
+
+from .busqueda import buscar_productos
+from .cache_paginas import cache_anonima
+from .models import Carrito, Cliente, Novedad, Producto, Promocion
+from .precios import acon_precios, allave_tarjetas_productos, con_precios
+from .promociones import apromociones_activas
+from .replicas import lectura_en_replica
+from .versiones import llave_versiones
+from .views import asegurar_totales_carrito, tiempo_tarjetas
+
+_render = sync_to_async(render)
+
+
+async def arender(request, plantilla, contexto):
+    # El usuario que ya resolvió auser() no se vuelve a consultar desde la plantilla
+    request.user = await request.auser()
+    return await _render(request, plantilla, contexto)
+
+
+def _en_hilo_propio(funcion):
+    def envoltura():
+        try:
+            return funcion()
+        finally:
+            # Los hilos del executor no son de ninguna request: una conexión persistente
+            # (CONN_MAX_AGE) quedaría abierta en cada uno; con pool vuelve al pool
+            connections.close_all()
+    return sync_to_async(envoltura, thread_sensitive=False)
+
+
+async def en_paralelo(*funciones):
+    """
+    Corre lecturas independientes al mismo tiempo. Los métodos async del ORM
+    pasan todos por el mismo hilo de la request, uno detrás de otro; aquí
+    cada función usa un hilo y una conexión propios.
+    """
+    return await asyncio.gather(*(_en_hilo_propio(funcion)() for funcion in funciones))
+
+
+async def _llave_promociones():
+    foto = await apromociones_activas()
+    return f"{llave_versiones('categorias')}:{foto.version}:{foto.desde}"
+
+
+async def _llave_novedades():
+    return llave_versiones('categorias', 'novedades')
+
+
+@lectura_en_replica
+@cache_anonima(allave_tarjetas_productos)
+async def inicio_circley(request):
+    productos, promociones, novedades = await en_paralelo(
+        lambda: con_precios(Producto.objects.filter(activo=True, stock__gt=0).select_related('categoria')[:6]),
+        lambda: list(Promocion.objects.filter(activo=True)[:6]),
+        lambda: list(Novedad.objects.all()[:3]),
+    )
+    contexto = {
+        'productos_destacados': productos,
+        'promociones_destacadas': promociones,
+        'novedades_recientes': novedades,
+        'llave_tarjetas': await allave_tarjetas_productos(),
+        'tiempo_tarjetas': tiempo_tarjetas(),
+        'titulo_pagina': 'Inicio',
+    }
+    return await arender(request, 'usuario/index.html', contexto)
+
+
+@lectura_en_replica
+@cache_anonima(allave_tarjetas_productos)
+async def productos_servicios(request):
+    categoria_id = request.GET.get('categoria')
+    search = request.GET.get('busqueda', '').strip()
+    productos = Producto.objects.filter(activo=True).select_related('categoria')
+
+    if categoria_id:
+        productos = productos.filter(categoria_id=categoria_id)
+
+    if search:
+        # El backend FTS consulta con un cursor crudo
+        productos = await sync_to_async(buscar_productos)(productos, search)
+        messages.info(request, f"Resultados filtrados por: {search}")
+
+    contexto = {
+        'productos': await acon_precios(productos),
+        'busqueda': search,
+        'llave_tarjetas': await allave_tarjetas_productos(),
+        'tiempo_tarjetas': tiempo_tarjetas(),
+        'titulo_pagina': 'Productos y Servicios',
+    }
+    return await arender(request, 'usuario/ps.html', contexto)
+
+
+@lectura_en_replica
+@cache_anonima(_llave_promociones)
+async def promociones_view(request):
+    foto = await apromociones_activas()
+    return await arender(request, 'usuario/p.html', {
+        'promociones': foto.catalogo,
+        'llave_tarjetas': foto.version,
+        'tiempo_tarjetas': tiempo_tarjetas(),
+        'titulo_pagina': 'Promociones'
+    })
+
+
+@lectura_en_replica
+@cache_anonima(_llave_novedades)
+async def novedades_view(request):
+    novedades = [novedad async for novedad in Novedad.objects.all()]
+    return await arender(request, 'usuario/n.html', {
+        'novedades': novedades,
+        'llave_tarjetas': llave_versiones('novedades'),
+        'tiempo_tarjetas': tiempo_tarjetas(),
+        'titulo_pagina': 'Novedades'
+    })
+
+
+@login_required
+async def ver_carrito(request):
+    usuario = await request.auser()
+    cliente = await Cliente.objects.filter(user=usuario).afirst()
+    if cliente is None:
+        messages.warning(request, "Regístrate como cliente para usar el carrito.")
+        return redirect("app_clientes:login")
+
+    carrito, _ = await Carrito.objects.aget_or_create(cliente=cliente, activo=True)
+    items = [item async for item in carrito.items.select_related("producto")]
+    await sync_to_async(asegurar_totales_carrito)(carrito, items)
+
+    contexto = {
+        "carrito": carrito,
+        "items": items,
+        "subtotal": carrito.subtotal,
+        "total_descuento": carrito.total_descuento,
+        "total_a_pagar": carrito.total,
+        "titulo_pagina": "Mi carrito",
+    }
+    return await arender(request, "usuario/carrito.html", contexto)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend_circley.settings')
+# Con ASGI las vistas públicas y el carrito son async (app_clientes/vistas_async.py)
+os.environ.setdefault('CIRCLEY_URLCONF', 'backend_circley.urls_asgi')
 
 application = get_asgi_application()
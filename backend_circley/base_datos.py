@@ -0,0 +1,166 @@
+# backend_circley/base_datos.py
+"""
+Configuración de la base de datos tomada de variables de entorno.
+
+Motor y ciclo de vida de las conexiones:
+
+    DB_MOTOR=sqlite             o postgresql (DB_NOMBRE, DB_USUARIO, DB_CLAVE, DB_HOST, DB_PUERTO)
+    DB_CONN_MAX_AGE=60          segundos que se reutiliza una conexión; 0 abre una por request, none sin límite
+    DB_CONN_HEALTH_CHECKS=1     revisa una conexión reutilizada antes de la primera consulta de cada request
+    DB_POOL=0                   con PostgreSQL, pool de psycopg (DB_POOL_MIN=2, DB_POOL_MAX=10,
+                                DB_POOL_TIMEOUT=10 s de espera por una conexión libre)
+
+Ajustes de SQLite para producción (apagados por omisión):
+
+    SQLITE_AJUSTES=1            los activa; sin ella quedan los valores de Django. journal_mode=WAL
+                                se escribe en la cabecera del archivo, y el db.sqlite3 de desarrollo
+                                está en el repositorio: cualquier comando que conecte lo modificaría
+    SQLITE_JOURNAL_MODE=WAL     los lectores no esperan a los escritores
+    SQLITE_SYNCHRONOUS=NORMAL   con WAL no se pierde integridad, solo el último commit ante un apagón
+    SQLITE_BUSY_TIMEOUT=5000    ms que una conexión espera el candado antes de "database is locked"
+    SQLITE_MMAP_SIZE=268435456  bytes leídos por mmap en vez de read()
+    SQLITE_CACHE_SIZE=-65536    páginas (negativo: KiB) de caché por conexión
+    SQLITE_TEMP_STORE=MEMORY    ordenamientos e índices temporales en memoria
+    SQLITE_TRANSACTION_MODE=IMMEDIATE
+                                las transacciones toman el candado de escritura al empezar; con
+                                DEFERRED, subir de lectura a escritura falla sin esperar el busy_timeout
+
+Los PRAGMA se aplican en cada conexión nueva (señal connection_created) y
+se leen de la llave 'PRAGMAS' de la base en DATABASES.
+
+Réplicas de lectura (ver app_clientes/replicas.py):
+
+    DB_REPLICAS=/ruta/r1.sqlite3,/ruta/r2.sqlite3
+                                con SQLite, archivos copia de la primaria; con otros
+                                motores, los hosts de las réplicas
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+
+OPCIONES_TEXTO = {
+    'journal_mode': ('SQLITE_JOURNAL_MODE', 'WAL', {'WAL', 'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'OFF'}),
+    'synchronous': ('SQLITE_SYNCHRONOUS', 'NORMAL', {'OFF', 'NORMAL', 'FULL', 'EXTRA'}),
+    'temp_store': ('SQLITE_TEMP_STORE', 'MEMORY', {'DEFAULT', 'FILE', 'MEMORY'}),
+}
+OPCIONES_ENTERAS = {
+    'busy_timeout': ('SQLITE_BUSY_TIMEOUT', 5000),
+    'mmap_size': ('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    'cache_size': ('SQLITE_CACHE_SIZE', -64 * 1024),
+}
+MODOS_TRANSACCION = {'DEFERRED', 'IMMEDIATE', 'EXCLUSIVE'}
+
+
+def _booleano(entorno, variable, defecto):
+    valor = entorno.get(variable)
+    if valor is None:
+        return defecto
+    return valor.strip().lower() not in ('0', 'false', 'no', 'off', '')
+
+
+def _entero(entorno, variable, defecto):
+    try:
+        return int(entorno.get(variable, defecto))
+    except ValueError:
+        raise ImproperlyConfigured(f"{variable} debe ser un entero")
+
+
+def _activado(entorno):
+    return _booleano(entorno, 'SQLITE_AJUSTES', False)
+
+
+def pragmas_sqlite(entorno=os.environ):
+    """PRAGMA -> valor, validados: terminan dentro de SQL."""
+    if not _activado(entorno):
+        return {}
+    pragmas = {}
+    for pragma, (variable, defecto, validos) in OPCIONES_TEXTO.items():
+        valor = entorno.get(variable, defecto).strip().upper()
+        if valor not in validos:
+            raise ImproperlyConfigured(f"{variable}={valor!r}; se espera uno de {', '.join(sorted(validos))}")
+        pragmas[pragma] = valor
+    for pragma, (variable, defecto) in OPCIONES_ENTERAS.items():
+        pragmas[pragma] = _entero(entorno, variable, defecto)
+    return pragmas
+
+
+def opciones_sqlite(entorno=os.environ):
+    """OPTIONS de DATABASES para el backend sqlite3 de Django."""
+    if not _activado(entorno):
+        return {}
+    modo = entorno.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE').strip().upper()
+    if modo not in MODOS_TRANSACCION:
+        raise ImproperlyConfigured(f"SQLITE_TRANSACTION_MODE={modo!r}; se espera DEFERRED, IMMEDIATE o EXCLUSIVE")
+    return {'transaction_mode': modo}
+
+
+def opciones_postgres(entorno=os.environ):
+    """OPTIONS para el backend postgresql; el pool necesita psycopg 3 con psycopg[pool]."""
+    if not _booleano(entorno, 'DB_POOL', False):
+        return {}
+    return {'pool': {
+        'min_size': _entero(entorno, 'DB_POOL_MIN', 2),
+        'max_size': _entero(entorno, 'DB_POOL_MAX', 10),
+        'timeout': _entero(entorno, 'DB_POOL_TIMEOUT', 10),
+    }}
+
+
+def ciclo_conexiones(entorno=os.environ, con_pool=False):
+    if con_pool:
+        # Django rechaza conexiones persistentes con pool: el pool ya las reutiliza y las revisa
+        return {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}
+    sin_limite = entorno.get('DB_CONN_MAX_AGE', '').strip().lower() == 'none'
+    return {
+        'CONN_MAX_AGE': None if sin_limite else _entero(entorno, 'DB_CONN_MAX_AGE', 60),
+        'CONN_HEALTH_CHECKS': _booleano(entorno, 'DB_CONN_HEALTH_CHECKS', True),
+    }
+
+
+def base_primaria(base_dir, entorno=os.environ):
+    """Configuración de 'default' en DATABASES."""
+    motor = entorno.get('DB_MOTOR', 'sqlite').strip().lower()
+    if motor == 'sqlite':
+        base = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': entorno.get('DB_NOMBRE') or base_dir / 'db.sqlite3',
+            'OPTIONS': opciones_sqlite(entorno),
+            'PRAGMAS': pragmas_sqlite(entorno),
+        }
+    elif motor == 'postgresql':
+        base = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': entorno.get('DB_NOMBRE', 'circley'),
+            'USER': entorno.get('DB_USUARIO', ''),
+            'PASSWORD': entorno.get('DB_CLAVE', ''),
+            'HOST': entorno.get('DB_HOST', ''),
+            'PORT': entorno.get('DB_PUERTO', ''),
+            'OPTIONS': opciones_postgres(entorno),
+        }
+    else:
+        raise ImproperlyConfigured(f"DB_MOTOR={motor!r}; se espera sqlite o postgresql")
+    base.update(ciclo_conexiones(entorno, con_pool='pool' in base['OPTIONS']))
+    return base
+
+
+def replicas(primaria, entorno=os.environ):
+    """Alias 'replica_N' -> configuración: la de la primaria con otro archivo u host."""
+    destinos = [valor.strip() for valor in entorno.get('DB_REPLICAS', '').split(',') if valor.strip()]
+    campo = 'NAME' if primaria['ENGINE'].endswith('sqlite3') else 'HOST'
+    return {
+        # En pruebas la réplica apunta a la base de prueba de la primaria
+        f'replica_{numero}': {**primaria, campo: destino, 'TEST': {'MIRROR': 'default'}}
+        for numero, destino in enumerate(destinos, start=1)
+    }
+
+
+def aplicar_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS') or {}
+    with connection.cursor() as cursor:
+        for pragma, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {pragma} = {valor}')
+
+
+connection_created.connect(aplicar_pragmas, dispatch_uid='circley_pragmas_sqlite')
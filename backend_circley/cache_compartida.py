@@ -0,0 +1,41 @@
+# backend_circley/cache_compartida.py
+"""
+Caché por omisión tomada de variables de entorno.
+
+Las versiones de app_clientes/versiones.py, la foto de promociones, las tarjetas
+de producto y las páginas anónimas se invalidan subiendo un contador guardado en
+la caché. Con varios procesos (gunicorn o uvicorn con --workers) ese contador
+tiene que vivir en una caché compartida; si no, cada worker ve sus propias
+versiones y sigue sirviendo lo que otro ya invalidó.
+
+    CACHE_URL=redis://host:6379/0       RedisCache (paquete redis)
+    CACHE_URL=memcached://host:11211    PyMemcacheCache (paquete pymemcache)
+    CACHE_PREFIJO=circley               KEY_PREFIX, para compartir el servidor con otros proyectos
+
+Sin CACHE_URL queda LocMemCache: solo sirve con un proceso (runserver, tests).
+"""
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+MOTORES = {
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+
+
+def cache_por_omision(entorno):
+    url = entorno.get('CACHE_URL', '').strip()
+    if not url:
+        return {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    partes = urlsplit(url)
+    if partes.scheme not in MOTORES:
+        raise ImproperlyConfigured(f"CACHE_URL no soportada: {url!r} (use redis:// o memcached://)")
+    # pymemcache recibe host:puerto; Redis la URL completa
+    ubicacion = partes.netloc if partes.scheme == 'memcached' else url
+    return {
+        'BACKEND': MOTORES[partes.scheme],
+        'LOCATION': ubicacion,
+        'KEY_PREFIX': entorno.get('CACHE_PREFIJO', 'circley'),
+    }
@@ -13,6 +13,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from .base_datos import base_primaria, replicas
+from .cache_compartida import cache_por_omision
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app_clientes.instrumentacion.InstrumentacionMiddleware',
+    'app_clientes.replicas.ReplicasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,7 +56,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'backend_circley.urls'
+# asgi.py la cambia por las rutas con vistas async
+ROOT_URLCONF = os.environ.get('CIRCLEY_URLCONF', 'backend_circley.urls')
 
 TEMPLATES = [
     {
@@ -75,11 +81,22 @@ WSGI_APPLICATION = 'backend_circley.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Motor, conexiones persistentes o pool y los PRAGMA de SQLite van por variables de entorno (ver base_datos.py)
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': base_primaria(BASE_DIR),
+}
+
+# Réplicas de lectura por DB_REPLICAS; sin ella todo va a 'default'
+DATABASES.update(replicas(DATABASES['default']))
+DATABASE_ROUTERS = ['app_clientes.replicas.EnrutadorReplicas']
+REPLICAS_LECTURA = [alias for alias in DATABASES if alias != 'default']
+# Segundos que una sesión lee de la primaria después de escribir
+REPLICAS_VENTANA_PRIMARIA = 10
+
+# Compartida entre procesos con CACHE_URL (ver backend_circley/cache_compartida.py);
+# sin ella, LocMemCache: las versiones de caché solo se ven dentro de un proceso
+CACHES = {
+    'default': cache_por_omision(os.environ),
 }
 
 
@@ -128,6 +145,24 @@ LOGIN_URL = 'app_clientes:login'
 LOGIN_REDIRECT_URL = 'app_clientes:inicio_circley'
 LOGOUT_REDIRECT_URL = 'app_clientes:inicio_circley'
 
+# Medición por request (Server-Timing y log en DEBUG): fracción de requests medidos
+INSTRUMENTACION_MUESTREO = float(os.environ.get('INSTRUMENTACION_MUESTREO', '0.05'))
+INSTRUMENTACION_UMBRAL_DUPLICADAS = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name} {message}', 'style': '{'},
+    },
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'app_clientes': {'handlers': ['consola'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
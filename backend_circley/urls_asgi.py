@@ -0,0 +1,15 @@
+"""
+URLconf para ASGI: la misma que urls.py, con las vistas async de app_clientes.
+"""
+from django.contrib import admin
+from django.urls import path, include
+from django.conf import settings
+from django.conf.urls.static import static
+
+urlpatterns = [
+    path('superadmin/', admin.site.urls),
+    path('', include('app_clientes.urls_async')),
+]
+
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)